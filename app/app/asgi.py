@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_asgi_application()
+
+# прогрев до первого запроса, каждый процесс uvicorn загружает приложение сам
+from app import warmup  # noqa: E402
+
+warmup.run(warmup.ASGI_STAGES)
@@ -4,6 +4,7 @@ from __future__ import absolute_import, unicode_literals
 import os
 
 from celery import Celery
+from celery.signals import worker_process_init
 
 # Установка переменной окружения "DJANGO_SETTINGS_MODULE" для Celery
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
@@ -16,3 +17,11 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Загрузка задач из всех приложений Django
 app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def warm_up_worker(**kwargs):
+    # соединения каждого процесса пула открываются до первой задачи
+    from app import warmup
+
+    warmup.run(warmup.WORKER_STAGES)
@@ -0,0 +1,20 @@
+import os
+
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://redis:6379/1')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+}
+
+# сколько секунд держим пользователя, найденного по JWT, в кэше
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', 60))
+
+# время жизни результатов поиска комнат в асинхронном API, кэш дополнительно
+# сбрасывается при любом изменении броней и комнат
+ROOMS_SEARCH_CACHE_TIMEOUT = int(os.environ.get('ROOMS_SEARCH_CACHE_TIMEOUT', 30))
+
+# сколько секунд холд держит комнату, пока пользователь оплачивает бронь
+BOOKING_HOLD_TIMEOUT = int(os.environ.get('BOOKING_HOLD_TIMEOUT', 600))
@@ -1,3 +1,5 @@
+import os
+
 from django.utils import timezone
 
 CELERY_BROKER_URL = 'redis://redis:6379/0'
@@ -16,4 +18,67 @@ CELERY_BEAT_SCHEDULE = {
             'scheduler': 'django_celery_beat.schedulers:DatabaseScheduler'
         },
     },
+    'drain-outbox': {
+        'task': 'app.tasks.drain_outbox',
+        'schedule': timezone.timedelta(seconds=5),
+        'options': {
+            'scheduler': 'django_celery_beat.schedulers:DatabaseScheduler'
+        },
+    },
+    'drain-booking-queue': {
+        'task': 'app.tasks.drain_booking_queue',
+        'schedule': timezone.timedelta(seconds=5),
+        'options': {
+            'scheduler': 'django_celery_beat.schedulers:DatabaseScheduler'
+        },
+    },
+    'assign-rooms': {
+        'task': 'app.tasks.assign_rooms',
+        'schedule': timezone.timedelta(hours=1),
+        'options': {
+            'scheduler': 'django_celery_beat.schedulers:DatabaseScheduler'
+        },
+    },
+    'reconcile-overlaps': {
+        'task': 'app.tasks.reconcile_overlaps',
+        'schedule': timezone.timedelta(days=1),
+        'options': {
+            'scheduler': 'django_celery_beat.schedulers:DatabaseScheduler'
+        },
+    },
+    'cleanup-holds': {
+        'task': 'app.tasks.cleanup_holds',
+        'schedule': timezone.timedelta(minutes=5),
+        'options': {
+            'scheduler': 'django_celery_beat.schedulers:DatabaseScheduler'
+        },
+    },
+    'purge-outbox': {
+        'task': 'app.tasks.purge_outbox',
+        'schedule': timezone.timedelta(days=1),
+        'options': {
+            'scheduler': 'django_celery_beat.schedulers:DatabaseScheduler'
+        },
+    },
 }
+
+# разбор transactional outbox: размер пачки, сколько пачек за один запуск
+# задачи (остальное ждёт следующего запуска) и когда предупреждать об отставании
+OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 500))
+OUTBOX_MAX_BATCHES = int(os.environ.get('OUTBOX_MAX_BATCHES', 20))
+# после стольких попыток событие откладывается с failed_at
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 10))
+OUTBOX_LAG_WARNING = int(os.environ.get('OUTBOX_LAG_WARNING', 60))
+OUTBOX_RETENTION = timezone.timedelta(days=7)
+
+# асинхронные брони: число разделов очереди (брони одной комнаты всегда в
+# одном разделе), сколько записей читать за раз, TTL блокировки раздела,
+# число попыток записи и сколько хранится статус запроса
+BOOKING_QUEUE_PARTITIONS = int(os.environ.get('BOOKING_QUEUE_PARTITIONS', 16))
+BOOKING_QUEUE_BATCH_SIZE = int(os.environ.get('BOOKING_QUEUE_BATCH_SIZE', 100))
+BOOKING_QUEUE_LOCK_TIMEOUT = 60
+# после стольких доставок упавшая запись снимается с очереди как failed
+BOOKING_QUEUE_MAX_ATTEMPTS = int(
+    os.environ.get('BOOKING_QUEUE_MAX_ATTEMPTS', 5)
+)
+BOOKING_REQUEST_TIMEOUT = 24 * 60 * 60
@@ -8,5 +8,44 @@ DATABASES = {
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD'),
         'HOST': os.environ.get('POSTGRES_HOST', 'db'),
         'PORT': os.environ.get('POSTGRES_PORT', 5432),
+        # Постоянные соединения: каждый поток uWSGI и воркер Celery держит
+        # своё соединение до CONN_MAX_AGE секунд вместо нового на запрос,
+        # перед повторным использованием оно проверяется (CONN_HEALTH_CHECKS).
+        # Размер пула процесса - число его потоков, см. rooms.connections.
+        # Сервис ASGI запускается с POSTGRES_CONN_MAX_AGE=0 (docker-compose):
+        # там соединение запроса следующим запросам не достаётся.
+        'CONN_MAX_AGE': int(os.environ.get('POSTGRES_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'application_name': os.environ.get(
+                'POSTGRES_APPLICATION_NAME', 'rooms'
+            ),
+            'connect_timeout': int(
+                os.environ.get('POSTGRES_CONNECT_TIMEOUT', 5)
+            ),
+        },
     }
 }
+
+# Реплики для чтения: POSTGRES_REPLICA_HOSTS=host[:port],host[:port].
+# Чтения безопасных запросов уходят на реплики (rooms.routers), всё
+# остальное - на default. В тестах реплики зеркалят default.
+DATABASE_REPLICAS = []
+for number, address in enumerate(
+    filter(None, os.environ.get('POSTGRES_REPLICA_HOSTS', '').split(',')),
+    start=1,
+):
+    host, _, port = address.strip().partition(':')
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['rooms.routers.PrimaryReplicaRouter']
+
+# сколько секунд после записи запросы того же клиента читают с primary
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
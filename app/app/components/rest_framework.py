@@ -3,10 +3,15 @@ from datetime import timedelta
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': ('rest_framework.permissions.AllowAny',),
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'rooms.authentication.CachedJWTAuthentication',
     ],
+    # квоты token bucket из rooms.throttling, отдельно на поиск и на брони
+    'DEFAULT_THROTTLE_RATES': {'search': '120/min', 'booking': '30/min'},
 }
 
+# сколько периодов можно проверить одним запросом POST rooms/availability/
+AVAILABILITY_CHECK_LIMIT = 100
+
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=1),
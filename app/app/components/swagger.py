@@ -4,4 +4,13 @@ SWAGGER_SETTINGS = {
         'Bearer': {'type': 'apiKey', 'name': 'Authorization', 'in': 'header',},
     },
     'BASE_URL': '127.0.0.1:8000',
+    'SPEC_URL': 'schema-json',
 }
+
+REDOC_SETTINGS = {
+    'SPEC_URL': 'schema-json',
+}
+
+# схема, собранная generate_openapi в STATIC_ROOT, nginx отдаёт её по
+# /openapi.json, а при отсутствии файла проксирует запрос в приложение
+OPENAPI_FILE = 'openapi.json'
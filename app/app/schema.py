@@ -0,0 +1,45 @@
+from functools import lru_cache
+
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+from rest_framework.response import Response
+
+INFO = openapi.Info(
+    title='Hotel Reservation API',
+    default_version='v1',
+    description='API for hotel room reservations',
+)
+
+BaseSchemaView = get_schema_view(
+    INFO, public=True, permission_classes=(permissions.AllowAny,)
+)
+
+
+@lru_cache(maxsize=None)
+def get_schema(version=''):
+    """Схема API, собирается один раз на процесс.
+
+    Схема публичная и не зависит от запроса, поэтому её можно собрать без
+    него, это же делает generate_openapi при сборке.
+    """
+    generator = BaseSchemaView.generator_class(INFO, version)
+    return generator.get_schema(request=None, public=True)
+
+
+def render_schema(version=''):
+    return OpenAPICodecJson(validators=[]).encode(get_schema(version))
+
+
+class SchemaView(BaseSchemaView):
+    """Отдаёт закэшированную в памяти схему вместо разбора всех view.
+
+    Обычно схему отдаёт nginx из static/openapi.json, этот view - запасной
+    вариант, если файл не собран.
+    """
+
+    def get(self, request, version='', format=None):
+        if request.accepted_renderer.format in ('swagger', 'redoc'):
+            return super().get(request, version, format)
+        return Response(get_schema(request.version or version or ''))
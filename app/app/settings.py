@@ -28,6 +28,8 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'rooms.middleware.ReplicaRoutingMiddleware',
+    'rooms.middleware.AuditContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -59,9 +61,11 @@ WSGI_APPLICATION = 'app.wsgi.application'
 include(
     'components/apps.py',
     'components/database.py',
+    'components/cache.py',
     'components/rest_framework.py',
     'components/swagger.py',
     'components/celery.py',
+    'components/logging.py',
 )
 
 
@@ -1,8 +1,23 @@
 # tasks.py
+from datetime import date, timedelta
+
 from celery import shared_task
 from celery.utils.log import get_task_logger
+from django.db import transaction
 from django.utils import timezone
-from rooms.models import Reservation
+
+from rooms import (
+    analytics,
+    audit,
+    booking_queue,
+    holds,
+    importer,
+    inventory,
+    outbox,
+    reconciliation,
+    reviews,
+)
+from rooms.models import Reservation, Room
 
 logger = get_task_logger(__name__)
 
@@ -16,12 +31,109 @@ def update_reservation_status():
     )
     if reservations_to_update:
         for reservation in reservations_to_update:
-            if reservation.status == Reservation.Status.Booked:
-                if reservation.starting_date.date() == today:
-                    reservation.status = Reservation.Status.Active
-                    reservation.save()
-            if reservation.status == Reservation.Status.Active:
-                if reservation.ending_date.date() < today:
-                    reservation.status = Reservation.Status.Expired
-                    reservation.save()
+            with transaction.atomic(), audit.context(
+                'update_reservation_status'
+            ):
+                if reservation.status == Reservation.Status.Booked:
+                    if reservation.starting_date.date() == today:
+                        reservation.status = Reservation.Status.Active
+                        reservation.save()
+                if reservation.status == Reservation.Status.Active:
+                    if reservation.ending_date.date() < today:
+                        reservation.status = Reservation.Status.Expired
+                        reservation.save()
     return 'статусы обновлены'
+
+
+@shared_task(ignore_result=True)
+def drain_outbox():
+    metrics = outbox.drain()
+    logger.info('outbox drained: %s', metrics)
+    return metrics
+
+
+@shared_task
+def purge_outbox():
+    return f'удалено событий: {outbox.purge()}'
+
+
+@shared_task
+def cleanup_holds():
+    """Истёкшие холды убираются здесь, а не при чтении."""
+    return f'убрано комнат без холдов: {holds.cleanup()}'
+
+
+@shared_task
+def rebuild_room_day_stats(start_date, end_date, batch_size=100):
+    """Полный пересчёт дневного среза за период, пачками комнат."""
+    start_date = date.fromisoformat(start_date)
+    end_date = date.fromisoformat(end_date)
+    room_ids = list(Room.objects.order_by('id').values_list('id', flat=True))
+    rows = 0
+    for i in range(0, len(room_ids), batch_size):
+        with transaction.atomic():
+            rows += analytics.refresh(
+                room_ids[i : i + batch_size], start_date, end_date
+            )
+    return f'пересчитано строк: {rows}'
+
+
+@shared_task
+def assign_rooms(days_ahead=1):
+    """Назначает комнаты броням по типу, которые скоро начнутся."""
+    until_date = timezone.now().date() + timedelta(days=days_ahead)
+    reservation_ids = list(
+        inventory.unassigned_reservations(until_date).values_list(
+            'id', flat=True
+        )
+    )
+    assigned = 0
+    for reservation_id in reservation_ids:
+        with transaction.atomic():
+            reservation = (
+                Reservation.objects.select_for_update()
+                .filter(pk=reservation_id, room__isnull=True)
+                .first()
+            )
+            if reservation and inventory.assign_room(reservation):
+                assigned += 1
+    return f'назначено комнат: {assigned} из {len(reservation_ids)}'
+
+
+@shared_task(ignore_result=True)
+def process_booking_partition(partition):
+    processed = booking_queue.consume(partition)
+    logger.info('booking partition %s: %s requests', partition, processed)
+    return processed
+
+
+@shared_task(ignore_result=True)
+def drain_booking_queue():
+    """Подстраховка: разбирает разделы, запуск которых мог потеряться."""
+    for partition in booking_queue.busy_partitions():
+        process_booking_partition.delay(partition)
+
+
+@shared_task
+def reconcile_overlaps(batch_size=1000):
+    result = reconciliation.reconcile(batch_size)
+    return (
+        f'проверено комнат: {result["rooms"]}, '
+        f'пересечений: {result["overlaps"]}'
+    )
+
+
+@shared_task
+def backfill_room_ratings(batch_size=1000):
+    return f'пересчитано комнат: {reviews.backfill(batch_size)}'
+
+
+@shared_task
+def import_bookings(path, import_format, source, user_id, room_id=None):
+    stats = importer.import_file(
+        path, import_format, source, user_id, room_id=room_id
+    )
+    return (
+        f'создано: {stats["created"]}, отменено: {stats["cancelled"]}, '
+        f'пропущено: {stats["skipped"]}'
+    )
@@ -1,32 +1,27 @@
 from django.contrib import admin
 from django.urls import include, path
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from rest_framework import permissions
+from drf_yasg.renderers import SwaggerJSONRenderer
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title='Hotel Reservation API',
-        default_version='v1',
-        description='API for hotel room reservations',
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from .schema import SchemaView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('rooms.api.urls')),
     path('auth/', include('djoser.urls.base')),
     path('auth/', include('djoser.urls.jwt')),
+    path(
+        'openapi.json',
+        SchemaView.as_view(renderer_classes=[SwaggerJSONRenderer]),
+        name='schema-json',
+    ),
     path(
         'swagger/',
-        schema_view.with_ui('swagger', cache_timeout=0),
+        SchemaView.with_ui('swagger', cache_timeout=0),
         name='schema-swagger-ui',
     ),
     path(
         'redoc/',
-        schema_view.with_ui('redoc', cache_timeout=0),
+        SchemaView.with_ui('redoc', cache_timeout=0),
         name='schema-redoc',
     ),
 ]
@@ -0,0 +1,114 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+# сколько комнат прогоняем через сериализатор, как первая страница списка
+ROOMS_SAMPLE = 20
+
+
+def import_urls():
+    # вместе с URLconf импортируются view, сериализаторы, drf_yasg, djoser
+    get_resolver().url_patterns
+
+
+def build_serializers():
+    from rooms.api.v1.serializers import (
+        ReservationSerializer,
+        RoomSerializer,
+        RoomTypeSerializer,
+    )
+
+    for serializer_class in (
+        RoomSerializer,
+        RoomTypeSerializer,
+        ReservationSerializer,
+    ):
+        serializer_class().fields
+
+
+def open_connections():
+    for alias in settings.DATABASES:
+        connections[alias].ensure_connection()
+
+
+def open_redis():
+    from rooms.redis import get_redis
+
+    get_redis().ping()
+    cache.get('warmup')
+
+
+def prime_schema():
+    from app.schema import get_schema
+
+    get_schema()
+
+
+def prime_rooms():
+    # первые запросы комнат и занятых дат: планы и страницы в кэше Postgres
+    from rooms.api.v1.serializers import RoomSerializer
+    from rooms.availability import reserved_dates_by_room
+    from rooms.models import Room
+
+    rooms = list(Room.objects.filter(active=True)[:ROOMS_SAMPLE])
+    RoomSerializer(
+        rooms,
+        many=True,
+        context={
+            'reserved_dates': reserved_dates_by_room(
+                [room.id for room in rooms]
+            )
+        },
+    ).data
+
+
+WEB_STAGES = (
+    ('urls', import_urls),
+    ('serializers', build_serializers),
+    ('database', open_connections),
+    ('redis', open_redis),
+    ('schema', prime_schema),
+    ('rooms', prime_rooms),
+)
+
+# uvicorn импортирует приложение уже внутри event loop, где синхронный ORM
+# запрещён, а асинхронный поиск открывает свои соединения сам
+ASGI_STAGES = (
+    ('urls', import_urls),
+    ('serializers', build_serializers),
+    ('redis', open_redis),
+    ('schema', prime_schema),
+)
+
+WORKER_STAGES = (
+    ('database', open_connections),
+    ('redis', open_redis),
+)
+
+
+def run(stages=WEB_STAGES):
+    """Прогрев процесса до первого запроса, время каждого этапа - в лог.
+
+    Ошибка этапа не мешает запуску, этап просто выполнится при первом
+    запросе. Возвращает время этапов в миллисекундах.
+    """
+    timings = {}
+    started = time.perf_counter()
+    for name, stage in stages:
+        stage_started = time.perf_counter()
+        try:
+            stage()
+        except Exception:
+            logger.exception('Warm-up stage %s failed', name)
+        timings[name] = (time.perf_counter() - stage_started) * 1000
+        logger.info('Warm-up stage %s: %.1f ms', name, timings[name])
+    logger.info(
+        'Warm-up finished in %.1f ms', (time.perf_counter() - started) * 1000,
+    )
+    return timings
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_wsgi_application()
+
+# прогрев до первого запроса: с lazy-apps в uwsgi.ini приложение загружает
+# каждый воркер, до того как начнёт принимать запросы
+from app import warmup  # noqa: E402
+
+warmup.run()
@@ -1,9 +1,31 @@
 from django.contrib import admin
 
-from .models import Reservation, Room
+from . import closures
+from .models import (
+    OutboxEvent,
+    OverlapFinding,
+    Reservation,
+    ReservationAudit,
+    Review,
+    Room,
+    RoomClosure,
+    RoomRate,
+    RoomType,
+)
+
+
+class RoomRateInline(admin.TabularInline):
+    model = RoomRate
+    extra = 0
+
+
+class RoomClosureInline(admin.TabularInline):
+    model = RoomClosure
+    extra = 0
 
 
 class RoomAdmin(admin.ModelAdmin):
+    inlines = (RoomRateInline, RoomClosureInline)
     list_display = (
         'name',
         'number',
@@ -12,11 +34,29 @@ class RoomAdmin(admin.ModelAdmin):
         'rating',
         'refundable',
         'sleeping_area',
+        'room_type',
         'active',
     )
     search_fields = ('name', 'number')
-    list_filter = ('refundable', 'sleeping_area', 'active')
-    readonly_fields = ('rating', 'travellers')
+    list_filter = ('refundable', 'sleeping_area', 'room_type', 'active')
+    readonly_fields = ('rating', 'reviews_count', 'rating_total', 'travellers')
+
+
+class RoomClosureAdmin(admin.ModelAdmin):
+    list_display = ('room', 'starting_date', 'ending_date', 'reason')
+    search_fields = ('room__name', 'room__number')
+    list_filter = ('starting_date',)
+    actions = ('refuse_reservations',)
+
+    @admin.action(description='Refuse reservations on these dates')
+    def refuse_reservations(self, request, queryset):
+        refused = closures.refuse_affected_reservations(queryset)
+        self.message_user(request, f'Refused reservations: {refused}')
+
+
+class RoomTypeAdmin(admin.ModelAdmin):
+    list_display = ('name', 'sleeping_area', 'day_cost')
+    search_fields = ('name',)
 
 
 class ReservationAdmin(admin.ModelAdmin):
@@ -25,12 +65,90 @@ class ReservationAdmin(admin.ModelAdmin):
         'starting_date',
         'ending_date',
         'room',
+        'room_type',
         'user',
         'status',
     )
-    search_fields = ('room__name', 'user__username')
-    list_filter = ('status',)
+    search_fields = ('room__name', 'user__username', 'external_uid')
+    list_filter = ('status', 'external_source')
+
+
+class ReservationAuditAdmin(admin.ModelAdmin):
+    list_display = (
+        'reservation_id',
+        'room_id',
+        'action',
+        'source',
+        'actor_id',
+        'changed_at',
+    )
+    list_filter = ('action', 'source')
+    # история только дополняется, см. rooms.audit
+    readonly_fields = [field.name for field in ReservationAudit._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class ReviewAdmin(admin.ModelAdmin):
+    list_display = ('room', 'user', 'score', 'created_at')
+    search_fields = ('room__name', 'room__number', 'user__username')
+    list_filter = ('score',)
+    # счётчики комнаты ведут сигналы, перенос отзыва их бы рассинхронизировал
+    readonly_fields = ('reservation', 'room', 'user')
+
+
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = (
+        'id',
+        'topic',
+        'created_at',
+        'processed_at',
+        'failed_at',
+        'attempts',
+    )
+    list_filter = ('topic',)
+    readonly_fields = (
+        'topic',
+        'payload',
+        'created_at',
+        'processed_at',
+        'failed_at',
+        'attempts',
+        'last_error',
+        'delivered_to',
+    )
+
+
+class OverlapFindingAdmin(admin.ModelAdmin):
+    list_display = (
+        'room',
+        'reservation',
+        'conflicting_reservation',
+        'overlap_start',
+        'overlap_end',
+        'detected_at',
+    )
+    search_fields = ('room__name', 'room__number')
+    readonly_fields = (
+        'room',
+        'reservation',
+        'conflicting_reservation',
+        'overlap_start',
+        'overlap_end',
+        'detected_at',
+        'checked_at',
+    )
 
 
 admin.site.register(Room, RoomAdmin)
+admin.site.register(RoomClosure, RoomClosureAdmin)
+admin.site.register(RoomType, RoomTypeAdmin)
 admin.site.register(Reservation, ReservationAdmin)
+admin.site.register(Review, ReviewAdmin)
+admin.site.register(ReservationAudit, ReservationAuditAdmin)
+admin.site.register(OutboxEvent, OutboxEventAdmin)
+admin.site.register(OverlapFinding, OverlapFindingAdmin)
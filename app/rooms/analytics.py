@@ -0,0 +1,161 @@
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+from django.db.models import Count, Sum
+
+from . import outbox
+from .availability import day_start
+from .models import Reservation, Room, RoomDayStat
+from .pricing import period_rates, rate_matrix, stay_days
+
+SOLD_STATUSES = (
+    Reservation.Status.Booked,
+    Reservation.Status.Active,
+    Reservation.Status.Expired,
+)
+
+GROUP_FIELDS = {
+    'day': ('date',),
+    'room': ('room_id', 'room__name', 'room__number'),
+    'sleeping_area': ('sleeping_area',),
+}
+
+
+def refresh(room_ids, start_date, end_date):
+    """Пересчитывает срез комнат за период одним набором запросов.
+
+    Идемпотентно: строки за период перезаписываются целиком, поэтому
+    повторная доставка события из outbox ничего не ломает.
+    """
+    rooms = list(
+        Room.objects.filter(id__in=room_ids).values_list(
+            'id', 'day_cost', 'sleeping_area'
+        )
+    )
+    if not rooms:
+        return 0
+
+    days = stay_days(start_date, end_date)
+    prices, _ = rate_matrix(
+        [(room_id, day_cost) for room_id, day_cost, _ in rooms],
+        list(period_rates(room_ids, start_date, end_date)),
+        start_date,
+        end_date,
+    )
+
+    index = {room_id: i for i, (room_id, _, _) in enumerate(rooms)}
+    sold = np.zeros(prices.shape, dtype=bool)
+    revenue = np.zeros(prices.shape)
+    reservations = Reservation.objects.filter(
+        room__in=room_ids,
+        status__in=SOLD_STATUSES,
+        starting_date__lt=day_start(end_date + timedelta(days=1)),
+        ending_date__gte=day_start(start_date),
+    ).values_list(
+        'room_id', 'starting_date', 'ending_date', 'nights', 'total_price'
+    )
+    for room_id, starting_date, ending_date, nights, total_price in reservations:
+        i = index[room_id]
+        nights_sold = (days >= np.datetime64(starting_date.date(), 'D')) & (
+            days <= np.datetime64(ending_date.date(), 'D')
+        )
+        sold[i] |= nights_sold
+        # цена, зафиксированная при бронировании, иначе текущий тариф
+        if total_price is not None and nights:
+            revenue[i, nights_sold] = total_price / nights
+        else:
+            revenue[i, nights_sold] = prices[i, nights_sold]
+
+    stats = [
+        RoomDayStat(
+            room_id=room_id,
+            date=day.item(),
+            sleeping_area=sleeping_area,
+            sold=int(sold[i, j]),
+            revenue=float(revenue[i, j]),
+        )
+        for i, (room_id, _, sleeping_area) in enumerate(rooms)
+        for j, day in enumerate(days)
+    ]
+    RoomDayStat.objects.bulk_create(
+        stats,
+        batch_size=1000,
+        update_conflicts=True,
+        unique_fields=['room', 'date'],
+        update_fields=['sleeping_area', 'sold', 'revenue'],
+    )
+    return len(stats)
+
+
+def merge_ranges(ranges):
+    """Пересекающиеся и соседние периоды одной комнаты сливаются в один."""
+    merged = []
+    for start_date, end_date in sorted(ranges):
+        if merged and start_date <= merged[-1][1] + timedelta(days=1):
+            merged[-1][1] = max(merged[-1][1], end_date)
+        else:
+            merged.append([start_date, end_date])
+    return merged
+
+
+@outbox.handler(outbox.RESERVATION_CHANGED)
+def update_rollup(payloads):
+    """Пересчитывает затронутые пачкой периоды по каждой комнате.
+
+    Далёкие друг от друга изменения не объединяются в один общий период,
+    комнаты с одинаковым периодом пересчитываются одним refresh.
+    """
+    ranges = defaultdict(list)
+    for payload in payloads:
+        for state in (payload['before'], payload['after']):
+            if state is None or state['room_id'] is None:
+                continue
+            ranges[state['room_id']].append(
+                (
+                    date.fromisoformat(state['starting_date'][:10]),
+                    date.fromisoformat(state['ending_date'][:10]),
+                )
+            )
+
+    groups = defaultdict(list)
+    for room_id, room_ranges in ranges.items():
+        for start_date, end_date in merge_ranges(room_ranges):
+            groups[start_date, end_date].append(room_id)
+    for (start_date, end_date), room_ids in groups.items():
+        refresh(room_ids, start_date, end_date)
+
+
+def report(start_date, end_date, group_by):
+    """Загрузка, проданные ночи и выручка за период из дневного среза."""
+    fields = GROUP_FIELDS[group_by]
+    rows = (
+        RoomDayStat.objects.filter(date__range=(start_date, end_date))
+        .values(*fields)
+        .annotate(room_nights=Sum('sold'), revenue=Sum('revenue'))
+        .order_by(*fields)
+    )
+
+    days_count = (end_date - start_date).days + 1
+    active_rooms = Room.objects.filter(active=True)
+    if group_by == 'day':
+        capacity = {None: active_rooms.count()}
+    elif group_by == 'room':
+        capacity = {None: days_count}
+    else:
+        capacity = {
+            area: count * days_count
+            for area, count in active_rooms.values_list(
+                'sleeping_area'
+            ).annotate(count=Count('id'))
+        }
+
+    result = []
+    for row in rows:
+        available = capacity.get(row.get('sleeping_area'), capacity.get(None))
+        row['occupancy'] = (
+            round(row['room_nights'] / available, 4) if available else 0
+        )
+        row['revenue'] = round(row['revenue'], 2)
+        result.append(row)
+    return result
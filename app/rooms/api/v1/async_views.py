@@ -0,0 +1,163 @@
+import hashlib
+import json
+import math
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from redis import RedisError
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import OrderingFilter
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from rooms.api.v1.serializers import RoomSerializer
+from rooms.api.v1.views import RoomViewSet
+from rooms.availability import (
+    AVAILABILITY_CHANNEL,
+    aget_version,
+    areserved_dates_by_room,
+)
+from rooms.backends import (
+    DateRangeFilterBackend,
+    DayCostFilter,
+    RoomSearchFilter,
+    StayPriceFilter,
+    TravellersFilter,
+)
+from rooms.models import Room
+from rooms.redis import get_async_redis
+from rooms.throttling import SearchRateThrottle
+
+# Асинхронная версия чтения комнат для ASGI-сервера (uvicorn): поиск не
+# занимает поток на время запросов в БД и Redis, и один воркер держит много
+# медленных поисков одновременно.
+
+SEARCH_CACHE_KEY = 'rooms:search:{version}:{digest}'
+
+# как часто слать комментарий-пинг, чтобы прокси не закрывали тихое соединение
+STREAM_KEEPALIVE = 15
+
+
+def search_cache_key(version, request):
+    digest = hashlib.sha1(request.get_full_path().encode()).hexdigest()
+    return SEARCH_CACHE_KEY.format(version=version, digest=digest)
+
+
+async def serialize_rooms(rooms, many=True):
+    room_ids = [room.id for room in rooms] if many else [rooms.id]
+    serializer = RoomSerializer(
+        rooms,
+        many=many,
+        context={'reserved_dates': await areserved_dates_by_room(room_ids)},
+    )
+    return serializer.data
+
+
+async def throttled(request):
+    throttle = SearchRateThrottle()
+    if await throttle.aallow_request(request, None):
+        return None
+    response = JsonResponse(
+        {'detail': 'Request was throttled.'}, status=429
+    )
+    response['Retry-After'] = str(math.ceil(throttle.wait()))
+    return response
+
+
+async def room_list(request):
+    response = await throttled(request)
+    if response is not None:
+        return response
+
+    redis = get_async_redis()
+    try:
+        cache_key = search_cache_key(await aget_version(), request)
+        cached = await redis.get(cache_key)
+    except RedisError:
+        cache_key = cached = None
+    if cached is not None:
+        return HttpResponse(cached, content_type='application/json')
+
+    drf_request = Request(request)
+    # фильтрам и пагинации нужен экземпляр, как в синхронном /rooms/
+    view = RoomViewSet(request=drf_request, action='list', format_kwarg=None)
+    queryset = Room.objects.all()
+    for backend in (
+        OrderingFilter,
+        RoomSearchFilter,
+        DayCostFilter,
+        TravellersFilter,
+    ):
+        queryset = backend().filter_queryset(drf_request, queryset, view)
+    try:
+        for backend in (DateRangeFilterBackend, StayPriceFilter):
+            queryset = await backend().afilter_queryset(
+                drf_request, queryset, view
+            )
+    except ValidationError as e:
+        return JsonResponse(e.detail, status=400, safe=False)
+
+    # тот же конверт {count, next, previous, results}, что и у /rooms/
+    page = await sync_to_async(view.paginate_queryset)(queryset)
+    if page is not None:
+        data = view.get_paginated_response(await serialize_rooms(page)).data
+    elif isinstance(queryset, list):
+        data = await serialize_rooms(queryset)
+    else:
+        data = await serialize_rooms([room async for room in queryset])
+    body = JSONRenderer().render(data)
+
+    if cache_key is not None:
+        try:
+            await redis.set(
+                cache_key, body, ex=settings.ROOMS_SEARCH_CACHE_TIMEOUT
+            )
+        except RedisError:
+            pass
+    return HttpResponse(body, content_type='application/json')
+
+
+async def room_detail(request, pk):
+    try:
+        room = await Room.objects.aget(pk=pk)
+    except Room.DoesNotExist:
+        raise Http404
+    body = JSONRenderer().render(await serialize_rooms(room, many=False))
+    return HttpResponse(body, content_type='application/json')
+
+
+async def availability_events(room_ids):
+    pubsub = get_async_redis().pubsub()
+    await pubsub.subscribe(AVAILABILITY_CHANNEL)
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=STREAM_KEEPALIVE
+            )
+            if message is None:
+                yield ': keepalive\n\n'
+                continue
+            delta = json.loads(message['data'])
+            if room_ids and delta['room'] not in room_ids:
+                continue
+            yield f'event: availability\ndata: {json.dumps(delta)}\n\n'
+    finally:
+        await pubsub.unsubscribe(AVAILABILITY_CHANNEL)
+        await pubsub.reset()
+
+
+async def availability_stream(request):
+    """Server-Sent Events с изменениями доступности комнат.
+
+    Каждое событие - комната, период и новое состояние (reserved/free).
+    Параметр ?room= (можно несколько раз) ограничивает поток нужными комнатами.
+    """
+    response = StreamingHttpResponse(
+        availability_events(set(request.GET.getlist('room'))),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,7 +1,14 @@
 from dateutil import rrule
+from django.conf import settings
 from rest_framework import serializers
 
-from rooms.models import Reservation, Room
+from rooms.models import (
+    Reservation,
+    ReservationAudit,
+    Review,
+    Room,
+    RoomType,
+)
 
 
 class ReservationDateslSerializer(serializers.ModelSerializer):
@@ -13,7 +20,18 @@ class ReservationDateslSerializer(serializers.ModelSerializer):
 class RoomSerializer(serializers.ModelSerializer):
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        representation['reserved_dates'] = instance.reserved_dates()
+        # список комнат передаёт даты всех комнат страницы в контексте,
+        # чтобы не делать запрос на каждую комнату
+        reserved_dates = self.context.get('reserved_dates')
+        if reserved_dates is None:
+            representation['reserved_dates'] = instance.reserved_dates()
+        else:
+            representation['reserved_dates'] = reserved_dates.get(
+                instance.id, []
+            )
+        # проставляется StayPriceFilter, если в поиске задан период
+        if hasattr(instance, 'total_price'):
+            representation['total_price'] = instance.total_price
         return representation
 
     class Meta:
@@ -22,8 +40,64 @@ class RoomSerializer(serializers.ModelSerializer):
         # fields = ['id', 'name', 'number', 'day_cost', 'travellers', 'rating', 'refundable', 'sleeping_area']
 
 
+class RoomTypeSerializer(serializers.ModelSerializer):
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        # свободные места считаются на период из запроса, см. RoomTypeViewSet
+        available = self.context.get('available')
+        if available is not None:
+            representation['available'] = available.get(instance.id, 0)
+        return representation
+
+    class Meta:
+        model = RoomType
+        fields = '__all__'
+
+
 class ReservationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Reservation
         fields = '__all__'
-        read_only_fields = ['user', 'status']
+        read_only_fields = [
+            'user',
+            'status',
+            'room_type',
+            'nights',
+            'total_price',
+            'external_source',
+            'external_uid',
+            'imported_at',
+            'queue_request',
+        ]
+
+
+class ReservationAuditSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ReservationAudit
+        fields = '__all__'
+
+
+class ReviewSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Review
+        fields = '__all__'
+        read_only_fields = ['reservation', 'room', 'user']
+
+
+class StayQuerySerializer(serializers.Serializer):
+    room = serializers.UUIDField()
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+
+    def validate(self, attrs):
+        if attrs['start_date'] > attrs['end_date']:
+            raise serializers.ValidationError('Invalid time period')
+        return attrs
+
+
+class AvailabilityCheckSerializer(serializers.Serializer):
+    stays = StayQuerySerializer(
+        many=True,
+        allow_empty=False,
+        max_length=settings.AVAILABILITY_CHECK_LIMIT,
+    )
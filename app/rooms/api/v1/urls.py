@@ -1,9 +1,46 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
-from .views import ReservationViewSet, RoomViewSet
+from . import async_views
+from .views import (
+    OccupancyView,
+    ReservationAuditView,
+    ReservationExportView,
+    ReservationViewSet,
+    RoomTypeViewSet,
+    RoomViewSet,
+)
 
 router = DefaultRouter()
 router.register(r'rooms', RoomViewSet, basename='room')
+router.register(r'room-types', RoomTypeViewSet, basename='room-type')
 router.register(r'reservations', ReservationViewSet, basename='reservation')
 
-urlpatterns = router.urls
+urlpatterns = [
+    path(
+        'analytics/occupancy/',
+        OccupancyView.as_view(),
+        name='analytics-occupancy',
+    ),
+    path(
+        'reservations/audit/',
+        ReservationAuditView.as_view(),
+        name='reservation-audit',
+    ),
+    path(
+        'reservations/export/',
+        ReservationExportView.as_view(),
+        name='reservation-export',
+    ),
+    path('async/rooms/', async_views.room_list, name='room-async-list'),
+    path(
+        'async/rooms/availability/',
+        async_views.availability_stream,
+        name='room-availability-stream',
+    ),
+    path(
+        'async/rooms/<uuid:pk>/',
+        async_views.room_detail,
+        name='room-async-detail',
+    ),
+] + router.urls
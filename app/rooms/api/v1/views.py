@@ -1,25 +1,70 @@
+import uuid
+
 from dateutil import parser
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework import status, viewsets
+from redis import RedisError
+from rest_framework import generics, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.filters import OrderingFilter
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.views import APIView
 
-from rooms.api.v1.serializers import ReservationSerializer, RoomSerializer
+from rooms import (
+    audit,
+    booking,
+    booking_queue,
+    export,
+    holds,
+    ical,
+    inventory,
+    reviews,
+)
+from rooms.analytics import GROUP_FIELDS, report
+from rooms.api.v1.serializers import (
+    AvailabilityCheckSerializer,
+    ReservationAuditSerializer,
+    ReservationSerializer,
+    ReviewSerializer,
+    RoomSerializer,
+    RoomTypeSerializer,
+)
+from rooms.availability import (
+    check_stays,
+    day_start,
+    reserved_dates_by_room,
+)
 from rooms.backends import (
     DateRangeFilterBackend,
     DayCostFilter,
+    RoomSearchFilter,
+    StayPriceFilter,
     TravellersFilter,
+    parse_date_range,
 )
-from rooms.models import Reservation, Room
+from rooms.conditional import (
+    ConditionalGetMixin,
+    lookup_uuid,
+    room_state,
+    table_state,
+)
+from rooms.models import Reservation, Room, RoomType
 from rooms.permissions import IsOwnerOrAdminPermission
+from rooms.throttling import BookingRateThrottle, SearchRateThrottle
 
 
-class RoomViewSet(viewsets.ReadOnlyModelViewSet):
+class RoomViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
 
     queryset = Room.objects.all()
     serializer_class = RoomSerializer
@@ -27,11 +72,19 @@ class RoomViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [
         AllowAny,
     ]
+    throttle_classes = [SearchRateThrottle]
     filterset_fields = ['day_cost', 'travellers']
-    ordering_fields = ['day_cost', 'travellers']
+    # rating поддерживается rooms.reviews, сортировка идёт по room_rating_idx
+    ordering_fields = ['day_cost', 'travellers', 'rating']
 
     @swagger_auto_schema(
         manual_parameters=[
+            openapi.Parameter(
+                'q',
+                openapi.IN_QUERY,
+                description='Search by room name or number',
+                type=openapi.TYPE_STRING,
+            ),
             openapi.Parameter(
                 'start_date',
                 openapi.IN_QUERY,
@@ -44,38 +97,203 @@ class RoomViewSet(viewsets.ReadOnlyModelViewSet):
                 description='End date for filtering rooms',
                 type=openapi.TYPE_STRING,
             ),
+            openapi.Parameter(
+                'max_total_price',
+                openapi.IN_QUERY,
+                description='Maximum total price of the stay, '
+                'ordering=total_price sorts by it',
+                type=openapi.TYPE_NUMBER,
+            ),
         ]
     )
     def list(self, request, *args, **kwargs):
         self.filter_backends = [
             OrderingFilter,
+            RoomSearchFilter,
             DayCostFilter,
             TravellersFilter,
             DateRangeFilterBackend,
+            StayPriceFilter,
         ]
         return super().list(request, *args, **kwargs)
 
     def retrieve(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
 
+    def get_etag_parts(self, request):
+        if self.action == 'retrieve':
+            room_id = lookup_uuid(self)
+            return room_id and room_state(room_id)
+        return room_state()
+
+    @swagger_auto_schema(request_body=AvailabilityCheckSerializer)
+    @action(detail=False, methods=['post'], url_path='availability')
+    def check_availability(self, request, *args, **kwargs):
+        """Доступность пакета (комната, период) одним запросом к базе.
+
+        На каждый период - available и занятые интервалы внутри него,
+        blocked null, если комнаты нет или она неактивна.
+        """
+        serializer = AvailabilityCheckSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        stays = serializer.validated_data['stays']
+
+        user = request.user if request.user.is_authenticated else None
+        held_rows = holds.held_stays(
+            min(stay['start_date'] for stay in stays),
+            max(stay['end_date'] for stay in stays),
+            exclude_user=user and user.pk,
+        )
+        return Response(check_stays(stays, held_rows))
+
+    @action(
+        detail=True,
+        methods=['get'],
+        url_path='calendar',
+        # лента отдаётся из кэша, а календари опрашивают её по расписанию
+        throttle_classes=[],
+    )
+    def calendar(self, request, *args, **kwargs):
+        """Занятые дни комнаты в формате iCalendar для внешних календарей."""
+        room_id = lookup_uuid(self)
+        feed = room_id and ical.get_feed(room_id)
+        if feed is None:
+            return Response(
+                {'Room not found'}, status=status.HTTP_404_NOT_FOUND
+            )
+        last_modified = feed['last_modified'].timestamp()
+        response = get_conditional_response(
+            request, etag=feed['etag'], last_modified=last_modified
+        )
+        if response is None:
+            response = HttpResponse(
+                feed['body'], content_type='text/calendar; charset=utf-8'
+            )
+        response['ETag'] = feed['etag']
+        response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    @action(detail=True, methods=['get'], url_path='reviews')
+    def room_reviews(self, request, *args, **kwargs):
+        """Отзывы о комнате, новые первыми."""
+        room = self.get_object()
+        page = self.paginate_queryset(room.reviews.order_by('-created_at'))
+        return self.get_paginated_response(
+            ReviewSerializer(page, many=True).data
+        )
+
+    def get_serializer(self, *args, **kwargs):
+        if kwargs.get('many'):
+            rooms = args[0]
+            kwargs['context'] = {
+                **self.get_serializer_context(),
+                'reserved_dates': reserved_dates_by_room(
+                    [room.id for room in rooms]
+                ),
+            }
+            return self.get_serializer_class()(*args, **kwargs)
+        return super().get_serializer(*args, **kwargs)
+
+
+class RoomTypeViewSet(viewsets.ReadOnlyModelViewSet):
+    """Типы комнат со свободными местами на период и бронь по типу."""
+
+    queryset = RoomType.objects.all()
+    serializer_class = RoomTypeSerializer
+    pagination_class = PageNumberPagination
+    permission_classes = [
+        AllowAny,
+    ]
+    throttle_classes = [SearchRateThrottle]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if getattr(self, 'swagger_fake_view', False):
+            # схема собирается без запроса, см. app/schema.py
+            return context
+        date_range = parse_date_range(self.request.query_params)
+        if date_range is not None:
+            # свободные места всех типов одним запросом
+            context['available'] = inventory.available_counts(*date_range)
+        return context
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'start_date',
+                openapi.IN_QUERY,
+                description='Start date for available rooms count',
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                'end_date',
+                openapi.IN_QUERY,
+                description='End date for available rooms count',
+                type=openapi.TYPE_STRING,
+            ),
+        ]
+    )
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @swagger_auto_schema(request_body=ReservationSerializer)
+    @action(
+        detail=True,
+        methods=['post'],
+        permission_classes=[IsAuthenticated],
+        throttle_classes=[BookingRateThrottle],
+    )
+    @transaction.atomic
+    def book(self, request, *args, **kwargs):
+        room_type = self.get_object()
+        serializer = ReservationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
 
-class ReservationViewSet(viewsets.ModelViewSet):
+        try:
+            nights, total_price = booking.check_type_stay(
+                room_type,
+                serializer.validated_data['starting_date'].date(),
+                serializer.validated_data['ending_date'].date(),
+            )
+        except booking.BookingError as error:
+            return Response(error.detail, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer.save(
+            user=request.user,
+            room=None,
+            room_type=room_type,
+            nights=nights,
+            total_price=total_price,
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class ReservationViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = ReservationSerializer
     pagination_class = PageNumberPagination
     filter_backends = [DjangoFilterBackend, OrderingFilter]
+    filterset_fields = {
+        'status': ['exact'],
+        'nights': ['exact', 'gte', 'lte'],
+        'total_price': ['gte', 'lte'],
+    }
+    ordering_fields = ['nights', 'total_price', 'starting_date']
+    # квота броней тратится только на действия, которые бронируют, чтение
+    # своих броней её не расходует
+    booking_actions = (
+        'create',
+        'update',
+        'partial_update',
+        'hold',
+        'queue_booking',
+    )
 
-    def check_conflicting_dates(
-        self, room, starting_date, ending_date, reservation_id=None
-    ):
-        reserved_dates = room.reserved_dates(reserv_id=reservation_id)
-        reserved_dates = [date.date() for date in reserved_dates]
-        conflicting_dates = [
-            date
-            for date in reserved_dates
-            if starting_date <= date <= ending_date
-        ]
-        return conflicting_dates
+    def get_throttles(self):
+        if self.action in self.booking_actions:
+            return [BookingRateThrottle()]
+        return super().get_throttles()
 
+    @transaction.atomic
     def create(self, request, *args, **kwargs):
         room_id = request.data.get('room')
         starting_date_str = request.data.get('starting_date', None)
@@ -91,30 +309,23 @@ class ReservationViewSet(viewsets.ModelViewSet):
 
         room = get_object_or_404(Room, pk=room_id)
 
-        if not room.active:
-            return Response(
-                {'Room is unavaliable at the moment'},
-                status=status.HTTP_400_BAD_REQUEST,
+        try:
+            nights, total_price = booking.check_stay(
+                room, starting_date, ending_date, request.user.pk
             )
+        except booking.BookingError as error:
+            return Response(error.detail, status=status.HTTP_400_BAD_REQUEST)
 
-        conflicting_dates = self.check_conflicting_dates(
-            room, starting_date, ending_date
-        )
-
-        if conflicting_dates:
-            return Response(
-                {
-                    'error': f'Conflicting dates: {", ".join(map(str, conflicting_dates))}'
-                },
-                status=status.HTTP_400_BAD_REQUEST,
-            )
         serializer = ReservationSerializer(data=request.data)
 
         if serializer.is_valid():
-            serializer.save(user=request.user)
+            serializer.save(
+                user=request.user, nights=nights, total_price=total_price
+            )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @transaction.atomic
     def update(self, request, *args, **kwargs):
 
         room_id = request.data.get('room')
@@ -134,29 +345,29 @@ class ReservationViewSet(viewsets.ModelViewSet):
 
         room = get_object_or_404(Room, pk=room_id)
 
-        if not room.active:
-            return Response(
-                {'Room is unavaliable at the moment'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        conflicting_dates = self.check_conflicting_dates(
-            room, starting_date, ending_date, instance.id
-        )
-
-        if conflicting_dates:
-            return Response(
-                {
-                    'error': f'Conflicting dates: {", ".join(map(str, conflicting_dates))}'
-                },
-                status=status.HTTP_400_BAD_REQUEST,
+        try:
+            nights, total_price = booking.check_stay(
+                room,
+                starting_date,
+                ending_date,
+                request.user.pk,
+                reservation=instance,
             )
+        except booking.BookingError as error:
+            return Response(error.detail, status=status.HTTP_400_BAD_REQUEST)
 
         serializer = self.get_serializer(
             instance, data=request.data, partial=True
         )
         serializer.is_valid(raise_exception=True)
-        serializer.update(instance, serializer.validated_data)
+        serializer.update(
+            instance,
+            {
+                **serializer.validated_data,
+                'nights': nights,
+                'total_price': total_price,
+            },
+        )
         return Response(
             {
                 'message': 'Reservation updated successfully',
@@ -164,10 +375,12 @@ class ReservationViewSet(viewsets.ModelViewSet):
             }
         )
 
+    @transaction.atomic
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
-        room = get_object_or_404(Room, name=instance.room)
-        if not room.refundable:
+        room = instance.room
+        # бронь по типу без комнаты отменяется всегда
+        if room is not None and not room.refundable:
             return Response(
                 {'This room is unrefundable'},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -182,6 +395,173 @@ class ReservationViewSet(viewsets.ModelViewSet):
             {'message': 'Status changed successfully', 'data': serializer.data}
         )
 
+    @swagger_auto_schema(request_body=ReservationSerializer)
+    @action(detail=False, methods=['post'], url_path='holds')
+    def hold(self, request, *args, **kwargs):
+        """Держит комнату BOOKING_HOLD_TIMEOUT секунд на время оплаты."""
+        starting_date_str = request.data.get('starting_date', None)
+        ending_date_str = request.data.get('ending_date', None)
+        if not (starting_date_str and ending_date_str):
+            return Response(
+                {'Invalid time period'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        starting_date = parser.parse(starting_date_str).date()
+        ending_date = parser.parse(ending_date_str).date()
+        room = get_object_or_404(Room, pk=request.data.get('room'))
+        try:
+            nights, total_price = booking.check_stay(
+                room, starting_date, ending_date, request.user.pk
+            )
+        except booking.BookingError as error:
+            return Response(error.detail, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            hold_id = holds.place(
+                room.id, starting_date, ending_date, request.user.pk
+            )
+        except RedisError:
+            return Response(
+                {'Holds are unavailable at the moment'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+        if hold_id is None:
+            return Response(
+                {'Room is on hold'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(
+            {
+                'hold': hold_id,
+                'expires_in': settings.BOOKING_HOLD_TIMEOUT,
+                'room': room.id,
+                'starting_date': starting_date,
+                'ending_date': ending_date,
+                'nights': nights,
+                'total_price': total_price,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path=r'holds/(?P<hold_id>[0-9a-f]{32})/confirm',
+    )
+    @transaction.atomic
+    def confirm_hold(self, request, hold_id=None, *args, **kwargs):
+        """Превращает холд в бронь, холд снимается после коммита."""
+        hold = holds.get(hold_id)
+        if hold is None or hold['user'] != str(request.user.pk):
+            return Response(
+                {'Hold has expired'}, status=status.HTTP_404_NOT_FOUND
+            )
+        starting_date = hold['starting_date']
+        ending_date = hold['ending_date']
+
+        # конкуренция за комнату уже разрешена в redis, блокировка строки
+        # только защищает от повторного подтверждения того же холда
+        room = get_object_or_404(
+            Room.objects.select_for_update(), pk=hold['room']
+        )
+        try:
+            nights, total_price = booking.check_stay(
+                room, starting_date, ending_date, request.user.pk
+            )
+        except booking.BookingError as error:
+            return Response(error.detail, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = ReservationSerializer(
+            data={
+                'room': room.id,
+                'starting_date': day_start(starting_date),
+                'ending_date': day_start(ending_date),
+            }
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save(
+            user=request.user, nights=nights, total_price=total_price
+        )
+        transaction.on_commit(lambda: holds.release(hold))
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        detail=False,
+        methods=['delete'],
+        url_path=r'holds/(?P<hold_id>[0-9a-f]{32})',
+    )
+    def release_hold(self, request, hold_id=None, *args, **kwargs):
+        hold = holds.get(hold_id)
+        if hold is None or hold['user'] != str(request.user.pk):
+            return Response(
+                {'Hold has expired'}, status=status.HTTP_404_NOT_FOUND
+            )
+        holds.release(hold)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @swagger_auto_schema(request_body=ReservationSerializer)
+    @action(detail=False, methods=['post'], url_path='queue')
+    def queue_booking(self, request, *args, **kwargs):
+        """Асинхронная бронь: запрос уходит в очередь раздела комнаты.
+
+        Отвечает 202 сразу, результат - по status_url.
+        """
+        serializer = ReservationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        room = serializer.validated_data.get('room')
+        if room is None:
+            raise ValidationError(detail='Room is required')
+
+        request_id = booking_queue.enqueue(
+            request.user.pk,
+            room.id,
+            serializer.validated_data['starting_date'].date(),
+            serializer.validated_data['ending_date'].date(),
+        )
+        return Response(
+            {
+                'request': request_id,
+                'status': booking_queue.PENDING,
+                'status_url': reverse(
+                    'reservation-booking-status',
+                    args=[request_id],
+                    request=request,
+                ),
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @action(
+        detail=False,
+        methods=['get'],
+        url_path=r'queue/(?P<request_id>[0-9a-f]{32})',
+    )
+    def booking_status(self, request, request_id=None, *args, **kwargs):
+        result = booking_queue.get_status(request_id)
+        if result is None or result.pop('user') != str(request.user.pk):
+            return Response(
+                {'Booking request not found'},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        return Response(result)
+
+    @swagger_auto_schema(request_body=ReviewSerializer)
+    @action(detail=True, methods=['post'])
+    def review(self, request, *args, **kwargs):
+        """Отзыв о завершённой брони, пересчитывает рейтинг комнаты."""
+        reservation = self.get_object()
+        serializer = ReviewSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            review = reviews.create_review(
+                reservation,
+                serializer.validated_data['score'],
+                serializer.validated_data.get('text', ''),
+            )
+        except reviews.ReviewError as error:
+            return Response(error.detail, status=status.HTTP_400_BAD_REQUEST)
+        return Response(
+            ReviewSerializer(review).data, status=status.HTTP_201_CREATED
+        )
+
     def get_permissions(self):
         if self.action == 'create' or 'get':
             return [IsAuthenticated()]
@@ -189,4 +569,161 @@ class ReservationViewSet(viewsets.ModelViewSet):
             return [IsOwnerOrAdminPermission()]
 
     def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return Reservation.objects.none()
         return Reservation.objects.filter(user=self.request.user.id)
+
+    def get_etag_parts(self, request):
+        reservations = self.get_queryset()
+        if self.action == 'retrieve':
+            reservation_id = lookup_uuid(self)
+            if reservation_id is None:
+                return None
+            reservations = reservations.filter(pk=reservation_id)
+        return [request.user.pk, *table_state(reservations)]
+
+
+class OccupancyView(APIView):
+    """Загрузка, проданные ночи и выручка из дневного среза RoomDayStat."""
+
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'start_date',
+                openapi.IN_QUERY,
+                description='Start date of the report',
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                'end_date',
+                openapi.IN_QUERY,
+                description='End date of the report',
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                'group_by',
+                openapi.IN_QUERY,
+                description='day, room or sleeping_area',
+                type=openapi.TYPE_STRING,
+            ),
+        ]
+    )
+    def get(self, request, *args, **kwargs):
+        group_by = request.query_params.get('group_by', 'day')
+        if group_by not in GROUP_FIELDS:
+            raise ValidationError(detail='Invalid group_by')
+        date_range = parse_date_range(request.query_params)
+        if date_range is None:
+            raise ValidationError(detail='Invalid time period')
+        return Response(report(*date_range, group_by))
+
+
+class ReservationExportView(APIView):
+    """Потоковая выгрузка всех броней в CSV или NDJSON для финансов.
+
+    Параметр называется export_format, потому что format DRF использует
+    для выбора рендерера.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'export_format',
+                openapi.IN_QUERY,
+                description='csv or ndjson',
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                'start_date',
+                openapi.IN_QUERY,
+                description='Reservations ending on or after this date',
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                'end_date',
+                openapi.IN_QUERY,
+                description='Reservations starting on or before this date',
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                'status',
+                openapi.IN_QUERY,
+                description='Reservation status, may be repeated',
+                type=openapi.TYPE_STRING,
+            ),
+        ]
+    )
+    def get(self, request, *args, **kwargs):
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format not in export.FORMATS:
+            raise ValidationError(detail='Invalid export_format')
+        statuses = request.query_params.getlist('status')
+        if set(statuses) - set(Reservation.Status.values):
+            raise ValidationError(detail='Invalid status')
+        try:
+            start_date = export.parse_date(
+                request.query_params.get('start_date')
+            )
+            end_date = export.parse_date(request.query_params.get('end_date'))
+        except ValueError:
+            raise ValidationError(detail='Invalid time period')
+        if start_date and end_date and start_date > end_date:
+            raise ValidationError(detail='Invalid time period')
+
+        _, content_type = export.FORMATS[export_format]
+        response = StreamingHttpResponse(
+            export.stream(export_format, start_date, end_date, statuses),
+            content_type=content_type,
+        )
+        response[
+            'Content-Disposition'
+        ] = f'attachment; filename="reservations.{export_format}"'
+        return response
+
+
+class AuditPagination(PageNumberPagination):
+    page_size = 100
+
+
+class ReservationAuditView(generics.ListAPIView):
+    """История изменений броней по брони или по комнате."""
+
+    permission_classes = [IsAdminUser]
+    serializer_class = ReservationAuditSerializer
+    pagination_class = AuditPagination
+
+    @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'reservation',
+                openapi.IN_QUERY,
+                description='Reservation id',
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                'room',
+                openapi.IN_QUERY,
+                description='Room id, used if reservation is not set',
+                type=openapi.TYPE_STRING,
+            ),
+        ]
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return audit.for_reservation(None).none()
+        params = self.request.query_params
+        try:
+            if params.get('reservation'):
+                return audit.for_reservation(uuid.UUID(params['reservation']))
+            if params.get('room'):
+                return audit.for_room(uuid.UUID(params['room']))
+        except ValueError:
+            raise ValidationError(detail='Invalid id')
+        raise ValidationError(detail='reservation or room is required')
@@ -6,4 +6,5 @@ class RoomsConfig(AppConfig):
     name = 'rooms'
 
     def ready(self):
+        import rooms.analytics
         import rooms.signals
@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connection
+
+from . import outbox
+from .models import ReservationAudit
+
+# Кто и откуда меняет брони. Middleware кладёт сюда запрос, пользователь
+# берётся из него в момент изменения, когда DRF уже проверил токен.
+# Задачи и команды задают источник через context().
+_context = ContextVar('audit_context', default=None)
+
+SYSTEM = 'system'
+
+COLUMNS = (
+    'event_id',
+    'reservation_id',
+    'room_id',
+    'action',
+    'before',
+    'after',
+    'actor_id',
+    'source',
+    'changed_at',
+)
+
+
+@contextmanager
+def context(source, request=None):
+    token = _context.set({'source': source, 'request': request})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def current():
+    """actor_id и source для события outbox."""
+    state = _context.get()
+    if state is None:
+        return None, SYSTEM
+    user = getattr(state['request'], 'user', None)
+    actor_id = user.pk if user is not None and user.is_authenticated else None
+    return actor_id, state['source']
+
+
+def action(payload):
+    if payload['before'] is None:
+        return ReservationAudit.Action.Created
+    if payload['after'] is None:
+        return ReservationAudit.Action.Deleted
+    return ReservationAudit.Action.Changed
+
+
+def room_id(payload):
+    state = payload['after'] or payload['before']
+    return state['room_id']
+
+
+def csv_rows(payloads):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for payload in payloads:
+        writer.writerow(
+            [
+                payload['event_id'],
+                payload['reservation'],
+                room_id(payload) or None,
+                str(action(payload)),
+                payload['before'] and json.dumps(payload['before']),
+                payload['after'] and json.dumps(payload['after']),
+                payload['actor'],
+                payload['source'],
+                payload['changed_at'],
+            ]
+        )
+    buffer.seek(0)
+    return buffer
+
+
+@outbox.handler(outbox.RESERVATION_CHANGED)
+def write(payloads):
+    """Пишет пачку событий одним COPY.
+
+    COPY идёт во временную таблицу, откуда строки переносятся с
+    ON CONFLICT DO NOTHING: outbox доставляет пачки at-least-once.
+    """
+    # события, записанные до появления аудита, без event_id
+    payloads = [payload for payload in payloads if 'event_id' in payload]
+    if not payloads:
+        return
+    table = ReservationAudit._meta.db_table.replace('"."', '.')
+    columns = ', '.join(COLUMNS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMP TABLE IF NOT EXISTS reservation_audit_batch AS '
+            f'SELECT {columns} FROM {table} WITH NO DATA'
+        )
+        cursor.copy_expert(
+            f'COPY reservation_audit_batch ({columns}) FROM STDIN '
+            'WITH (FORMAT csv)',
+            csv_rows(payloads),
+        )
+        cursor.execute(
+            f'INSERT INTO {table} ({columns}) '
+            f'SELECT {columns} FROM reservation_audit_batch '
+            'ON CONFLICT (event_id) DO NOTHING'
+        )
+        cursor.execute('TRUNCATE reservation_audit_batch')
+
+
+def for_reservation(reservation_id):
+    return ReservationAudit.objects.filter(
+        reservation_id=reservation_id
+    ).order_by('changed_at', 'id')
+
+
+def for_room(room_id):
+    return ReservationAudit.objects.filter(room_id=room_id).order_by(
+        'changed_at', 'id'
+    )
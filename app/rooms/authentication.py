@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+USER_CACHE_KEY = 'auth:user:{}'
+
+# чего хватает представлениям и правам доступа, остальные данные
+# пользователя (пароль, почта) в кэш не попадают
+CACHED_USER_FIELDS = ('pk', 'is_active', 'is_staff', 'is_superuser')
+
+
+def user_cache_key(user_id):
+    return USER_CACHE_KEY.format(user_id)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация без запроса в БД на каждый вызов.
+
+    Поля CACHED_USER_FIELDS (и отпечаток пароля при CHECK_REVOKE_TOKEN)
+    кэшируются на AUTH_USER_CACHE_TIMEOUT секунд, запись сбрасывается
+    сигналами при изменении пользователя, его групп и прав (rooms.signals).
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+        key = user_cache_key(user_id)
+        state = cache.get(key)
+        if state is None:
+            state = self.load_state(user_id)
+            cache.set(key, state, settings.AUTH_USER_CACHE_TIMEOUT)
+
+        if not state['is_active']:
+            raise AuthenticationFailed(
+                'User is inactive', code='user_inactive'
+            )
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(
+            api_settings.REVOKE_TOKEN_CLAIM
+        ) != state.get('password_hash'):
+            raise AuthenticationFailed(
+                "The user's password has been changed.",
+                code='password_changed',
+            )
+
+        return self.user_model(
+            **{field: state[field] for field in CACHED_USER_FIELDS}
+        )
+
+    def load_state(self, user_id):
+        try:
+            user = self.user_model.objects.get(
+                **{api_settings.USER_ID_FIELD: user_id}
+            )
+        except self.user_model.DoesNotExist:
+            raise AuthenticationFailed('User not found', code='user_not_found')
+
+        state = {field: getattr(user, field) for field in CACHED_USER_FIELDS}
+        if api_settings.CHECK_REVOKE_TOKEN:
+            state['password_hash'] = get_md5_hash_password(user.password)
+        return state
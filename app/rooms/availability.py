@@ -0,0 +1,298 @@
+import json
+from collections import defaultdict
+from datetime import datetime, time, timedelta, timezone
+
+from dateutil import rrule
+from django.db import connection, models, transaction
+from django.db.models.functions import Cast
+from redis import RedisError
+
+from . import outbox
+from .models import Reservation, Room, RoomClosure
+from .redis import get_async_redis, get_redis
+
+AVAILABILITY_VERSION_KEY = 'rooms:availability:version'
+AVAILABILITY_CHANNEL = 'rooms:availability'
+
+BLOCKING_STATUSES = (Reservation.Status.Booked, Reservation.Status.Active)
+
+RESERVED = 'reserved'
+FREE = 'free'
+
+# Пакетная проверка: периоды запроса разворачиваются из массивов, для
+# каждого берутся брони и закрытия комнаты, пересекающие именно его период.
+# Весь пакет - один запрос, брони ищутся по reservation_room_active_idx.
+CHECK_STAYS = """
+SELECT q.idx, rm.active, b.starting_date, b.ending_date
+FROM unnest(%(rooms)s::uuid[], %(starts)s::date[], %(ends)s::date[])
+    WITH ORDINALITY AS q (room_id, start_day, end_day, idx)
+LEFT JOIN {rooms} AS rm ON rm.id = q.room_id
+LEFT JOIN LATERAL (
+    SELECT r.starting_date::date, r.ending_date::date
+    FROM {reservations} AS r
+    WHERE r.room_id = q.room_id
+        AND r.status = ANY(%(statuses)s)
+        AND r.starting_date < q.end_day + 1
+        AND r.ending_date >= q.start_day
+    UNION ALL
+    SELECT c.starting_date, c.ending_date
+    FROM {closures} AS c
+    WHERE c.room_id = q.room_id
+        AND c.starting_date <= q.end_day
+        AND c.ending_date >= q.start_day
+) AS b (starting_date, ending_date) ON true
+"""
+
+
+def day_start(date):
+    return datetime.combine(date, time.min, tzinfo=timezone.utc)
+
+
+def stay_dates(start_date, end_date):
+    """Все дни периода включительно, в том же виде, что и Room.reserved_dates."""
+    return list(rrule.rrule(rrule.DAILY, dtstart=start_date, until=end_date))
+
+
+def overlapping_reservations(
+    start_date, end_date, room_ids=None, exclude=None
+):
+    """Активные брони, пересекающие период, одним запросом.
+
+    exclude - id изменяемой брони, её собственные даты свободны.
+    """
+    queryset = Reservation.objects.booked_and_active().filter(
+        starting_date__lt=day_start(end_date + timedelta(days=1)),
+        ending_date__gte=day_start(start_date),
+    )
+    if room_ids is not None:
+        queryset = queryset.filter(room__in=room_ids)
+    if exclude is not None:
+        queryset = queryset.exclude(pk=exclude)
+    return queryset.values_list('room_id', 'starting_date', 'ending_date')
+
+
+def closure_rows(queryset):
+    # даты закрытия приводятся к timestamptz, чтобы строки объединялись с
+    # бронями одним UNION ALL
+    return queryset.values_list(
+        'room_id',
+        Cast('starting_date', models.DateTimeField()),
+        Cast('ending_date', models.DateTimeField()),
+    )
+
+
+def overlapping_closures(start_date, end_date, room_ids=None):
+    queryset = RoomClosure.objects.filter(
+        starting_date__lte=end_date, ending_date__gte=start_date
+    )
+    if room_ids is not None:
+        queryset = queryset.filter(room__in=room_ids)
+    return closure_rows(queryset)
+
+
+def blocked_intervals(start_date, end_date, room_ids=None, exclude=None):
+    """Брони и закрытия, пересекающие период, одним запросом."""
+    return overlapping_reservations(
+        start_date, end_date, room_ids, exclude
+    ).union(overlapping_closures(start_date, end_date, room_ids), all=True)
+
+
+def room_reservations(room_ids, exclude=None):
+    queryset = Reservation.objects.booked_and_active().filter(
+        room__in=room_ids
+    )
+    if exclude is not None:
+        queryset = queryset.exclude(pk=exclude)
+    return queryset.values_list('room_id', 'starting_date', 'ending_date')
+
+
+def room_blocked_intervals(room_ids, exclude=None):
+    closures = RoomClosure.objects.filter(
+        room__in=room_ids, ending_date__gte=datetime.now(timezone.utc).date()
+    )
+    return room_reservations(room_ids, exclude).union(
+        closure_rows(closures), all=True
+    )
+
+
+def group_reserved_dates(rows):
+    reserved_dates = defaultdict(list)
+    for room_id, starting_date, ending_date in rows:
+        reserved_dates[room_id].extend(
+            stay_dates(starting_date.date(), ending_date.date())
+        )
+    return reserved_dates
+
+
+def fully_booked(rows, start_date, end_date):
+    """Комнаты, у которых заняты все дни периода."""
+    period = set(stay_dates(start_date, end_date))
+    return {
+        room_id
+        for room_id, dates in group_reserved_dates(rows).items()
+        if period.issubset(dates)
+    }
+
+
+def reserved_dates_by_room(room_ids, exclude=None):
+    return group_reserved_dates(room_blocked_intervals(room_ids, exclude))
+
+
+def fully_booked_room_ids(start_date, end_date, room_ids=None):
+    rows = blocked_intervals(start_date, end_date, room_ids)
+    return fully_booked(rows, start_date, end_date)
+
+
+async def areserved_dates_by_room(room_ids):
+    rows = [row async for row in room_blocked_intervals(room_ids)]
+    return group_reserved_dates(rows)
+
+
+async def afully_booked_room_ids(start_date, end_date, room_ids=None):
+    rows = [
+        row async for row in blocked_intervals(start_date, end_date, room_ids)
+    ]
+    return fully_booked(rows, start_date, end_date)
+
+
+def merge_intervals(intervals):
+    """Сливает пересекающиеся и соседние интервалы дней (включительно)."""
+    merged = []
+    for start_date, end_date in sorted(intervals):
+        if merged and start_date <= merged[-1][1] + timedelta(days=1):
+            merged[-1][1] = max(merged[-1][1], end_date)
+        else:
+            merged.append([start_date, end_date])
+    return [tuple(interval) for interval in merged]
+
+
+def check_stays(stays, held_rows=()):
+    """Доступность пакета периодов stays (room, start_date, end_date).
+
+    held_rows - строки holds.held_stays, холды лежат в redis и
+    добавляются к ответу базы. Для каждого периода возвращает available и
+    занятые интервалы внутри него; blocked None - комнаты нет или она
+    неактивна.
+    """
+    if not stays:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            CHECK_STAYS.format(
+                rooms=Room._meta.db_table.replace('"."', '.'),
+                reservations=Reservation._meta.db_table.replace('"."', '.'),
+                closures=RoomClosure._meta.db_table.replace('"."', '.'),
+            ),
+            {
+                'rooms': [stay['room'] for stay in stays],
+                'starts': [stay['start_date'] for stay in stays],
+                'ends': [stay['end_date'] for stay in stays],
+                'statuses': [str(status) for status in BLOCKING_STATUSES],
+            },
+        )
+        rows = cursor.fetchall()
+
+    active = {}
+    blocked = defaultdict(list)
+    for idx, is_active, starting_date, ending_date in rows:
+        active[idx - 1] = is_active
+        if starting_date is not None:
+            blocked[idx - 1].append((starting_date, ending_date))
+
+    stays_by_room = defaultdict(list)
+    for i, stay in enumerate(stays):
+        stays_by_room[stay['room']].append(i)
+    for room_id, starting_date, ending_date in held_rows:
+        for i in stays_by_room.get(room_id, ()):
+            blocked[i].append((starting_date.date(), ending_date.date()))
+
+    results = []
+    for i, stay in enumerate(stays):
+        result = {**stay, 'available': False, 'blocked': None}
+        if active.get(i):
+            intervals = merge_intervals(
+                (max(start, stay['start_date']), min(end, stay['end_date']))
+                for start, end in blocked[i]
+                if start <= stay['end_date'] and end >= stay['start_date']
+            )
+            result['available'] = not intervals
+            result['blocked'] = intervals
+        results.append(result)
+    return results
+
+
+def bump_version():
+    """Сбрасывает закэшированные результаты поиска после коммита."""
+
+    def bump():
+        try:
+            get_redis().incr(AVAILABILITY_VERSION_KEY)
+        except RedisError:
+            pass
+
+    transaction.on_commit(bump)
+
+
+async def aget_version():
+    version = await get_async_redis().get(AVAILABILITY_VERSION_KEY)
+    return int(version or 0)
+
+
+def stay_range(state):
+    return (
+        state['room_id'],
+        state['starting_date'].date(),
+        state['ending_date'].date(),
+    )
+
+
+def reservation_deltas(reservation, deleted=False):
+    """Изменения доступности, которые вызвало сохранение или удаление брони.
+
+    Сравнивает состояние брони при загрузке из БД с текущим: освобождённый
+    период приходит как FREE, занятый как RESERVED.
+    """
+    before = reservation._loaded_state
+    after = None if deleted else reservation.current_state()
+
+    # бронь по типу без назначенной комнаты доступность комнат не меняет
+    was_blocking = (
+        before is not None
+        and before['room_id'] is not None
+        and before['status'] in BLOCKING_STATUSES
+    )
+    is_blocking = (
+        after is not None
+        and after['room_id'] is not None
+        and after['status'] in BLOCKING_STATUSES
+    )
+    moved = (
+        was_blocking
+        and is_blocking
+        and stay_range(before) != stay_range(after)
+    )
+
+    deltas = []
+    if was_blocking and (not is_blocking or moved):
+        deltas.append((*stay_range(before), FREE))
+    if is_blocking and (not was_blocking or moved):
+        deltas.append((*stay_range(after), RESERVED))
+    return [
+        {
+            'room': str(room_id),
+            'start_date': start_date.isoformat(),
+            'end_date': end_date.isoformat(),
+            'state': state,
+        }
+        for room_id, start_date, end_date, state in deltas
+    ]
+
+
+@outbox.handler(outbox.RESERVATION_CHANGED)
+def publish_deltas(payloads):
+    """Рассылает изменения доступности подписчикам потока."""
+    with get_redis().pipeline(transaction=False) as pipe:
+        for payload in payloads:
+            for delta in payload['deltas']:
+                pipe.publish(AVAILABILITY_CHANNEL, json.dumps(delta))
+        pipe.execute()
@@ -1,43 +1,64 @@
 from datetime import datetime, timedelta
 
-from dateutil import parser, rrule
+from dateutil import parser
+from django.contrib.postgres.search import TrigramWordSimilarity
 from django.db.models import Q
-from drf_yasg.openapi import IN_QUERY, TYPE_STRING, Parameter
+from django.db.models.functions import Greatest
 from rest_framework import filters
 from rest_framework.exceptions import ValidationError
 
+from .availability import blocked_intervals, fully_booked
+from .holds import aheld_stays, held_stays
+from .pricing import aquote, quote
 
-class DateRangeFilterBackend(filters.BaseFilterBackend):
-    def filter_queryset(self, request, queryset, view):
-        start_date_str = request.query_params.get('start_date', None)
-        end_date_str = request.query_params.get('end_date', None)
-        try:
-            if not start_date_str:
-                start_date = datetime.now().date()
-            else:
-                start_date = parser.parse(start_date_str).date()
 
-            if not end_date_str:
-                end_date = datetime.now().date() + timedelta(weeks=2)
-            else:
-                end_date = parser.parse(end_date_str).date()
+def parse_date_range(query_params):
+    """Период поиска из query-параметров, по умолчанию две недели от сегодня.
 
-        except ValueError:
-            return queryset
+    Возвращает None, если даты не удалось разобрать.
+    """
+    start_date_str = query_params.get('start_date', None)
+    end_date_str = query_params.get('end_date', None)
+    try:
+        if not start_date_str:
+            start_date = datetime.now().date()
+        else:
+            start_date = parser.parse(start_date_str).date()
 
-        if start_date > end_date:
-            raise ValidationError(detail='Invalid time period')
+        if not end_date_str:
+            end_date = datetime.now().date() + timedelta(weeks=2)
+        else:
+            end_date = parser.parse(end_date_str).date()
 
-        rule = rrule.rrule(rrule.DAILY, dtstart=start_date, until=end_date)
-        set_dates = set(list(rule))
+    except ValueError:
+        return None
 
-        queryset = [
-            entity
-            for entity in queryset
-            if not all(elem in entity.reserved_dates() for elem in set_dates)
-        ]
+    if start_date > end_date:
+        raise ValidationError(detail='Invalid time period')
 
-        return queryset
+    return start_date, end_date
+
+
+class DateRangeFilterBackend(filters.BaseFilterBackend):
+    """Исключает комнаты, занятые на весь период бронями, закрытиями, холдами."""
+
+    def filter_queryset(self, request, queryset, view):
+        date_range = parse_date_range(request.query_params)
+        if date_range is None:
+            return queryset
+
+        rows = list(blocked_intervals(*date_range))
+        rows += held_stays(*date_range)
+        return queryset.exclude(id__in=fully_booked(rows, *date_range))
+
+    async def afilter_queryset(self, request, queryset, view):
+        date_range = parse_date_range(request.query_params)
+        if date_range is None:
+            return queryset
+
+        rows = [row async for row in blocked_intervals(*date_range)]
+        rows += await aheld_stays(*date_range)
+        return queryset.exclude(id__in=fully_booked(rows, *date_range))
 
 
 class DayCostFilter(filters.BaseFilterBackend):
@@ -58,3 +79,108 @@ class TravellersFilter(filters.BaseFilterBackend):
             return queryset
 
         return queryset.filter(travellers__gte=travellers)
+
+
+class RoomSearchFilter(filters.BaseFilterBackend):
+    """Поиск ?q= по названию и номеру комнаты с учётом опечаток.
+
+    Оператор <% (word similarity) обслуживается GIN-индексами pg_trgm,
+    поэтому поиск сочетается с остальными фильтрами в одном запросе.
+    Без явного ordering результаты сортируются по похожести.
+    """
+
+    search_param = 'q'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+
+        if not query:
+            return queryset
+
+        queryset = queryset.filter(
+            Q(name__trigram_word_similar=query)
+            | Q(number__trigram_word_similar=query)
+        ).annotate(
+            similarity=Greatest(
+                TrigramWordSimilarity(query, 'name'),
+                TrigramWordSimilarity(query, 'number'),
+            )
+        )
+        if not request.query_params.get('ordering'):
+            queryset = queryset.order_by('-similarity')
+        return queryset
+
+
+class StayPriceFilter(filters.BaseFilterBackend):
+    """Стоимость проживания за период поиска по тарифам комнат.
+
+    Считается, если задан период, max_total_price или ordering=total_price.
+    Комнаты, для которых период короче минимального срока, исключаются.
+    Возвращает список комнат с атрибутом total_price, поэтому должен идти
+    последним среди фильтров.
+    """
+
+    ordering_param = 'ordering'
+
+    def is_requested(self, query_params):
+        return bool(
+            query_params.get('start_date')
+            or query_params.get('end_date')
+            or query_params.get('max_total_price')
+            or self.get_ordering(query_params)
+        )
+
+    def get_ordering(self, query_params):
+        ordering = query_params.get(self.ordering_param, '')
+        for term in ordering.split(','):
+            if term.strip() in ('total_price', '-total_price'):
+                return term.strip()
+        return None
+
+    def apply_prices(self, query_params, rooms, prices):
+        max_total_price = query_params.get('max_total_price', None)
+        try:
+            max_total_price = float(max_total_price) if max_total_price else None
+        except ValueError:
+            raise ValidationError(detail='Invalid max_total_price')
+
+        result = []
+        for room in rooms:
+            room.total_price = prices[room.id]
+            if room.total_price is None:
+                continue
+            if max_total_price is not None and room.total_price > max_total_price:
+                continue
+            result.append(room)
+
+        ordering = self.get_ordering(query_params)
+        if ordering:
+            result.sort(
+                key=lambda room: room.total_price,
+                reverse=ordering.startswith('-'),
+            )
+        return result
+
+    def filter_queryset(self, request, queryset, view):
+        if not self.is_requested(request.query_params):
+            return queryset
+        date_range = parse_date_range(request.query_params)
+        if date_range is None:
+            return queryset
+
+        rooms = list(queryset)
+        prices = quote([(room.id, room.day_cost) for room in rooms], *date_range)
+        return self.apply_prices(request.query_params, rooms, prices)
+
+    async def afilter_queryset(self, request, queryset, view):
+        if not self.is_requested(request.query_params):
+            return queryset
+        date_range = parse_date_range(request.query_params)
+        if date_range is None:
+            return queryset
+
+        rooms = [room async for room in queryset]
+        prices = await aquote(
+            [(room.id, room.day_cost) for room in rooms], *date_range
+        )
+        return self.apply_prices(request.query_params, rooms, prices)
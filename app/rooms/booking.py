@@ -0,0 +1,77 @@
+from . import holds, inventory
+from .availability import blocked_intervals, stay_dates
+from .pricing import price_room_type, price_stay
+
+
+class BookingError(Exception):
+    """Бронь невозможна, detail отдаётся клиенту как тело ответа 400."""
+
+    def __init__(self, detail):
+        super().__init__(detail)
+        self.detail = detail
+
+
+def conflicting_dates(room, starting_date, ending_date, reservation_id=None):
+    """Занятые бронями и закрытиями дни периода, одним запросом."""
+    reserved_dates = set()
+    for _, start, end in blocked_intervals(
+        starting_date, ending_date, [room.id], exclude=reservation_id
+    ):
+        reserved_dates.update(
+            date.date() for date in stay_dates(start.date(), end.date())
+        )
+    return sorted(
+        date for date in reserved_dates if starting_date <= date <= ending_date
+    )
+
+
+def check_stay(room, starting_date, ending_date, user_id, reservation=None):
+    """Проверки перед бронью комнаты, общие для API и очереди броней.
+
+    Возвращает nights и total_price или бросает BookingError. reservation -
+    изменяемая бронь, её собственные даты свободны.
+    """
+    if not room.active:
+        raise BookingError({'Room is unavaliable at the moment'})
+
+    conflicts = conflicting_dates(
+        room,
+        starting_date,
+        ending_date,
+        reservation.id if reservation else None,
+    )
+    if conflicts:
+        raise BookingError(
+            {'error': f'Conflicting dates: {", ".join(map(str, conflicts))}'}
+        )
+    if holds.is_held(room.id, starting_date, ending_date, user_id):
+        raise BookingError({'Room is on hold'})
+
+    if starting_date > ending_date:
+        raise BookingError({'Invalid time period'})
+    if room.room_type_id and not inventory.has_vacancy(
+        room.room_type_id, starting_date, ending_date, exclude=reservation
+    ):
+        raise BookingError({'No vacancy for this room type'})
+    nights, total_price = price_stay(room, starting_date, ending_date)
+    if total_price is None:
+        raise BookingError(
+            {'Stay is shorter than the minimum for these dates'}
+        )
+    return nights, total_price
+
+
+def check_type_stay(room_type, starting_date, ending_date):
+    """Проверки перед бронью по типу, комнату назначит assign_room."""
+    if starting_date > ending_date:
+        raise BookingError({'Invalid time period'})
+    if not inventory.has_vacancy(room_type.id, starting_date, ending_date):
+        raise BookingError({'No vacancy for this room type'})
+    nights, total_price = price_room_type(
+        room_type, starting_date, ending_date
+    )
+    if total_price is None:
+        raise BookingError(
+            {'Stay is shorter than the minimum for these dates'}
+        )
+    return nights, total_price
@@ -0,0 +1,236 @@
+import json
+import logging
+import uuid
+from datetime import date
+
+from celery import current_app
+from django.conf import settings
+from django.db import transaction
+from redis import ResponseError
+from redis.exceptions import LockError
+
+from . import booking
+from .availability import day_start
+from .models import Reservation, Room
+from .redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+STREAM_KEY = 'bookings:stream:{}'
+LOCK_KEY = 'bookings:lock:{}'
+REQUEST_KEY = 'bookings:request:{}'
+GROUP = 'bookings'
+# раздел обрабатывает один воркер под блокировкой, имя потребителя общее,
+# поэтому недоподтверждённые после падения записи подхватит следующий запуск
+CONSUMER = 'consumer'
+
+PENDING = 'pending'
+CONFIRMED = 'confirmed'
+REJECTED = 'rejected'
+FAILED = 'failed'
+
+
+def partition(room_id):
+    """Раздел очереди комнаты, все брони одной комнаты идут в один раздел."""
+    return uuid.UUID(str(room_id)).int % settings.BOOKING_QUEUE_PARTITIONS
+
+
+def dispatch(partition_number):
+    current_app.send_task(
+        'app.tasks.process_booking_partition', args=[partition_number]
+    )
+
+
+def enqueue(user_id, room_id, starting_date, ending_date):
+    """Ставит запрос брони в раздел комнаты и возвращает id запроса."""
+    request_id = uuid.uuid4().hex
+    partition_number = partition(room_id)
+    pipeline = get_redis().pipeline()
+    pipeline.hset(
+        REQUEST_KEY.format(request_id),
+        mapping={'status': PENDING, 'user': str(user_id)},
+    )
+    pipeline.expire(
+        REQUEST_KEY.format(request_id), settings.BOOKING_REQUEST_TIMEOUT
+    )
+    pipeline.xadd(
+        STREAM_KEY.format(partition_number),
+        {
+            'request': request_id,
+            'user': str(user_id),
+            'room': str(room_id),
+            'starting_date': starting_date.isoformat(),
+            'ending_date': ending_date.isoformat(),
+        },
+    )
+    pipeline.execute()
+    dispatch(partition_number)
+    return request_id
+
+
+def get_status(request_id):
+    values = get_redis().hgetall(REQUEST_KEY.format(request_id))
+    if not values:
+        return None
+    result = {key.decode(): value.decode() for key, value in values.items()}
+    if 'error' in result:
+        result['error'] = json.loads(result['error'])
+    return result
+
+
+def set_status(request_id, status, **fields):
+    get_redis().hset(
+        REQUEST_KEY.format(request_id), mapping={'status': status, **fields}
+    )
+
+
+def apply(fields):
+    """Бронь по записи очереди, повторная доставка ничего не меняет.
+
+    Бронь хранит id запроса, так что запись, доставленная повторно после
+    падения между коммитом и set_status, находит свою бронь, а не
+    конфликтует с ней.
+    """
+    request_id = fields['request']
+    current = get_redis().hget(REQUEST_KEY.format(request_id), 'status')
+    if current is not None and current.decode() != PENDING:
+        return
+
+    starting_date = date.fromisoformat(fields['starting_date'])
+    ending_date = date.fromisoformat(fields['ending_date'])
+    try:
+        with transaction.atomic():
+            room = (
+                Room.objects.select_for_update()
+                .filter(pk=fields['room'])
+                .first()
+            )
+            if room is None:
+                raise booking.BookingError({'Room not found'})
+            reservation = Reservation.objects.filter(
+                queue_request=request_id
+            ).first()
+            if reservation is None:
+                nights, total_price = booking.check_stay(
+                    room, starting_date, ending_date, fields['user']
+                )
+                reservation = Reservation.objects.create(
+                    room=room,
+                    user_id=fields['user'],
+                    starting_date=day_start(starting_date),
+                    ending_date=day_start(ending_date),
+                    nights=nights,
+                    total_price=total_price,
+                    queue_request=request_id,
+                )
+    except booking.BookingError as error:
+        set_status(
+            request_id,
+            REJECTED,
+            error=json.dumps(
+                error.detail
+                if isinstance(error.detail, dict)
+                else list(error.detail)
+            ),
+        )
+        return
+    set_status(request_id, CONFIRMED, reservation=str(reservation.id))
+
+
+def deliver(client, stream, message_id, fields):
+    """Применяет запись очереди, False - запись нужно повторить позже.
+
+    Ошибка, отличная от BookingError, оставляет запись неподтверждённой.
+    После BOOKING_QUEUE_MAX_ATTEMPTS доставок (счётчик XPENDING) запрос
+    помечается failed, а запись снимается, чтобы не держать весь раздел.
+    """
+    fields = {key.decode(): value.decode() for key, value in fields.items()}
+    try:
+        apply(fields)
+    except Exception:
+        logger.exception('Booking request %s failed', fields.get('request'))
+        pending = client.xpending_range(
+            stream, GROUP, min=message_id, max=message_id, count=1
+        )
+        attempts = pending[0]['times_delivered'] if pending else 1
+        if attempts < settings.BOOKING_QUEUE_MAX_ATTEMPTS:
+            return False
+        if 'request' in fields:
+            set_status(fields['request'], FAILED)
+    return True
+
+
+def ensure_group(client, stream):
+    try:
+        client.xgroup_create(stream, GROUP, id='0', mkstream=True)
+    except ResponseError as error:
+        if 'BUSYGROUP' not in str(error):
+            raise
+
+
+def consume(partition_number, batch_size=None):
+    """Последовательно применяет записи раздела.
+
+    Раздел обрабатывается одним воркером под блокировкой в redis, разные
+    разделы - параллельно, так что популярная комната задерживает только
+    свой раздел.
+    """
+    batch_size = batch_size or settings.BOOKING_QUEUE_BATCH_SIZE
+    client = get_redis()
+    stream = STREAM_KEY.format(partition_number)
+    lock = client.lock(
+        LOCK_KEY.format(partition_number),
+        timeout=settings.BOOKING_QUEUE_LOCK_TIMEOUT,
+    )
+    if not lock.acquire(blocking=False):
+        return 0
+
+    processed = 0
+    stalled = False
+    try:
+        ensure_group(client, stream)
+        # сначала записи, выданные упавшему воркеру, затем новые
+        last_id = '0'
+        while not stalled:
+            response = client.xreadgroup(
+                GROUP, CONSUMER, {stream: last_id}, count=batch_size
+            )
+            messages = response[0][1] if response else []
+            if not messages:
+                if last_id == '0':
+                    last_id = '>'
+                    continue
+                break
+            for message_id, fields in messages:
+                if fields and not deliver(client, stream, message_id, fields):
+                    # порядок раздела сохраняется: запись повторит
+                    # drain_booking_queue, следующие ждут её
+                    stalled = True
+                    break
+                client.xack(stream, GROUP, message_id)
+                client.xdel(stream, message_id)
+                processed += 1
+            lock.reacquire()
+    finally:
+        try:
+            lock.release()
+        except LockError:
+            logger.warning(
+                'Booking partition %s lock expired', partition_number
+            )
+
+    # запись могла прийти, пока блокировка ещё была занята
+    if not stalled and client.xlen(stream):
+        dispatch(partition_number)
+    return processed
+
+
+def busy_partitions():
+    pipeline = get_redis().pipeline()
+    for partition_number in range(settings.BOOKING_QUEUE_PARTITIONS):
+        pipeline.xlen(STREAM_KEY.format(partition_number))
+    return [
+        partition_number
+        for partition_number, length in enumerate(pipeline.execute())
+        if length
+    ]
@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import availability, inventory, outbox
+from .availability import day_start
+from .models import OutboxEvent, Reservation
+from .signals import reservation_change_payload
+
+
+def affected_reservations(closures):
+    """Действующие брони, пересекающие любое из закрытий."""
+    query = Q()
+    for closure in closures:
+        query |= Q(
+            room=closure.room_id,
+            starting_date__lt=day_start(
+                closure.ending_date + timedelta(days=1)
+            ),
+            ending_date__gte=day_start(closure.starting_date),
+        )
+    return Reservation.objects.booked_and_active().filter(query)
+
+
+@transaction.atomic
+def refuse_affected_reservations(closures):
+    """Отменяет брони, попавшие на закрытия, одним UPDATE.
+
+    update() не вызывает сигналы, поэтому их работа сделана здесь явно:
+    события outbox пишутся одним bulk_create, пулы типов пересчитываются,
+    кэш поиска сбрасывается.
+    """
+    closures = list(closures)
+    if not closures:
+        return 0
+    reservations = list(
+        affected_reservations(closures).select_for_update(of=('self',))
+    )
+    if not reservations:
+        return 0
+
+    refused = Reservation.objects.filter(
+        id__in=[reservation.id for reservation in reservations]
+    ).update(status=Reservation.Status.Refused, updated_at=timezone.now())
+
+    events = []
+    for reservation in reservations:
+        reservation.status = Reservation.Status.Refused
+        events.append(
+            OutboxEvent(
+                topic=outbox.RESERVATION_CHANGED,
+                payload=reservation_change_payload(reservation),
+            )
+        )
+    OutboxEvent.objects.bulk_create(events)
+
+    room_type_ids = {
+        reservation.room_type_id for reservation in reservations
+    } - {None}
+    for room_type_id in room_type_ids:
+        inventory.rebuild(room_type_id)
+    availability.bump_version()
+    return refused
@@ -0,0 +1,129 @@
+import hashlib
+import uuid
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import parse_etags
+from redis import RedisError
+from rest_framework import status
+from rest_framework.response import Response
+
+from .availability import AVAILABILITY_VERSION_KEY
+from .models import Reservation, Room, RoomClosure, RoomRate
+from .redis import get_redis
+
+
+def table_state(queryset):
+    """Число строк и max(updated_at), меняются при любой записи."""
+    state = queryset.aggregate(count=Count('pk'), updated=Max('updated_at'))
+    return state['count'], state['updated'] and state['updated'].isoformat()
+
+
+def holds_version():
+    # холды живут в redis и учитываются только через счётчик версии
+    try:
+        return get_redis().get(AVAILABILITY_VERSION_KEY)
+    except RedisError:
+        return None
+
+
+def today():
+    """Даты, от которых зависит представление комнат.
+
+    Окно дат по умолчанию (rooms.backends) и отсечка прошедших дат, после
+    полуночи то же состояние таблиц даёт другое тело ответа.
+    """
+    return [date.today(), timezone.now().date()]
+
+
+def room_state(room_id=None):
+    """Состояние комнат и всего, что попадает в их представление."""
+    rooms = Room.objects.all()
+    reservations = Reservation.objects.booked_and_active().exclude(room=None)
+    closures = RoomClosure.objects.all()
+    rates = RoomRate.objects.all()
+    if room_id is not None:
+        rooms = rooms.filter(pk=room_id)
+        reservations = reservations.filter(room=room_id)
+        closures = closures.filter(room=room_id)
+        rates = rates.filter(room=room_id)
+    return [
+        *table_state(rooms),
+        *table_state(reservations),
+        *table_state(closures),
+        *table_state(rates),
+        holds_version(),
+        *today(),
+    ]
+
+
+class ConditionalGetMixin:
+    """Сильный ETag для list и retrieve.
+
+    ETag считается из дешёвых агрегатов (get_etag_parts) до выборки и
+    сериализации, при совпадении с If-None-Match сразу отдаётся 304.
+    """
+
+    def get_etag_parts(self, request):
+        """Части ETag, None - ответ без ETag.
+
+        По умолчанию - table_state выборки get_queryset(), для retrieve
+        только запрошенного объекта. Представления, в которые попадают
+        другие таблицы или даты, переопределяют метод (RoomViewSet).
+        """
+        queryset = self.get_queryset()
+        if self.action == 'retrieve':
+            lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+            try:
+                queryset = queryset.filter(
+                    **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+                )
+            except (TypeError, ValueError, ValidationError):
+                # некорректный pk, ответом будет 404
+                return None
+        return list(table_state(queryset))
+
+    def get_etag(self, request):
+        parts = self.get_etag_parts(request)
+        if parts is None:
+            return None
+        parts = [
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+            *parts,
+        ]
+        digest = hashlib.sha1('|'.join(map(str, parts)).encode()).hexdigest()
+        return f'"{digest}"'
+
+    def conditional(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if etag is None:
+            return handler(request, *args, **kwargs)
+
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (
+            status.HTTP_200_OK,
+            status.HTTP_304_NOT_MODIFIED,
+        ):
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+
+def lookup_uuid(view):
+    """pk из URL как UUID, None - если это не UUID (тогда будет 404)."""
+    try:
+        return uuid.UUID(str(view.kwargs[view.lookup_field]))
+    except ValueError:
+        return None
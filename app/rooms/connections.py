@@ -0,0 +1,73 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections
+
+# соединения приложения по состояниям, application_name задаётся в
+# app/components/database.py и отличает их от psql, реплик и т.п.
+POOL_STATS = """
+SELECT state, count(*)
+FROM pg_stat_activity
+WHERE application_name = %s AND datname = current_database()
+GROUP BY state
+"""
+
+
+def pool_stats(using=DEFAULT_DB_ALIAS):
+    """Соединения приложения к базе: total и число по каждому состоянию."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            POOL_STATS,
+            [connection.settings_dict['OPTIONS'].get('application_name')],
+        )
+        stats = {state or 'unknown': count for state, count in cursor}
+    stats['total'] = sum(stats.values())
+    stats['conn_max_age'] = connection.settings_dict['CONN_MAX_AGE']
+    return stats
+
+
+def handle_request(persistent, using):
+    """Запрос в миниатюре: сигналы начала и конца запроса вокруг SELECT 1."""
+    started = time.perf_counter()
+    close_old_connections()
+    with connections[using].cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+    if persistent:
+        close_old_connections()
+    else:
+        # так ведёт себя CONN_MAX_AGE = 0
+        connections[using].close()
+    return time.perf_counter() - started
+
+
+def benchmark(requests, threads, persistent, using=DEFAULT_DB_ALIAS):
+    """Задержка и пропускная способность запросов из threads потоков."""
+
+    def worker(count):
+        try:
+            return [handle_request(persistent, using) for _ in range(count)]
+        finally:
+            connections[using].close()
+
+    per_thread = [requests // threads] * threads
+    for number in range(requests % threads):
+        per_thread[number] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        timings = sorted(
+            timing
+            for chunk in executor.map(worker, per_thread)
+            for timing in chunk
+        )
+    elapsed = time.perf_counter() - started
+    return {
+        'requests': len(timings),
+        'throughput': len(timings) / elapsed,
+        'mean_ms': statistics.mean(timings) * 1000,
+        'p50_ms': timings[len(timings) // 2] * 1000,
+        'p95_ms': timings[int(len(timings) * 0.95) - 1] * 1000,
+    }
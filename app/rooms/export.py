@@ -0,0 +1,79 @@
+import csv
+import json
+from datetime import timedelta
+
+from dateutil import parser
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .availability import day_start
+from .models import Reservation
+
+CHUNK_SIZE = 2000
+
+FIELDS = (
+    'id',
+    'room_id',
+    'room_type_id',
+    'user_id',
+    'status',
+    'starting_date',
+    'ending_date',
+    'nights',
+    'total_price',
+    'created_at',
+    'updated_at',
+)
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: строка сразу возвращается, а не копится."""
+
+    def write(self, value):
+        return value
+
+
+def reservations(start_date=None, end_date=None, statuses=None):
+    """Брони, пересекающие период, в стабильном порядке."""
+    queryset = Reservation.objects.order_by('starting_date', 'id')
+    if start_date is not None:
+        queryset = queryset.filter(ending_date__gte=day_start(start_date))
+    if end_date is not None:
+        queryset = queryset.filter(
+            starting_date__lt=day_start(end_date + timedelta(days=1))
+        )
+    if statuses:
+        queryset = queryset.filter(status__in=statuses)
+    return queryset.values_list(*FIELDS)
+
+
+def csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(FIELDS, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+FORMATS = {
+    'csv': (csv_lines, 'text/csv'),
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+}
+
+
+def stream(export_format, start_date=None, end_date=None, statuses=None):
+    """Строки выгрузки по одной.
+
+    Брони читаются серверным курсором пачками по CHUNK_SIZE, в памяти
+    никогда не лежит больше одной пачки.
+    """
+    lines, _ = FORMATS[export_format]
+    queryset = reservations(start_date, end_date, statuses)
+    return lines(queryset.iterator(chunk_size=CHUNK_SIZE))
+
+
+def parse_date(value):
+    return parser.parse(value).date() if value else None
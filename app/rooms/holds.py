@@ -0,0 +1,226 @@
+import logging
+import uuid
+from datetime import date
+from functools import lru_cache
+
+from django.conf import settings
+from redis import RedisError
+
+from .availability import AVAILABILITY_VERSION_KEY, day_start
+from .redis import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+HOLD_KEY = 'holds:hold:{}'
+ROOM_HOLDS_KEY = 'holds:room:{}'
+HELD_ROOMS_KEY = 'holds:rooms'
+
+# Холды комнаты лежат в одном hash: поле - id холда, значение -
+# 'start|end|expires|user', даты в ISO, поэтому сравниваются как строки.
+# Проверка пересечений и запись выполняются одним скриптом над hash
+# комнаты, так что два покупателя не получат одну комнату на одни даты, а
+# Postgres в этом не участвует. Истёкшие холды комнаты вычищаются по ходу.
+PLACE_HOLD = """
+local now = tonumber(redis.call('TIME')[1])
+local holds = redis.call('HGETALL', KEYS[1])
+for i = 1, #holds, 2 do
+    local s, e, expires = string.match(holds[i + 1], '([^|]*)|([^|]*)|([^|]*)|')
+    if tonumber(expires) <= now then
+        redis.call('HDEL', KEYS[1], holds[i])
+    elseif s <= ARGV[3] and e >= ARGV[2] then
+        return 0
+    end
+end
+
+local ttl = tonumber(ARGV[4])
+redis.call(
+    'HSET', KEYS[1], ARGV[1],
+    ARGV[2] .. '|' .. ARGV[3] .. '|' .. (now + ttl) .. '|' .. ARGV[5]
+)
+redis.call('EXPIRE', KEYS[1], ttl)
+return 1
+"""
+
+# Убирает истёкшие холды из hash комнаты и возвращает число живых.
+# Вызывается задачей cleanup_holds, чтение холдов ничего не удаляет.
+EXPIRE_HOLDS = """
+local now = tonumber(redis.call('TIME')[1])
+local holds = redis.call('HGETALL', KEYS[1])
+for i = 1, #holds, 2 do
+    local expires = string.match(holds[i + 1], '[^|]*|[^|]*|([^|]*)|')
+    if tonumber(expires) <= now then
+        redis.call('HDEL', KEYS[1], holds[i])
+    end
+end
+return redis.call('HLEN', KEYS[1])
+"""
+
+
+@lru_cache(maxsize=None)
+def script(source):
+    return get_redis().register_script(source)
+
+
+def alive_holds(room_id, holds, now):
+    """Живые холды из HGETALL комнаты: (room_id, start, end, user)."""
+    for value in holds.values():
+        start, end, expires, user = value.decode().split('|')
+        if int(expires) > now:
+            yield room_id, start, end, user
+
+
+def overlapping_holds(rows, start_date, end_date, exclude_user=None):
+    """Строки в формате overlapping_reservations: (room_id, start, end)."""
+    start, end = start_date.isoformat(), end_date.isoformat()
+    return [
+        (
+            uuid.UUID(str(room_id)),
+            day_start(date.fromisoformat(held_start)),
+            day_start(date.fromisoformat(held_end)),
+        )
+        for room_id, held_start, held_end, user in rows
+        if held_start <= end
+        and held_end >= start
+        and (exclude_user is None or user != str(exclude_user))
+    ]
+
+
+def read_holds(pipeline, room_ids):
+    """Команды чтения: время redis и hash каждой комнаты.
+
+    Каждая команда читает один ключ, так что это работает и в кластере.
+    """
+    pipeline.time()
+    for room_id in room_ids:
+        pipeline.hgetall(ROOM_HOLDS_KEY.format(room_id))
+
+
+def held_rows(room_ids, results):
+    (now, _), *room_holds = results
+    return [
+        row
+        for room_id, holds in zip(room_ids, room_holds)
+        for row in alive_holds(room_id, holds, now)
+    ]
+
+
+def held_stays(start_date, end_date, exclude_user=None):
+    """Холды, пересекающие период. Без redis холдов как будто нет."""
+    client = get_redis()
+    try:
+        room_ids = [room.decode() for room in client.smembers(HELD_ROOMS_KEY)]
+        pipeline = client.pipeline(transaction=False)
+        read_holds(pipeline, room_ids)
+        rows = held_rows(room_ids, pipeline.execute())
+    except RedisError:
+        logger.warning('Booking holds are ignored: redis is unavailable')
+        return []
+    return overlapping_holds(rows, start_date, end_date, exclude_user)
+
+
+async def aheld_stays(start_date, end_date, exclude_user=None):
+    client = get_async_redis()
+    try:
+        room_ids = [
+            room.decode() for room in await client.smembers(HELD_ROOMS_KEY)
+        ]
+        pipeline = client.pipeline(transaction=False)
+        read_holds(pipeline, room_ids)
+        rows = held_rows(room_ids, await pipeline.execute())
+    except RedisError:
+        logger.warning('Booking holds are ignored: redis is unavailable')
+        return []
+    return overlapping_holds(rows, start_date, end_date, exclude_user)
+
+
+def is_held(room_id, start_date, end_date, exclude_user=None):
+    """Держит ли комнату на эти даты кто-то, кроме exclude_user.
+
+    Читается только hash этой комнаты.
+    """
+    pipeline = get_redis().pipeline(transaction=False)
+    read_holds(pipeline, [room_id])
+    try:
+        rows = held_rows([room_id], pipeline.execute())
+    except RedisError:
+        logger.warning('Booking holds are ignored: redis is unavailable')
+        return False
+    return bool(overlapping_holds(rows, start_date, end_date, exclude_user))
+
+
+def place(room_id, start_date, end_date, user_id):
+    """Ставит холд на BOOKING_HOLD_TIMEOUT секунд.
+
+    Возвращает id холда или None, если даты уже кем-то удерживаются.
+    """
+    hold_id = uuid.uuid4().hex
+    placed = script(PLACE_HOLD)(
+        keys=[ROOM_HOLDS_KEY.format(room_id)],
+        args=[
+            hold_id,
+            start_date.isoformat(),
+            end_date.isoformat(),
+            settings.BOOKING_HOLD_TIMEOUT,
+            user_id,
+        ],
+    )
+    if not placed:
+        return None
+    # индексы холдов в других ключах, поэтому вне скрипта: is_held читает
+    # hash комнаты и от них не зависит
+    pipeline = get_redis().pipeline(transaction=False)
+    pipeline.sadd(HELD_ROOMS_KEY, str(room_id))
+    pipeline.set(
+        HOLD_KEY.format(hold_id),
+        str(room_id),
+        ex=settings.BOOKING_HOLD_TIMEOUT,
+    )
+    pipeline.incr(AVAILABILITY_VERSION_KEY)
+    pipeline.execute()
+    return hold_id
+
+
+def get(hold_id):
+    """Живой холд по id или None, если он истёк или снят."""
+    client = get_redis()
+    room_id = client.get(HOLD_KEY.format(hold_id))
+    if room_id is None:
+        return None
+    room_id = room_id.decode()
+    value = client.hget(ROOM_HOLDS_KEY.format(room_id), hold_id)
+    if value is None:
+        return None
+    start, end, _, user = value.decode().split('|')
+    return {
+        'id': hold_id,
+        'room': uuid.UUID(room_id),
+        'starting_date': date.fromisoformat(start),
+        'ending_date': date.fromisoformat(end),
+        'user': user,
+    }
+
+
+def release(hold):
+    pipeline = get_redis().pipeline()
+    pipeline.hdel(ROOM_HOLDS_KEY.format(hold['room']), hold['id'])
+    pipeline.delete(HOLD_KEY.format(hold['id']))
+    pipeline.incr(AVAILABILITY_VERSION_KEY)
+    pipeline.execute()
+
+
+def cleanup():
+    """Убирает истёкшие холды и комнаты без живых холдов из индекса."""
+    client = get_redis()
+    removed = 0
+    for room in client.smembers(HELD_ROOMS_KEY):
+        room_id = room.decode()
+        key = ROOM_HOLDS_KEY.format(room_id)
+        if script(EXPIRE_HOLDS)(keys=[key]):
+            continue
+        client.srem(HELD_ROOMS_KEY, room_id)
+        # холд мог появиться между скриптом и SREM
+        if client.exists(key):
+            client.sadd(HELD_ROOMS_KEY, room_id)
+        else:
+            removed += 1
+    return removed
@@ -0,0 +1,142 @@
+import hashlib
+import logging
+import uuid
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from redis import RedisError
+
+from . import outbox
+from .availability import merge_intervals, room_blocked_intervals
+from .models import Room
+
+logger = logging.getLogger(__name__)
+
+# Лента хранится под ключом с версией комнаты: изменение меняет версию, и
+# запрос, собравший ленту по старым данным, не перезапишет свежую
+FEED_KEY = 'rooms:ical:{}:{}'
+VERSION_KEY = 'rooms:ical:version:{}'
+FEED_TIMEOUT = 60 * 60 * 24
+
+PRODID = '-//Hotel Room Reservation//Room calendar//EN'
+
+
+def ical_date(value):
+    return value.strftime('%Y%m%d')
+
+
+def render(room_id, intervals, generated_at):
+    """VCALENDAR с событием на каждый слитый занятый интервал.
+
+    DTEND в iCalendar не включается в событие, а дни брони - включительно,
+    поэтому конец сдвигается на день.
+    """
+    stamp = generated_at.strftime('%Y%m%dT%H%M%SZ')
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+    ]
+    for start_date, end_date in intervals:
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:{room_id}-{ical_date(start_date)}@rooms',
+            f'DTSTAMP:{stamp}',
+            f'DTSTART;VALUE=DATE:{ical_date(start_date)}',
+            f'DTEND;VALUE=DATE:{ical_date(end_date + timedelta(days=1))}',
+            'SUMMARY:Reserved',
+            'TRANSP:OPAQUE',
+            'END:VEVENT',
+        ]
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(lines) + '\r\n'
+
+
+def feed_etag(body):
+    """ETag по содержимому ленты без DTSTAMP.
+
+    DTSTAMP - время сборки, с ним пересборка тех же броней (новая версия,
+    истёкший кэш, работа без redis) давала бы новый ETag.
+    """
+    content = '\r\n'.join(
+        line for line in body.split('\r\n') if not line.startswith('DTSTAMP:')
+    )
+    return f'"{hashlib.sha1(content.encode()).hexdigest()}"'
+
+
+def build(room_id):
+    """Лента комнаты с ETag и временем сборки, None - если комнаты нет."""
+    if not Room.objects.filter(pk=room_id).exists():
+        return None
+    rows = room_blocked_intervals([room_id])
+    intervals = merge_intervals(
+        (starting_date.date(), ending_date.date())
+        for _, starting_date, ending_date in rows
+    )
+    generated_at = timezone.now().replace(microsecond=0)
+    body = render(room_id, intervals, generated_at)
+    return {
+        'body': body,
+        'etag': feed_etag(body),
+        'last_modified': generated_at,
+    }
+
+
+def get_feed(room_id):
+    """Лента комнаты из кэша, собирается заново только после изменений.
+
+    Обращения к базе нет, пока лента в кэше, без redis лента собирается на
+    каждый запрос.
+    """
+    try:
+        version_key = VERSION_KEY.format(room_id)
+        version = cache.get(version_key)
+        if version is None:
+            cache.add(version_key, uuid.uuid4().hex, None)
+            version = cache.get(version_key)
+        feed_key = FEED_KEY.format(room_id, version)
+        feed = cache.get(feed_key)
+        if feed is None:
+            feed = build(room_id)
+            if feed is not None:
+                cache.set(feed_key, feed, FEED_TIMEOUT)
+        return feed
+    except RedisError:
+        logger.warning('Calendar cache is unavailable: redis is unavailable')
+        return build(room_id)
+
+
+def invalidate(room_ids):
+    """Новая версия лент комнат после коммита текущей транзакции."""
+    room_ids = {str(room_id) for room_id in room_ids if room_id is not None}
+
+    def bump():
+        try:
+            cache.set_many(
+                {
+                    VERSION_KEY.format(room_id): uuid.uuid4().hex
+                    for room_id in room_ids
+                },
+                None,
+            )
+        except RedisError:
+            pass
+
+    if room_ids:
+        transaction.on_commit(bump)
+
+
+@outbox.handler(outbox.RESERVATION_CHANGED)
+def invalidate_reservation_feeds(payloads):
+    # через outbox проходят и массовые изменения броней (.update() в
+    # rooms.closures), которые сигналы не видят
+    invalidate(
+        state['room_id']
+        for payload in payloads
+        for state in (payload['before'], payload['after'])
+        if state is not None
+    )
@@ -0,0 +1,282 @@
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta
+from itertools import islice
+
+from dateutil import parser
+from django.db import transaction
+from django.utils import timezone
+
+from . import audit, availability, inventory, outbox
+from .availability import BLOCKING_STATUSES, day_start
+from .models import OutboxEvent, Reservation, Room
+from .signals import reservation_change_payload
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+CANCELLED = ('cancelled', 'canceled', 'refused')
+
+
+def unfold(lines):
+    """Строки iCalendar без переносов: продолжение начинается с пробела."""
+    current = None
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def room_uuid(value):
+    """id комнаты из ленты, None - если это не UUID."""
+    try:
+        return str(uuid.UUID(str(value)))
+    except ValueError:
+        return None
+
+
+def ical_value(value):
+    if len(value) == 8:
+        return datetime.strptime(value, '%Y%m%d').date()
+    return parser.parse(value).date()
+
+
+def ical_events(lines, room_id=None):
+    """События VEVENT по одному, в памяти только текущее событие.
+
+    DTEND в iCalendar не входит в событие (день выезда), дни брони -
+    включительно, поэтому последний день - DTEND минус день.
+    """
+    event = None
+    for line in unfold(lines):
+        if line == 'BEGIN:VEVENT':
+            event = {}
+        elif line == 'END:VEVENT' and event is not None:
+            if {'UID', 'DTSTART'} <= event.keys():
+                start_date = ical_value(event['DTSTART'])
+                end_date = (
+                    ical_value(event['DTEND']) - timedelta(days=1)
+                    if 'DTEND' in event
+                    else start_date
+                )
+                yield {
+                    'uid': event['UID'],
+                    'room': room_uuid(room_id),
+                    'starting_date': start_date,
+                    'ending_date': max(start_date, end_date),
+                    'cancelled': event.get('STATUS', '').lower() in CANCELLED,
+                    'total_price': None,
+                }
+            event = None
+        elif event is not None and ':' in line:
+            name, value = line.split(':', 1)
+            # параметры вроде DTSTART;VALUE=DATE не нужны
+            event[name.split(';', 1)[0].upper()] = value
+
+
+def ndjson_events(lines, room_id=None):
+    """События из NDJSON, в том числе выгрузка rooms.export.
+
+    В выгрузке UID события - id брони.
+    """
+    for line in lines:
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        yield {
+            'uid': str(row.get('uid') or row['id']),
+            'room': room_uuid(
+                row.get('room') or row.get('room_id') or room_id
+            ),
+            'starting_date': parser.parse(row['starting_date']).date(),
+            'ending_date': parser.parse(row['ending_date']).date(),
+            'cancelled': str(row.get('status', '')).lower() in CANCELLED,
+            'total_price': row.get('total_price'),
+        }
+
+
+FORMATS = {
+    'ical': ical_events,
+    'ndjson': ndjson_events,
+}
+
+
+def batches(events, batch_size):
+    events = iter(events)
+    while batch := list(islice(events, batch_size)):
+        yield batch
+
+
+def record_changes(reservations):
+    """Работа сигналов для броней, сохранённых bulk_create и update().
+
+    События outbox, пересчёт пулов типов и сброс кэша поиска, как в
+    rooms.closures.
+    """
+    OutboxEvent.objects.bulk_create(
+        OutboxEvent(
+            topic=outbox.RESERVATION_CHANGED,
+            payload=reservation_change_payload(reservation),
+        )
+        for reservation in reservations
+    )
+    room_type_ids = {
+        reservation.room_type_id for reservation in reservations
+    } - {None}
+    for room_type_id in room_type_ids:
+        inventory.rebuild(room_type_id)
+    availability.bump_version()
+
+
+def cancel(reservations, now):
+    reservations = [
+        reservation
+        for reservation in reservations
+        if reservation.status in BLOCKING_STATUSES
+    ]
+    Reservation.objects.filter(
+        id__in=[reservation.id for reservation in reservations]
+    ).update(status=Reservation.Status.Refused, updated_at=now)
+    for reservation in reservations:
+        reservation.status = Reservation.Status.Refused
+    return reservations
+
+
+@transaction.atomic
+def apply_batch(events, source, user_id, now, stats):
+    """Сверяет пачку событий с бронями одним запросом и применяет разницу.
+
+    Даты уже импортированной брони не меняются: перенос в канале должен
+    прийти отменой и новым событием. Возвращает id комнат пачки.
+    """
+    today = now.date()
+    events = {event['uid']: event for event in events}
+    existing = {
+        reservation.external_uid: reservation
+        for reservation in Reservation.objects.select_for_update().filter(
+            external_source=source, external_uid__in=list(events)
+        )
+    }
+    rooms = dict(
+        Room.objects.filter(
+            id__in={event['room'] for event in events.values()} - {None}
+        ).values_list('id', 'room_type_id')
+    )
+    rooms = {str(room_id): room_type_id for room_id, room_type_id in rooms}
+
+    created = []
+    for uid, event in events.items():
+        if uid in existing or event['cancelled']:
+            continue
+        room_id = event['room']
+        if (
+            room_id not in rooms
+            or event['ending_date'] < today
+            # даты NDJSON приходят как есть, выезд раньше заезда - ошибка ленты
+            or event['ending_date'] < event['starting_date']
+        ):
+            stats['skipped'] += 1
+            continue
+        nights = (event['ending_date'] - event['starting_date']).days + 1
+        created.append(
+            Reservation(
+                room_id=room_id,
+                room_type_id=rooms[room_id],
+                user_id=user_id,
+                starting_date=day_start(event['starting_date']),
+                ending_date=day_start(event['ending_date']),
+                nights=nights,
+                total_price=event['total_price'],
+                external_source=source,
+                external_uid=uid,
+                imported_at=now,
+            )
+        )
+    Reservation.objects.bulk_create(created)
+
+    cancelled = cancel(
+        [
+            reservation
+            for uid, reservation in existing.items()
+            if events[uid]['cancelled']
+        ],
+        now,
+    )
+    # встреченные брони не отменяются в конце импорта, см. sweep
+    Reservation.objects.filter(
+        id__in=[reservation.id for reservation in existing.values()]
+    ).update(imported_at=now)
+
+    if created or cancelled:
+        record_changes(created + cancelled)
+    stats['created'] += len(created)
+    stats['cancelled'] += len(cancelled)
+    return set(rooms)
+
+
+def sweep(source, room_ids, now, batch_size):
+    """Отменяет будущие брони канала, которых больше нет в его ленте."""
+    cancelled = 0
+    while True:
+        with transaction.atomic():
+            missing = list(
+                Reservation.objects.select_for_update()
+                .filter(
+                    external_source=source,
+                    room__in=room_ids,
+                    status__in=BLOCKING_STATUSES,
+                    ending_date__gte=day_start(now.date()),
+                    imported_at__lt=now,
+                )
+                .order_by('id')[:batch_size]
+            )
+            if not missing:
+                return cancelled
+            reservations = cancel(missing, now)
+            record_changes(reservations)
+            cancelled += len(reservations)
+
+
+def import_feed(
+    lines,
+    import_format,
+    source,
+    user_id,
+    room_id=None,
+    batch_size=None,
+    full=True,
+):
+    """Импорт ленты канала пачками по batch_size событий.
+
+    Новые события становятся бронями, отменённые в ленте - отменяются.
+    full - лента полная, и будущие брони канала в её комнатах, которых в
+    ленте нет, тоже отменяются. Пересечения с другими бронями не
+    проверяются: бронь в канале уже состоялась, конфликты покажет
+    rooms.reconciliation.
+    """
+    batch_size = batch_size or BATCH_SIZE
+    now = timezone.now()
+    stats = {'created': 0, 'cancelled': 0, 'skipped': 0}
+    # лента iCal относится к одной комнате, даже если в ней нет событий
+    room_ids = {str(room_id)} if room_id else set()
+    events = FORMATS[import_format](lines, room_id)
+    with audit.context(f'import:{source}'):
+        for batch in batches(events, batch_size):
+            room_ids |= apply_batch(batch, source, user_id, now, stats)
+        if full and room_ids:
+            stats['cancelled'] += sweep(source, room_ids, now, batch_size)
+    logger.info('Imported %s feed: %s', source, stats)
+    return stats
+
+
+def import_file(path, import_format, source, user_id, **kwargs):
+    with open(path, encoding='utf-8') as feed:
+        return import_feed(feed, import_format, source, user_id, **kwargs)
@@ -0,0 +1,212 @@
+import logging
+from collections import Counter
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Count, Max, Q
+
+from .availability import BLOCKING_STATUSES, blocked_intervals, day_start
+from .models import (
+    Reservation,
+    Room,
+    RoomClosure,
+    RoomType,
+    RoomTypeNight,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def contribution(state):
+    """Период, который бронь занимает в пуле типа, или None."""
+    if (
+        state is None
+        or state['room_type_id'] is None
+        or state['status'] not in BLOCKING_STATUSES
+    ):
+        return None
+    return (
+        state['room_type_id'],
+        state['starting_date'].date(),
+        state['ending_date'].date(),
+    )
+
+
+def apply_reservation_change(reservation, deleted=False):
+    """Обновляет проданные ночи типа в транзакции сохранения брони."""
+    before = contribution(reservation._loaded_state)
+    after = None if deleted else contribution(reservation.current_state())
+    if before == after:
+        return
+    if before is not None:
+        RoomTypeNight.objects.add(*before, -1)
+    if after is not None:
+        RoomTypeNight.objects.add(*after, 1)
+
+
+def rebuild(room_type_id):
+    """Пересчитывает проданные ночи типа по броням с нуля."""
+    table = RoomTypeNight._meta.db_table.replace('"."', '.')
+    reservations = Reservation._meta.db_table.replace('"."', '.')
+    RoomTypeNight.objects.filter(room_type=room_type_id).delete()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            INSERT INTO {table} (room_type_id, date, sold)
+            SELECT r.room_type_id, day::date, count(*)
+            FROM {reservations} AS r,
+                generate_series(
+                    r.starting_date::date, r.ending_date::date, '1 day'
+                ) AS day
+            WHERE r.room_type_id = %s AND r.status = ANY(%s)
+            GROUP BY 1, 2
+            """,
+            [room_type_id, [str(status) for status in BLOCKING_STATUSES]],
+        )
+
+
+def move_room(room, old_type_id):
+    """Переносит брони комнаты в пул её нового типа."""
+    Reservation.objects.filter(room=room).update(room_type=room.room_type_id)
+    for room_type_id in {old_type_id, room.room_type_id} - {None}:
+        rebuild(room_type_id)
+
+
+def capacities(room_type_ids=None):
+    queryset = RoomType.objects.annotate(
+        capacity=Count('rooms', filter=Q(rooms__active=True))
+    )
+    if room_type_ids is not None:
+        queryset = queryset.filter(id__in=room_type_ids)
+    return dict(queryset.values_list('id', 'capacity'))
+
+
+def closed_nights(start_date, end_date, room_type_ids=None):
+    """Сколько комнат каждого типа закрыто в каждый день периода."""
+    closures = RoomClosure.objects.filter(
+        room__active=True,
+        room__room_type__isnull=False,
+        starting_date__lte=end_date,
+        ending_date__gte=start_date,
+    )
+    if room_type_ids is not None:
+        closures = closures.filter(room__room_type__in=room_type_ids)
+    closed = Counter()
+    for room_type_id, starting_date, ending_date in closures.values_list(
+        'room__room_type', 'starting_date', 'ending_date'
+    ):
+        day = max(starting_date, start_date)
+        while day <= min(ending_date, end_date):
+            closed[room_type_id, day] += 1
+            day += timedelta(days=1)
+    return closed
+
+
+def available_counts(start_date, end_date, room_type_ids=None):
+    """Свободные комнаты каждого типа на весь период.
+
+    Один запрос max(sold) по диапазону дат для всех типов сразу, стоимость
+    зависит от числа типов, а не комнат. Закрытые комнаты в пул не входят:
+    для дней с закрытиями проданные ночи дочитываются отдельно.
+    """
+    nights = RoomTypeNight.objects.filter(date__range=(start_date, end_date))
+    if room_type_ids is not None:
+        nights = nights.filter(room_type__in=room_type_ids)
+    max_taken = dict(
+        nights.values('room_type')
+        .annotate(max_sold=Max('sold'))
+        .values_list('room_type', 'max_sold')
+    )
+
+    closed = closed_nights(start_date, end_date, room_type_ids)
+    if closed:
+        sold = {
+            (room_type_id, day): count
+            for room_type_id, day, count in nights.filter(
+                room_type__in={room_type_id for room_type_id, _ in closed},
+                date__in={day for _, day in closed},
+            ).values_list('room_type', 'date', 'sold')
+        }
+        for key, count in closed.items():
+            room_type_id = key[0]
+            max_taken[room_type_id] = max(
+                max_taken.get(room_type_id, 0), sold.get(key, 0) + count
+            )
+    return {
+        room_type_id: max(capacity - max_taken.get(room_type_id, 0), 0)
+        for room_type_id, capacity in capacities(room_type_ids).items()
+    }
+
+
+def has_vacancy(room_type_id, start_date, end_date, exclude=None):
+    """Есть ли в пуле свободная комната на каждую ночь периода.
+
+    Блокирует строку типа до конца транзакции, поэтому параллельные брони
+    одного типа проверяются по очереди. exclude - изменяемая бронь, её
+    собственные ночи не считаются занятыми.
+    """
+    RoomType.objects.select_for_update().filter(pk=room_type_id).first()
+    capacity = capacities([room_type_id]).get(room_type_id, 0)
+    sold = dict(
+        RoomTypeNight.objects.filter(
+            room_type=room_type_id, date__range=(start_date, end_date)
+        ).values_list('date', 'sold')
+    )
+    closed = closed_nights(start_date, end_date, [room_type_id])
+    own = contribution(exclude._loaded_state) if exclude else None
+    if own is not None and own[0] != room_type_id:
+        own = None
+
+    day = start_date
+    while day <= end_date:
+        taken = sold.get(day, 0) + closed[room_type_id, day]
+        if own is not None and own[1] <= day <= own[2]:
+            taken -= 1
+        if taken >= capacity:
+            return False
+        day += timedelta(days=1)
+    return True
+
+
+def assign_room(reservation):
+    """Назначает брони по типу свободную комнату этого типа."""
+    RoomType.objects.select_for_update().filter(
+        pk=reservation.room_type_id
+    ).first()
+    start_date = reservation.starting_date.date()
+    end_date = reservation.ending_date.date()
+    candidates = list(
+        Room.objects.filter(
+            room_type=reservation.room_type_id, active=True
+        ).order_by('number')
+    )
+    busy = {
+        room_id
+        for room_id, _, _ in blocked_intervals(
+            start_date, end_date, [room.id for room in candidates]
+        )
+    }
+    for room in candidates:
+        if room.id not in busy:
+            reservation.room = room
+            reservation.save()
+            return room
+
+    logger.warning(
+        'No single %s room is free for %s - %s, reservation %s',
+        reservation.room_type_id,
+        start_date,
+        end_date,
+        reservation.id,
+    )
+    return None
+
+
+def unassigned_reservations(until_date):
+    """Брони по типу без комнаты, которые начинаются не позже until_date."""
+    return Reservation.objects.filter(
+        room__isnull=True,
+        room_type__isnull=False,
+        status=Reservation.Status.Booked,
+        starting_date__lt=day_start(until_date + timedelta(days=1)),
+    ).order_by('starting_date')
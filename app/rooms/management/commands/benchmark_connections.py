@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from rooms import connections
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает новое соединение на запрос с постоянными соединениями'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=16,
+            help='Сколько потоков, как threads в uwsgi.ini',
+        )
+
+    def handle(self, *args, **options):
+        results = {
+            name: connections.benchmark(
+                options['requests'], options['threads'], persistent
+            )
+            for name, persistent in (('new', False), ('persistent', True))
+        }
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name}: {result["throughput"]:.0f} req/s, '
+                f'mean {result["mean_ms"]:.2f} ms, '
+                f'p50 {result["p50_ms"]:.2f} ms, '
+                f'p95 {result["p95_ms"]:.2f} ms'
+            )
+        gain = (
+            results['persistent']['throughput'] / results['new']['throughput']
+        )
+        self.stdout.write(f'Прирост пропускной способности: {gain:.1f}x')
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from rooms import connections
+
+
+class Command(BaseCommand):
+    help = 'Соединения приложения к Postgres по состояниям'
+
+    def handle(self, *args, **options):
+        for key, value in connections.pool_stats().items():
+            self.stdout.write(f'{key}: {value}')
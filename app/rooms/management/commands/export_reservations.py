@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rooms import export
+from rooms.models import Reservation
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка броней в CSV или NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--export-format', choices=sorted(export.FORMATS), default='csv'
+        )
+        parser.add_argument(
+            '--start-date', help='Брони, закончившиеся не раньше'
+        )
+        parser.add_argument('--end-date', help='Брони, начавшиеся не позже')
+        parser.add_argument(
+            '--status',
+            action='append',
+            choices=Reservation.Status.values,
+            help='Статус брони, можно указать несколько раз',
+        )
+        parser.add_argument(
+            '--output', help='Файл для выгрузки, по умолчанию stdout'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start_date = export.parse_date(options['start_date'])
+            end_date = export.parse_date(options['end_date'])
+        except ValueError:
+            raise CommandError('Invalid time period')
+
+        lines = export.stream(
+            options['export_format'], start_date, end_date, options['status']
+        )
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', newline='') as output:
+            for line in lines:
+                output.write(line)
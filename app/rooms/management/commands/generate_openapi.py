@@ -0,0 +1,23 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from app.schema import render_schema
+
+
+class Command(BaseCommand):
+    help = 'Собирает схему OpenAPI в статический файл для nginx'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=str(Path(settings.STATIC_ROOT) / settings.OPENAPI_FILE),
+            help='Куда записать схему, по умолчанию в STATIC_ROOT',
+        )
+
+    def handle(self, *args, **options):
+        output = Path(options['output'])
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_bytes(render_schema())
+        self.stdout.write(f'Схема записана в {output}')
@@ -0,0 +1,54 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from rooms import importer
+
+
+class Command(BaseCommand):
+    help = 'Импорт броней партнёрского канала из ленты iCal или NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл ленты')
+        parser.add_argument(
+            '--import-format', choices=sorted(importer.FORMATS), default='ical'
+        )
+        parser.add_argument(
+            '--source', required=True, help='Канал, например booking.com'
+        )
+        parser.add_argument(
+            '--user',
+            required=True,
+            help='Пользователь, на которого пишутся брони',
+        )
+        parser.add_argument(
+            '--room', help='Комната ленты, если события её не указывают'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=importer.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--partial',
+            action='store_true',
+            help='Лента неполная: отсутствующие в ней брони не отменять',
+        )
+
+    def handle(self, *args, **options):
+        user = (
+            get_user_model().objects.filter(username=options['user']).first()
+        )
+        if user is None:
+            raise CommandError('User not found')
+
+        stats = importer.import_file(
+            options['path'],
+            options['import_format'],
+            options['source'],
+            user.pk,
+            room_id=options['room'],
+            batch_size=options['batch_size'],
+            full=not options['partial'],
+        )
+        self.stdout.write(
+            f'Создано: {stats["created"]}, отменено: {stats["cancelled"]}, '
+            f'пропущено: {stats["skipped"]}'
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from rooms import reconciliation
+
+
+class Command(BaseCommand):
+    help = (
+        'Находит пересекающиеся действующие брони и пишет их в OverlapFinding'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько комнат проверять в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        result = reconciliation.reconcile(options['batch_size'])
+        self.stdout.write(
+            f'Проверено комнат: {result["rooms"]}, '
+            f'пересечений: {result["overlaps"]}'
+        )
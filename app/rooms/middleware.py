@@ -0,0 +1,116 @@
+import hashlib
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from redis import RedisError
+
+from . import audit
+from .routers import replica_reads
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_KEY = 'replica:pin:{}'
+
+
+def client_key(request):
+    """Клиент по заголовку Authorization, для анонимов - по IP."""
+    ident = request.META.get('HTTP_AUTHORIZATION') or request.META.get(
+        'REMOTE_ADDR', ''
+    )
+    return PIN_KEY.format(hashlib.sha1(ident.encode()).hexdigest())
+
+
+class ReplicaRoutingMiddleware:
+    """Разрешает чтение с реплик для безопасных запросов.
+
+    После изменяющего запроса клиент на REPLICA_PIN_SECONDS закрепляется
+    за primary, чтобы видеть свои записи, пока реплика догоняет. Если
+    закрепление проверить не удалось, запрос идёт на primary.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        key = client_key(request)
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            self.pin(key)
+            return response
+
+        with replica_reads(not self.is_pinned(key)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+
+        key = client_key(request)
+        if request.method not in SAFE_METHODS:
+            response = await self.get_response(request)
+            self.pin(key)
+            return response
+
+        with replica_reads(not self.is_pinned(key)):
+            return await self.get_response(request)
+
+    def is_pinned(self, key):
+        try:
+            return cache.get(key) is not None
+        except RedisError:
+            return True
+
+    def pin(self, key):
+        try:
+            cache.set(key, 1, settings.REPLICA_PIN_SECONDS)
+        except RedisError:
+            logger.warning('Replica pin is not saved: redis is unavailable')
+
+
+class AuditContextMiddleware:
+    """Запрос как контекст истории броней (rooms.audit).
+
+    Пользователь читается из запроса в момент изменения брони, так что
+    учитывается и аутентификация по JWT, которую DRF делает уже во view.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def source(self, request):
+        return (
+            'admin'
+            if request.path.startswith(reverse('admin:index'))
+            else 'api'
+        )
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with audit.context(self.source(request), request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with audit.context(self.source(request), request):
+            return await self.get_response(request)
@@ -0,0 +1,62 @@
+# Generated by Django 5.0 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('rooms', '0003_alter_reservation_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxEvent',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('topic', models.TextField(verbose_name='topic')),
+                ('payload', models.JSONField(verbose_name='payload')),
+                (
+                    'created_at',
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name='created'
+                    ),
+                ),
+                (
+                    'processed_at',
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name='processed'
+                    ),
+                ),
+                (
+                    'attempts',
+                    models.PositiveIntegerField(
+                        default=0, verbose_name='attempts'
+                    ),
+                ),
+                (
+                    'last_error',
+                    models.TextField(blank=True, verbose_name='last_error'),
+                ),
+            ],
+            options={
+                'verbose_name': 'Outbox event',
+                'verbose_name_plural': 'Outbox events',
+                'db_table': 'content"."outbox',
+                'indexes': [
+                    models.Index(
+                        condition=models.Q(processed_at__isnull=True),
+                        fields=['id'],
+                        name='outbox_pending_idx',
+                    )
+                ],
+            },
+        ),
+    ]
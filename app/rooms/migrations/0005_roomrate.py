@@ -0,0 +1,87 @@
+# Generated by Django 5.0 on 2026-10-19 11:00
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('rooms', '0004_outboxevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomRate',
+            fields=[
+                (
+                    'created_at',
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name='created'
+                    ),
+                ),
+                (
+                    'updated_at',
+                    models.DateTimeField(auto_now=True, verbose_name='updated'),
+                ),
+                (
+                    'id',
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    'starting_date',
+                    models.DateField(verbose_name='starting_date'),
+                ),
+                ('ending_date', models.DateField(verbose_name='ending_date')),
+                (
+                    'weekday',
+                    models.PositiveSmallIntegerField(
+                        blank=True,
+                        choices=[
+                            (0, 'monday'),
+                            (1, 'tuesday'),
+                            (2, 'wednesday'),
+                            (3, 'thursday'),
+                            (4, 'friday'),
+                            (5, 'saturday'),
+                            (6, 'sunday'),
+                        ],
+                        null=True,
+                        verbose_name='weekday',
+                    ),
+                ),
+                ('day_cost', models.FloatField(verbose_name='day_cost')),
+                (
+                    'min_stay',
+                    models.PositiveSmallIntegerField(
+                        default=1, verbose_name='min_stay'
+                    ),
+                ),
+                (
+                    'room',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='rates',
+                        to='rooms.room',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Room rate',
+                'verbose_name_plural': 'Room rates',
+                'db_table': 'content"."room_rates',
+                'indexes': [
+                    models.Index(
+                        fields=['room', 'starting_date', 'ending_date'],
+                        name='room_rate_period_idx',
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.0 on 2026-10-19 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('rooms', '0005_roomrate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomDayStat',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('date', models.DateField(verbose_name='date')),
+                (
+                    'sleeping_area',
+                    models.TextField(
+                        choices=[
+                            ('twin', 'Twin'),
+                            ('double', 'Double'),
+                            ('twin_bunk', 'Twinbunk'),
+                            ('double_twin_bunk', 'Doubletwinbunk'),
+                        ],
+                        verbose_name='sleeping_area',
+                    ),
+                ),
+                (
+                    'sold',
+                    models.PositiveSmallIntegerField(
+                        default=0, verbose_name='sold'
+                    ),
+                ),
+                (
+                    'revenue',
+                    models.FloatField(default=0, verbose_name='revenue'),
+                ),
+                (
+                    'room',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='day_stats',
+                        to='rooms.room',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Room day stat',
+                'verbose_name_plural': 'Room day stats',
+                'db_table': 'content"."room_day_stats',
+                'indexes': [
+                    models.Index(
+                        fields=['date'], name='room_day_stat_date_idx'
+                    ),
+                    models.Index(
+                        fields=['sleeping_area', 'date'],
+                        name='room_day_stat_area_idx',
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='roomdaystat',
+            constraint=models.UniqueConstraint(
+                fields=('room', 'date'), name='room_day_stat_constraint'
+            ),
+        ),
+    ]
@@ -0,0 +1,112 @@
+# Generated by Django 5.0 on 2026-10-19 13:00
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models, transaction
+
+BATCH_SIZE = 1000
+
+
+def stay_price(day_cost, rates, start_date, end_date):
+    """Стоимость проживания на момент миграции, без rooms.pricing.
+
+    rates отсортированы по приоритету: из применимых к дню берётся
+    последний, дни без тарифа - по day_cost.
+    """
+    total = 0
+    day = start_date
+    while day <= end_date:
+        cost = day_cost
+        for starting_date, ending_date, weekday, rate_cost in rates:
+            if not starting_date <= day <= ending_date:
+                continue
+            if weekday is None or weekday == day.weekday():
+                cost = rate_cost
+        total += cost
+        day += timedelta(days=1)
+    return round(float(total), 2)
+
+
+def backfill_prices(apps, schema_editor):
+    """Заполняет nights и total_price пачками, каждая в своей транзакции."""
+    Reservation = apps.get_model('rooms', 'Reservation')
+    RoomRate = apps.get_model('rooms', 'RoomRate')
+
+    last_id = None
+    while True:
+        batch = Reservation.objects.select_related('room').order_by('id')
+        if last_id is not None:
+            batch = batch.filter(id__gt=last_id)
+        batch = list(batch[:BATCH_SIZE])
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        rates = {}
+        for rate in RoomRate.objects.filter(
+            room__in={reservation.room_id for reservation in batch}
+        ).order_by(
+            models.F('weekday').asc(nulls_first=True), 'starting_date'
+        ):
+            rates.setdefault(rate.room_id, []).append(
+                (
+                    rate.starting_date,
+                    rate.ending_date,
+                    rate.weekday,
+                    rate.day_cost,
+                )
+            )
+
+        for reservation in batch:
+            start_date = reservation.starting_date.date()
+            end_date = reservation.ending_date.date()
+            room = reservation.room
+            reservation.nights = (end_date - start_date).days + 1
+            # минимальный срок к уже сделанным броням не применяем
+            reservation.total_price = stay_price(
+                room.day_cost, rates.get(room.id, []), start_date, end_date
+            )
+
+        with transaction.atomic():
+            Reservation.objects.bulk_update(batch, ['nights', 'total_price'])
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('rooms', '0006_roomdaystat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='nights',
+            field=models.PositiveSmallIntegerField(
+                blank=True, null=True, verbose_name='nights'
+            ),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='total_price',
+            field=models.FloatField(
+                blank=True, null=True, verbose_name='total_price'
+            ),
+        ),
+        migrations.RunPython(backfill_prices, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(
+                fields=['user', 'total_price'],
+                name='reservation_user_price_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(
+                fields=['user', 'nights'], name='reservation_user_nights_idx'
+            ),
+        ),
+    ]
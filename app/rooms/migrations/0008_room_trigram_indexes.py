@@ -0,0 +1,52 @@
+# Generated by Django 5.0 on 2026-10-19 14:00
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('rooms', '0007_reservation_nights_total_price'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='room',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['name'],
+                name='room_name_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=['number'],
+                name='room_number_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper('name'),
+                    name='gin_trgm_ops',
+                ),
+                name='room_name_upper_trgm_idx',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper('number'),
+                    name='gin_trgm_ops',
+                ),
+                name='room_number_upper_trgm_idx',
+            ),
+        ),
+    ]
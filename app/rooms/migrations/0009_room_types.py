@@ -0,0 +1,129 @@
+# Generated by Django 5.0 on 2026-10-19 15:00
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('rooms', '0008_room_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomType',
+            fields=[
+                (
+                    'created_at',
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name='created'
+                    ),
+                ),
+                (
+                    'updated_at',
+                    models.DateTimeField(
+                        auto_now=True, verbose_name='updated'
+                    ),
+                ),
+                (
+                    'id',
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ('name', models.TextField(unique=True, verbose_name='name')),
+                (
+                    'sleeping_area',
+                    models.TextField(
+                        choices=[
+                            ('twin', 'Twin'),
+                            ('double', 'Double'),
+                            ('twin_bunk', 'Twinbunk'),
+                            ('double_twin_bunk', 'Doubletwinbunk'),
+                        ],
+                        default='twin',
+                        verbose_name='sleeping_area',
+                    ),
+                ),
+                ('day_cost', models.FloatField(verbose_name='day_cost')),
+            ],
+            options={
+                'verbose_name': 'Room type',
+                'verbose_name_plural': 'Room types',
+                'db_table': 'content"."room_types',
+            },
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='room',
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='reservations',
+                to='rooms.room',
+            ),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='room_type',
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.PROTECT,
+                related_name='reservations',
+                to='rooms.roomtype',
+            ),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='room_type',
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name='rooms',
+                to='rooms.roomtype',
+            ),
+        ),
+        migrations.CreateModel(
+            name='RoomTypeNight',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('date', models.DateField(verbose_name='date')),
+                ('sold', models.IntegerField(default=0, verbose_name='sold')),
+                (
+                    'room_type',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='nights',
+                        to='rooms.roomtype',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Room type night',
+                'verbose_name_plural': 'Room type nights',
+                'db_table': 'content"."room_type_nights',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='roomtypenight',
+            constraint=models.UniqueConstraint(
+                fields=('room_type', 'date'), name='room_type_night_constraint'
+            ),
+        ),
+    ]
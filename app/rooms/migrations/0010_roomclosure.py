@@ -0,0 +1,69 @@
+# Generated by Django 5.0 on 2026-10-19 16:00
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('rooms', '0009_room_types'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomClosure',
+            fields=[
+                (
+                    'created_at',
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name='created'
+                    ),
+                ),
+                (
+                    'updated_at',
+                    models.DateTimeField(
+                        auto_now=True, verbose_name='updated'
+                    ),
+                ),
+                (
+                    'id',
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    'starting_date',
+                    models.DateField(verbose_name='starting_date'),
+                ),
+                ('ending_date', models.DateField(verbose_name='ending_date')),
+                (
+                    'reason',
+                    models.TextField(blank=True, verbose_name='reason'),
+                ),
+                (
+                    'room',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='closures',
+                        to='rooms.room',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'Room closure',
+                'verbose_name_plural': 'Room closures',
+                'db_table': 'content"."room_closures',
+                'indexes': [
+                    models.Index(
+                        fields=['room', 'starting_date', 'ending_date'],
+                        name='room_closure_period_idx',
+                    )
+                ],
+            },
+        ),
+    ]
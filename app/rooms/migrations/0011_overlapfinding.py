@@ -0,0 +1,83 @@
+# Generated by Django 5.0 on 2026-10-19 17:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('rooms', '0010_roomclosure'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OverlapFinding',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                (
+                    'overlap_start',
+                    models.DateField(verbose_name='overlap_start'),
+                ),
+                ('overlap_end', models.DateField(verbose_name='overlap_end')),
+                ('detected_at', models.DateTimeField(verbose_name='detected')),
+                ('checked_at', models.DateTimeField(verbose_name='checked')),
+            ],
+            options={
+                'verbose_name': 'Overlap finding',
+                'verbose_name_plural': 'Overlap findings',
+                'db_table': 'content"."overlap_findings',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(
+                condition=models.Q(('status__in', ['booked', 'active'])),
+                fields=['room', 'starting_date'],
+                name='reservation_room_active_idx',
+            ),
+        ),
+        migrations.AddField(
+            model_name='overlapfinding',
+            name='conflicting_reservation',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='+',
+                to='rooms.reservation',
+            ),
+        ),
+        migrations.AddField(
+            model_name='overlapfinding',
+            name='reservation',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='+',
+                to='rooms.reservation',
+            ),
+        ),
+        migrations.AddField(
+            model_name='overlapfinding',
+            name='room',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='overlap_findings',
+                to='rooms.room',
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='overlapfinding',
+            constraint=models.UniqueConstraint(
+                fields=('reservation', 'conflicting_reservation'),
+                name='overlap_finding_pair_constraint',
+            ),
+        ),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 5.0 on 2026-10-19 18:00
+
+import uuid
+
+import django.core.validators
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('rooms', '0011_overlapfinding'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Review',
+            fields=[
+                (
+                    'created_at',
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name='created'
+                    ),
+                ),
+                (
+                    'updated_at',
+                    models.DateTimeField(
+                        auto_now=True, verbose_name='updated'
+                    ),
+                ),
+                (
+                    'id',
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    'score',
+                    models.PositiveSmallIntegerField(
+                        validators=[
+                            django.core.validators.MinValueValidator(1),
+                            django.core.validators.MaxValueValidator(10),
+                        ],
+                        verbose_name='score',
+                    ),
+                ),
+                ('text', models.TextField(blank=True, verbose_name='text')),
+            ],
+            options={
+                'verbose_name': 'Review',
+                'verbose_name_plural': 'Reviews',
+                'db_table': 'content"."reviews',
+            },
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='rating_total',
+            field=models.PositiveIntegerField(
+                default=0, verbose_name='rating_total'
+            ),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='reviews_count',
+            field=models.PositiveIntegerField(
+                default=0, verbose_name='reviews_count'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['rating'], name='room_rating_idx'),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='reservation',
+            field=models.OneToOneField(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='review',
+                to='rooms.reservation',
+            ),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='room',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='reviews',
+                to='rooms.room',
+            ),
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='user',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='reviews',
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(
+                fields=['room', '-created_at'], name='review_room_created_idx'
+            ),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0 on 2026-10-19 19:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('rooms', '0012_reviews'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='external_source',
+            field=models.CharField(
+                blank=True,
+                default='',
+                max_length=100,
+                verbose_name='external_source',
+            ),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='external_uid',
+            field=models.CharField(
+                blank=True,
+                max_length=255,
+                null=True,
+                verbose_name='external_uid',
+            ),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='imported_at',
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name='imported_at'
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name='reservation',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(('external_uid__isnull', False)),
+                fields=('external_source', 'external_uid'),
+                name='reservation_external_uid_constraint',
+            ),
+        ),
+    ]
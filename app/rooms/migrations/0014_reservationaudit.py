@@ -0,0 +1,83 @@
+# Generated by Django 5.0 on 2026-10-19 20:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('rooms', '0013_reservation_external_uid'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservationAudit',
+            fields=[
+                (
+                    'id',
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='ID',
+                    ),
+                ),
+                ('event_id', models.UUIDField(unique=True)),
+                (
+                    'reservation_id',
+                    models.UUIDField(verbose_name='reservation'),
+                ),
+                (
+                    'room_id',
+                    models.UUIDField(
+                        blank=True, null=True, verbose_name='room'
+                    ),
+                ),
+                (
+                    'action',
+                    models.TextField(
+                        choices=[
+                            ('created', 'Created'),
+                            ('changed', 'Changed'),
+                            ('deleted', 'Deleted'),
+                        ],
+                        verbose_name='action',
+                    ),
+                ),
+                (
+                    'before',
+                    models.JSONField(
+                        blank=True, null=True, verbose_name='before'
+                    ),
+                ),
+                (
+                    'after',
+                    models.JSONField(
+                        blank=True, null=True, verbose_name='after'
+                    ),
+                ),
+                (
+                    'actor_id',
+                    models.BigIntegerField(
+                        blank=True, null=True, verbose_name='actor'
+                    ),
+                ),
+                ('source', models.TextField(verbose_name='source')),
+                ('changed_at', models.DateTimeField(verbose_name='changed')),
+            ],
+            options={
+                'verbose_name': 'Reservation audit record',
+                'verbose_name_plural': 'Reservation audit',
+                'db_table': 'content"."reservation_audit',
+                'indexes': [
+                    models.Index(
+                        fields=['reservation_id', 'changed_at'],
+                        name='reservation_audit_idx',
+                    ),
+                    models.Index(
+                        fields=['room_id', 'changed_at'],
+                        name='reservation_audit_room_idx',
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0 on 2026-10-19 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('rooms', '0014_reservationaudit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='queue_request',
+            field=models.UUIDField(
+                blank=True,
+                null=True,
+                unique=True,
+                verbose_name='queue_request',
+            ),
+        ),
+    ]
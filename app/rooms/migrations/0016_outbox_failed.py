@@ -0,0 +1,41 @@
+# Generated by Django 5.0 on 2026-10-19 22:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('rooms', '0015_reservation_queue_request'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='outboxevent',
+            name='outbox_pending_idx',
+        ),
+        migrations.AddField(
+            model_name='outboxevent',
+            name='delivered_to',
+            field=models.JSONField(
+                blank=True, default=list, verbose_name='delivered_to'
+            ),
+        ),
+        migrations.AddField(
+            model_name='outboxevent',
+            name='failed_at',
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name='failed'
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='outboxevent',
+            index=models.Index(
+                condition=models.Q(
+                    ('failed_at__isnull', True),
+                    ('processed_at__isnull', True),
+                ),
+                fields=['id'],
+                name='outbox_pending_idx',
+            ),
+        ),
+    ]
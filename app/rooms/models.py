@@ -1,11 +1,12 @@
 import uuid
 from typing import AnyStr
 
-from dateutil import rrule
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connection, models
+from django.db.models.functions import Upper
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
@@ -59,6 +60,9 @@ class Room(UUIDMixin, TimeStampedMixin):
         validators=[MinValueValidator(0), MaxValueValidator(10)],
         default=0,
     )
+    # rating = rating_total / reviews_count, поддерживаются rooms.reviews
+    reviews_count = models.PositiveIntegerField(_('reviews_count'), default=0)
+    rating_total = models.PositiveIntegerField(_('rating_total'), default=0)
     refundable = models.BooleanField(_('refundable'), default=True)
     # предположим, что в комнате может быть кровать только одного типа
     # для комнат в хостеле это правда, но если нужно расширить этот класс до Property
@@ -67,28 +71,38 @@ class Room(UUIDMixin, TimeStampedMixin):
         _('sleeping_area'), choices=BedType.choices, default=BedType.Twin
     )
     active = models.BooleanField(_('active'), default=True)
+    room_type = models.ForeignKey(
+        'RoomType',
+        on_delete=models.SET_NULL,
+        related_name='rooms',
+        blank=True,
+        null=True,
+    )
+
+    # меняются только атомарными UPDATE из rooms.reviews
+    RATING_FIELDS = ('rating', 'reviews_count', 'rating_total')
 
     def __str__(self) -> str:
         return self.name
 
-    def reserved_dates(self, reserv_id: AnyStr = None):
-        if reserv_id:
-            date_ranges = Reservation.objects.reserves_dates_exclude_update_reservation(
-                self.id, reserv_id
-            )
-        else:
-            date_ranges = Reservation.objects.reserved_dates(self.id)
-        reserved_dates = []
-
-        for date_range in date_ranges:
-            start_date = date_range.starting_date.date()
-            end_date = date_range.ending_date.date()
+    def save(self, *args, **kwargs):
+        # сохранение комнаты (например, из админки) не должно затирать
+        # рейтинг значением, прочитанным до нового отзыва
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.RATING_FIELDS
+            ]
+        super().save(*args, **kwargs)
 
-            rule = rrule.rrule(rrule.DAILY, dtstart=start_date, until=end_date)
-
-            reserved_dates.extend(list(rule))
+    def reserved_dates(self, reserv_id: AnyStr = None):
+        # брони и закрытия комнаты одним UNION ALL, модуль availability
+        # сам импортирует модели
+        from .availability import reserved_dates_by_room
 
-        return reserved_dates
+        return reserved_dates_by_room([self.id], exclude=reserv_id)[self.id]
 
     class Meta:
         db_table = 'content"."rooms'
@@ -99,12 +113,140 @@ class Room(UUIDMixin, TimeStampedMixin):
                 fields=['name', 'number'], name='name_number_constraint'
             )
         ]
+        # триграммы для поиска ?q= (операторы % и <%) и для icontains,
+        # который postgres-бэкенд django строит через UPPER(...) LIKE
+        indexes = [
+            models.Index(fields=['rating'], name='room_rating_idx'),
+            GinIndex(
+                fields=['name'],
+                name='room_name_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+            GinIndex(
+                fields=['number'],
+                name='room_number_trgm_idx',
+                opclasses=['gin_trgm_ops'],
+            ),
+            GinIndex(
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='room_name_upper_trgm_idx',
+            ),
+            GinIndex(
+                OpClass(Upper('number'), name='gin_trgm_ops'),
+                name='room_number_upper_trgm_idx',
+            ),
+        ]
+
+
+class RoomType(UUIDMixin, TimeStampedMixin):
+    """Пул одинаковых комнат (тот же тип кровати и цена).
+
+    Доступность типа считается по таблице проданных ночей RoomTypeNight,
+    а не перебором комнат, конкретная комната назначается брони позже.
+    """
+
+    name = models.TextField(_('name'), unique=True)
+    sleeping_area = models.TextField(
+        _('sleeping_area'),
+        choices=Room.BedType.choices,
+        default=Room.BedType.Twin,
+    )
+    day_cost = models.FloatField(_('day_cost'))
+
+    def __str__(self) -> str:
+        return self.name
+
+    class Meta:
+        db_table = 'content"."room_types'
+        verbose_name = _('Room type')
+        verbose_name_plural = _('Room types')
+
+
+class RoomRate(UUIDMixin, TimeStampedMixin):
+    """Цена комнаты за день в сезон, опционально только по одному дню недели.
+
+    Тарифы по дню недели важнее сезонных, среди равных побеждает
+    начавшийся позже. Вне тарифов действует Room.day_cost.
+    """
+
+    class Weekday(models.IntegerChoices):
+        Monday = 0, _('monday')
+        Tuesday = 1, _('tuesday')
+        Wednesday = 2, _('wednesday')
+        Thursday = 3, _('thursday')
+        Friday = 4, _('friday')
+        Saturday = 5, _('saturday')
+        Sunday = 6, _('sunday')
+
+    room = models.ForeignKey(
+        Room, on_delete=models.CASCADE, related_name='rates'
+    )
+    starting_date = models.DateField(_('starting_date'))
+    ending_date = models.DateField(_('ending_date'))
+    weekday = models.PositiveSmallIntegerField(
+        _('weekday'), choices=Weekday.choices, blank=True, null=True
+    )
+    day_cost = models.FloatField(_('day_cost'))
+    min_stay = models.PositiveSmallIntegerField(_('min_stay'), default=1)
+
+    def __str__(self) -> str:
+        return f'{self.room} {self.starting_date} - {self.ending_date}'
+
+    class Meta:
+        db_table = 'content"."room_rates'
+        verbose_name = _('Room rate')
+        verbose_name_plural = _('Room rates')
+        indexes = [
+            models.Index(
+                fields=['room', 'starting_date', 'ending_date'],
+                name='room_rate_period_idx',
+            )
+        ]
+
+
+class RoomClosure(UUIDMixin, TimeStampedMixin):
+    """Комната закрыта на ремонт или обслуживание, дни включительно.
+
+    Для поиска, проверки конфликтов и reserved_dates закрытие - такой же
+    занятый интервал, как бронь (rooms.availability.blocked_intervals).
+    """
+
+    room = models.ForeignKey(
+        Room, on_delete=models.CASCADE, related_name='closures'
+    )
+    starting_date = models.DateField(_('starting_date'))
+    ending_date = models.DateField(_('ending_date'))
+    reason = models.TextField(_('reason'), blank=True)
+
+    def __str__(self) -> str:
+        return f'{self.room} {self.starting_date} - {self.ending_date}'
+
+    class Meta:
+        db_table = 'content"."room_closures'
+        verbose_name = _('Room closure')
+        verbose_name_plural = _('Room closures')
+        indexes = [
+            models.Index(
+                fields=['room', 'starting_date', 'ending_date'],
+                name='room_closure_period_idx',
+            )
+        ]
 
 
 class Reservation(UUIDMixin, TimeStampedMixin):
 
     objects = ReservationlManager()
 
+    # поля, по изменению которых сигналы понимают, что поменялось в брони
+    TRACKED_FIELDS = (
+        'room_id',
+        'room_type_id',
+        'status',
+        'starting_date',
+        'ending_date',
+    )
+    _loaded_state = None
+
     class Status(models.TextChoices):
         Booked = _('booked')
         Refused = _('refused')
@@ -130,8 +272,20 @@ class Reservation(UUIDMixin, TimeStampedMixin):
         _('ending_date'),
         validators=[validate_date_within_two_weeks, validate_future_date],
     )
+    # при бронировании по типу комната назначается позже (rooms.inventory)
     room = models.ForeignKey(
-        Room, on_delete=models.CASCADE, related_name='reservations'
+        Room,
+        on_delete=models.CASCADE,
+        related_name='reservations',
+        blank=True,
+        null=True,
+    )
+    room_type = models.ForeignKey(
+        RoomType,
+        on_delete=models.PROTECT,
+        related_name='reservations',
+        blank=True,
+        null=True,
     )
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='reservations'
@@ -139,11 +293,309 @@ class Reservation(UUIDMixin, TimeStampedMixin):
     status = models.TextField(
         _('status'), choices=Status.choices, default=Status.Booked
     )
+    # считаются при бронировании (rooms.pricing.price_stay), дни включительно
+    nights = models.PositiveSmallIntegerField(
+        _('nights'), blank=True, null=True
+    )
+    total_price = models.FloatField(_('total_price'), blank=True, null=True)
+    # брони партнёрских каналов (rooms.importer): канал, UID события в его
+    # ленте и время последнего импорта, в котором событие встретилось
+    external_source = models.CharField(
+        _('external_source'), max_length=100, blank=True, default=''
+    )
+    external_uid = models.CharField(
+        _('external_uid'), max_length=255, blank=True, null=True
+    )
+    imported_at = models.DateTimeField(_('imported_at'), blank=True, null=True)
+    # id запроса очереди броней (rooms.booking_queue): повторная доставка
+    # записи находит уже созданную бронь
+    queue_request = models.UUIDField(
+        _('queue_request'), blank=True, null=True, unique=True
+    )
 
     def __str__(self) -> str:
-        return f'{self.room.name} ({self.starting_date} - {self.ending_date}) by {self.user.username}'
+        return f'{self.room or self.room_type} ({self.starting_date} - {self.ending_date}) by {self.user.username}'
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_state()
+        return instance
+
+    def current_state(self):
+        return {
+            field: self.__dict__.get(field) for field in self.TRACKED_FIELDS
+        }
+
+    def remember_state(self):
+        self._loaded_state = self.current_state()
 
     class Meta:
         db_table = 'content"."reservations'
         verbose_name = _('Reservation')
         verbose_name_plural = _('Reservations')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['external_source', 'external_uid'],
+                name='reservation_external_uid_constraint',
+                condition=models.Q(external_uid__isnull=False),
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'total_price'],
+                name='reservation_user_price_idx',
+            ),
+            models.Index(
+                fields=['user', 'nights'], name='reservation_user_nights_idx'
+            ),
+            # действующие брони комнаты по порядку заездов: поиск пересечений
+            # (rooms.reconciliation) и выборки доступности
+            models.Index(
+                fields=['room', 'starting_date'],
+                name='reservation_room_active_idx',
+                condition=models.Q(status__in=['booked', 'active']),
+            ),
+        ]
+
+
+class Review(UUIDMixin, TimeStampedMixin):
+    """Отзыв гостя о завершённой (Expired) брони, один на бронь."""
+
+    reservation = models.OneToOneField(
+        Reservation, on_delete=models.CASCADE, related_name='review'
+    )
+    room = models.ForeignKey(
+        Room, on_delete=models.CASCADE, related_name='reviews'
+    )
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='reviews'
+    )
+    score = models.PositiveSmallIntegerField(
+        _('score'), validators=[MinValueValidator(1), MaxValueValidator(10)]
+    )
+    text = models.TextField(_('text'), blank=True)
+
+    def __str__(self) -> str:
+        return f'{self.room} {self.score}'
+
+    class Meta:
+        db_table = 'content"."reviews'
+        verbose_name = _('Review')
+        verbose_name_plural = _('Reviews')
+        indexes = [
+            models.Index(
+                fields=['room', '-created_at'], name='review_room_created_idx'
+            )
+        ]
+
+
+class OutboxManager(models.Manager):
+    def pending(self):
+        return self.filter(
+            processed_at__isnull=True, failed_at__isnull=True
+        ).order_by('id')
+
+    def failed(self):
+        return self.filter(failed_at__isnull=False).order_by('id')
+
+    def enqueue(self, topic, payload):
+        return self.create(topic=topic, payload=payload)
+
+
+class OutboxEvent(models.Model):
+    """Событие, записанное в одной транзакции с изменением брони.
+
+    Побочные эффекты (рассылки, синхронизация) выполняет Celery-задача
+    drain_outbox, а не запрос пользователя.
+    """
+
+    objects = OutboxManager()
+
+    topic = models.TextField(_('topic'))
+    payload = models.JSONField(_('payload'))
+    created_at = models.DateTimeField(_('created'), auto_now_add=True)
+    processed_at = models.DateTimeField(_('processed'), null=True, blank=True)
+    attempts = models.PositiveIntegerField(_('attempts'), default=0)
+    last_error = models.TextField(_('last_error'), blank=True)
+    # обработчики, уже принявшие событие: повтор вызывает только остальные
+    delivered_to = models.JSONField(
+        _('delivered_to'), default=list, blank=True
+    )
+    # событие исчерпало OUTBOX_MAX_ATTEMPTS и больше не доставляется
+    failed_at = models.DateTimeField(_('failed'), null=True, blank=True)
+
+    def __str__(self) -> str:
+        return f'{self.topic} #{self.id}'
+
+    class Meta:
+        db_table = 'content"."outbox'
+        verbose_name = _('Outbox event')
+        verbose_name_plural = _('Outbox events')
+        indexes = [
+            models.Index(
+                fields=['id'],
+                name='outbox_pending_idx',
+                condition=models.Q(
+                    processed_at__isnull=True, failed_at__isnull=True
+                ),
+            )
+        ]
+
+
+class RoomDayStat(models.Model):
+    """Дневной срез по комнате для отчётов: продана ли ночь и выручка.
+
+    Поддерживается инкрементально обработчиком outbox (rooms.analytics),
+    отчёты не читают сырые брони.
+    """
+
+    room = models.ForeignKey(
+        Room, on_delete=models.CASCADE, related_name='day_stats'
+    )
+    date = models.DateField(_('date'))
+    sleeping_area = models.TextField(
+        _('sleeping_area'), choices=Room.BedType.choices
+    )
+    sold = models.PositiveSmallIntegerField(_('sold'), default=0)
+    revenue = models.FloatField(_('revenue'), default=0)
+
+    def __str__(self) -> str:
+        return f'{self.room} {self.date}'
+
+    class Meta:
+        db_table = 'content"."room_day_stats'
+        verbose_name = _('Room day stat')
+        verbose_name_plural = _('Room day stats')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['room', 'date'], name='room_day_stat_constraint'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='room_day_stat_date_idx'),
+            models.Index(
+                fields=['sleeping_area', 'date'],
+                name='room_day_stat_area_idx',
+            ),
+        ]
+
+
+class OverlapFinding(models.Model):
+    """Пара действующих броней одной комнаты с общими днями.
+
+    Заполняется сверкой rooms.reconciliation, строки, которые при
+    следующей проверке уже не пересекаются, удаляются.
+    """
+
+    room = models.ForeignKey(
+        Room, on_delete=models.CASCADE, related_name='overlap_findings'
+    )
+    reservation = models.ForeignKey(
+        'Reservation', on_delete=models.CASCADE, related_name='+'
+    )
+    conflicting_reservation = models.ForeignKey(
+        'Reservation', on_delete=models.CASCADE, related_name='+'
+    )
+    overlap_start = models.DateField(_('overlap_start'))
+    overlap_end = models.DateField(_('overlap_end'))
+    detected_at = models.DateTimeField(_('detected'))
+    checked_at = models.DateTimeField(_('checked'))
+
+    def __str__(self) -> str:
+        return f'{self.room} {self.overlap_start} - {self.overlap_end}'
+
+    class Meta:
+        db_table = 'content"."overlap_findings'
+        verbose_name = _('Overlap finding')
+        verbose_name_plural = _('Overlap findings')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['reservation', 'conflicting_reservation'],
+                name='overlap_finding_pair_constraint',
+            )
+        ]
+
+
+class ReservationAudit(models.Model):
+    """Запись истории брони, только добавляется.
+
+    Пишется пачками из outbox (rooms.audit), ссылки на бронь и комнату -
+    без внешних ключей, чтобы история пережила их удаление.
+    """
+
+    class Action(models.TextChoices):
+        Created = _('created')
+        Changed = _('changed')
+        Deleted = _('deleted')
+
+    # id события outbox: повторная доставка пачки не дублирует записи
+    event_id = models.UUIDField(unique=True)
+    reservation_id = models.UUIDField(_('reservation'))
+    room_id = models.UUIDField(_('room'), blank=True, null=True)
+    action = models.TextField(_('action'), choices=Action.choices)
+    before = models.JSONField(_('before'), blank=True, null=True)
+    after = models.JSONField(_('after'), blank=True, null=True)
+    actor_id = models.BigIntegerField(_('actor'), blank=True, null=True)
+    source = models.TextField(_('source'))
+    changed_at = models.DateTimeField(_('changed'))
+
+    def __str__(self) -> str:
+        return f'{self.reservation_id} {self.action} {self.changed_at}'
+
+    class Meta:
+        db_table = 'content"."reservation_audit'
+        verbose_name = _('Reservation audit record')
+        verbose_name_plural = _('Reservation audit')
+        indexes = [
+            models.Index(
+                fields=['reservation_id', 'changed_at'],
+                name='reservation_audit_idx',
+            ),
+            models.Index(
+                fields=['room_id', 'changed_at'],
+                name='reservation_audit_room_idx',
+            ),
+        ]
+
+
+class RoomTypeNightManager(models.Manager):
+    def add(self, room_type_id, start_date, end_date, delta):
+        """Атомарно меняет число проданных ночей типа за период."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {self.model._meta.db_table.replace('"."', '.')}
+                    AS nights (room_type_id, date, sold)
+                SELECT %s, day::date, %s
+                FROM generate_series(%s::date, %s::date, '1 day') AS day
+                ON CONFLICT (room_type_id, date)
+                DO UPDATE SET sold = nights.sold + EXCLUDED.sold
+                """,
+                [room_type_id, delta, start_date, end_date],
+            )
+
+
+class RoomTypeNight(models.Model):
+    """Сколько комнат типа продано на ночь."""
+
+    objects = RoomTypeNightManager()
+
+    room_type = models.ForeignKey(
+        RoomType, on_delete=models.CASCADE, related_name='nights'
+    )
+    date = models.DateField(_('date'))
+    sold = models.IntegerField(_('sold'), default=0)
+
+    def __str__(self) -> str:
+        return f'{self.room_type} {self.date}: {self.sold}'
+
+    class Meta:
+        db_table = 'content"."room_type_nights'
+        verbose_name = _('Room type night')
+        verbose_name_plural = _('Room type nights')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['room_type', 'date'], name='room_type_night_constraint'
+            )
+        ]
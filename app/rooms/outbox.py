@@ -0,0 +1,158 @@
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+RESERVATION_CHANGED = 'reservation.changed'
+
+# ключ advisory-lock в postgres: события разбирает только один обработчик,
+# иначе параллельные пачки нарушат порядок доставки
+DRAIN_LOCK_KEY = 7301
+
+_handlers = defaultdict(list)
+
+
+def handler(topic):
+    """Регистрирует обработчик пачки payload'ов одной темы.
+
+    Доставка at-least-once: при ошибке обработчика пачка передаётся ему
+    повторно, поэтому обработчики должны быть идемпотентными.
+    """
+
+    def register(func):
+        _handlers[topic].append(func)
+        return func
+
+    return register
+
+
+def handler_name(func):
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def dispatch(events):
+    """Передаёт события обработчикам, которые их ещё не приняли.
+
+    Каждый обработчик работает в своей точке сохранения, принявшие пачку
+    записываются в event.delivered_to. Возвращает {id события: ошибка}
+    для событий, которые не принял хотя бы один обработчик.
+    """
+    by_topic = defaultdict(list)
+    for event in events:
+        by_topic[event.topic].append(event)
+
+    errors = {}
+    for topic, topic_events in by_topic.items():
+        for func in _handlers[topic]:
+            name = handler_name(func)
+            todo = [e for e in topic_events if name not in e.delivered_to]
+            if not todo:
+                continue
+            try:
+                with transaction.atomic():
+                    func([event.payload for event in todo])
+            except Exception as e:
+                logger.exception('Outbox handler %s failed', name)
+                for event in todo:
+                    errors.setdefault(event.id, e)
+                continue
+            for event in todo:
+                event.delivered_to.append(name)
+    return errors
+
+
+def stats():
+    pending = OutboxEvent.objects.pending()
+    oldest = pending.aggregate(oldest=Min('created_at'))['oldest']
+    return {
+        'pending': pending.count(),
+        'failed': OutboxEvent.objects.failed().count(),
+        'lag_seconds': (
+            (timezone.now() - oldest).total_seconds() if oldest else 0
+        ),
+    }
+
+
+def drain(batch_size=None, max_batches=None):
+    """Разбирает очередь пачками по порядку id.
+
+    За один запуск обрабатывается не больше max_batches пачек, остаток ждёт
+    следующего запуска задачи. Событие, которое не принял обработчик,
+    остаётся в очереди, и разбор останавливается, чтобы следующие события
+    не обогнали его. После OUTBOX_MAX_ATTEMPTS попыток событие получает
+    failed_at и больше не задерживает очередь.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    max_batches = max_batches or settings.OUTBOX_MAX_BATCHES
+    processed = 0
+
+    for _ in range(max_batches):
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT pg_try_advisory_xact_lock(%s)', [DRAIN_LOCK_KEY]
+                )
+                if not cursor.fetchone()[0]:
+                    break
+
+            events = list(OutboxEvent.objects.pending()[:batch_size])
+            if not events:
+                break
+
+            errors = dispatch(events)
+            now = timezone.now()
+            for event in events:
+                event.attempts += 1
+                error = errors.get(event.id)
+                if error is None:
+                    event.processed_at = now
+                    continue
+                event.last_error = repr(error)
+                if event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                    event.failed_at = now
+                    logger.error(
+                        'Outbox event %s failed after %s attempts',
+                        event.id,
+                        event.attempts,
+                    )
+            OutboxEvent.objects.bulk_update(
+                events,
+                [
+                    'attempts',
+                    'processed_at',
+                    'last_error',
+                    'delivered_to',
+                    'failed_at',
+                ],
+            )
+            processed += len(events) - len(errors)
+            if errors:
+                break
+
+    metrics = stats()
+    logger.info(
+        'Outbox: processed %s, pending %s, failed %s, lag %.1fs',
+        processed,
+        metrics['pending'],
+        metrics['failed'],
+        metrics['lag_seconds'],
+    )
+    if metrics['lag_seconds'] > settings.OUTBOX_LAG_WARNING:
+        logger.warning('Outbox lag is %.1fs', metrics['lag_seconds'])
+    return {'processed': processed, **metrics}
+
+
+def purge(older_than=None):
+    """Удаляет давно доставленные события."""
+    older_than = older_than or settings.OUTBOX_RETENTION
+    deleted, _ = OutboxEvent.objects.filter(
+        processed_at__lt=timezone.now() - older_than
+    ).delete()
+    return deleted
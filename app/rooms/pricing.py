@@ -0,0 +1,135 @@
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import F
+
+from .models import Room, RoomRate
+
+# 1970-01-01 - четверг, отсюда сдвиг для дня недели (понедельник = 0)
+EPOCH_WEEKDAY = 3
+
+
+def stay_days(start_date, end_date):
+    """Дни проживания включительно, как и в Room.reserved_dates."""
+    return np.arange(
+        np.datetime64(start_date, 'D'),
+        np.datetime64(end_date + timedelta(days=1), 'D'),
+    )
+
+
+def period_rates(room_ids, start_date, end_date):
+    """Тарифы комнат, пересекающие период, в порядке возрастания приоритета."""
+    return (
+        RoomRate.objects.filter(
+            room__in=room_ids,
+            starting_date__lte=end_date,
+            ending_date__gte=start_date,
+        )
+        .order_by(F('weekday').asc(nulls_first=True), 'starting_date')
+        .values_list(
+            'room_id',
+            'starting_date',
+            'ending_date',
+            'weekday',
+            'day_cost',
+            'min_stay',
+        )
+    )
+
+
+def rate_matrix(rooms, rates, start_date, end_date):
+    """Цены за каждый день периода для всех комнат.
+
+    rooms - пары (id, day_cost), rates - строки period_rates. Возвращает
+    матрицу комнаты x дни и минимальный срок проживания по каждой комнате.
+    Тарифы применяются одним проходом numpy: для каждой ячейки выбирается
+    применимый тариф с наибольшим приоритетом.
+    """
+    days = stay_days(start_date, end_date)
+    base = np.array([day_cost for _, day_cost in rooms], dtype=float)
+    matrix = np.repeat(base[:, None], len(days), axis=1)
+    min_stay = np.ones(len(rooms), dtype=int)
+    if not rates:
+        return matrix, min_stay
+
+    index = {room_id: i for i, (room_id, _) in enumerate(rooms)}
+    room_idx = np.array([index[rate[0]] for rate in rates])
+    starts = np.array([rate[1] for rate in rates], dtype='datetime64[D]')
+    ends = np.array([rate[2] for rate in rates], dtype='datetime64[D]')
+    weekdays = np.array(
+        [-1 if rate[3] is None else rate[3] for rate in rates], dtype=int
+    )
+    costs = np.array([rate[4] for rate in rates], dtype=float)
+    rate_min_stay = np.array([rate[5] for rate in rates], dtype=int)
+
+    day_weekdays = (days.astype('int64') + EPOCH_WEEKDAY) % 7
+    applies = (
+        (days[None, :] >= starts[:, None])
+        & (days[None, :] <= ends[:, None])
+        & ((weekdays[:, None] == -1) | (weekdays[:, None] == day_weekdays))
+    )
+
+    # rates отсортированы по приоритету, поэтому номер строки и есть приоритет
+    priority = np.where(applies, np.arange(len(rates))[:, None], -1)
+    best = np.full(matrix.shape, -1)
+    np.maximum.at(best, room_idx, priority)
+    matrix = np.where(best >= 0, costs[best], matrix)
+
+    np.maximum.at(
+        min_stay, room_idx, np.where(applies.any(axis=1), rate_min_stay, 1)
+    )
+    return matrix, min_stay
+
+
+def stay_prices(rooms, rates, start_date, end_date):
+    """Стоимость проживания для каждой комнаты, None - если срок меньше минимального."""
+    if not rooms:
+        return {}
+    matrix, min_stay = rate_matrix(rooms, rates, start_date, end_date)
+    totals = matrix.sum(axis=1)
+    bookable = matrix.shape[1] >= min_stay
+    return {
+        room_id: round(float(total), 2) if ok else None
+        for (room_id, _), total, ok in zip(rooms, totals, bookable)
+    }
+
+
+def quote(rooms, start_date, end_date):
+    rates = list(period_rates([room_id for room_id, _ in rooms], start_date, end_date))
+    return stay_prices(rooms, rates, start_date, end_date)
+
+
+async def aquote(rooms, start_date, end_date):
+    rates = [
+        rate
+        async for rate in period_rates(
+            [room_id for room_id, _ in rooms], start_date, end_date
+        )
+    ]
+    return stay_prices(rooms, rates, start_date, end_date)
+
+
+def price_stay(room, start_date, end_date):
+    """nights и total_price для брони, total_price None - срок меньше минимального."""
+    nights = (end_date - start_date).days + 1
+    return nights, quote([(room.id, room.day_cost)], start_date, end_date)[room.id]
+
+
+def price_room_type(room_type, start_date, end_date):
+    """nights и total_price для брони по типу, None - срок меньше минимального.
+
+    Комната назначается позже, поэтому стоимость считается по тарифам всех
+    активных комнат типа от RoomType.day_cost: берётся наибольшая, а срок
+    должен проходить min_stay каждой из них.
+    """
+    nights = (end_date - start_date).days + 1
+    room_ids = Room.objects.filter(
+        room_type=room_type.id, active=True
+    ).values_list('id', flat=True)
+    rooms = [(room_id, room_type.day_cost) for room_id in room_ids]
+    prices = quote(
+        rooms or [(room_type.id, room_type.day_cost)], start_date, end_date
+    )
+    if None in prices.values():
+        return nights, None
+    return nights, max(prices.values())
@@ -0,0 +1,108 @@
+import logging
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .availability import BLOCKING_STATUSES
+from .models import OverlapFinding, Reservation, Room
+
+logger = logging.getLogger(__name__)
+
+# Один проход окном по броням пачки комнат: для каждой брони max(ending_date)
+# всех предыдущих броней той же комнаты. LAG по соседней брони не видит
+# вложенных интервалов (длинная бронь накрывает несколько следующих), а
+# накопленный максимум видит, поэтому окно - max ... 1 PRECEDING.
+# Бронь, начавшаяся не позже этого максимума, с кем-то пересекается; пары
+# для найденных броней добираются по индексу reservation_room_active_idx.
+FIND_OVERLAPS = """
+WITH swept AS (
+    SELECT
+        r.id,
+        r.room_id,
+        r.starting_date,
+        r.ending_date,
+        max(r.ending_date::date) OVER (
+            PARTITION BY r.room_id
+            ORDER BY r.starting_date, r.id
+            ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+        ) AS covered_until
+    FROM {reservations} AS r
+    WHERE r.room_id = ANY(%(room_ids)s) AND r.status = ANY(%(statuses)s)
+)
+INSERT INTO {findings} (
+    room_id,
+    reservation_id,
+    conflicting_reservation_id,
+    overlap_start,
+    overlap_end,
+    detected_at,
+    checked_at
+)
+SELECT
+    s.room_id,
+    s.id,
+    o.id,
+    greatest(s.starting_date::date, o.starting_date::date),
+    least(s.ending_date::date, o.ending_date::date),
+    %(now)s,
+    %(now)s
+FROM swept AS s
+JOIN {reservations} AS o
+    ON o.room_id = s.room_id
+    AND o.status = ANY(%(statuses)s)
+    AND (o.starting_date, o.id) < (s.starting_date, s.id)
+    AND o.ending_date::date >= s.starting_date::date
+WHERE s.starting_date::date <= s.covered_until
+ON CONFLICT (reservation_id, conflicting_reservation_id) DO UPDATE SET
+    overlap_start = EXCLUDED.overlap_start,
+    overlap_end = EXCLUDED.overlap_end,
+    checked_at = EXCLUDED.checked_at
+"""
+
+
+def table(model):
+    return model._meta.db_table.replace('"."', '.')
+
+
+def reconcile_rooms(room_ids, now):
+    """Проверяет пачку комнат, возвращает число найденных пар."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            FIND_OVERLAPS.format(
+                reservations=table(Reservation),
+                findings=table(OverlapFinding),
+            ),
+            {
+                'room_ids': list(room_ids),
+                'statuses': [str(status) for status in BLOCKING_STATUSES],
+                'now': now,
+            },
+        )
+        found = cursor.rowcount
+        # пары, не подтверждённые этой проверкой, уже разрешены
+        OverlapFinding.objects.filter(
+            room__in=room_ids, checked_at__lt=now
+        ).delete()
+    return found
+
+
+def reconcile(batch_size=None):
+    """Сверка всех комнат пачками по id, каждая пачка - своя транзакция."""
+    batch_size = batch_size or 1000
+    now = timezone.now()
+    last_id = None
+    rooms = found = 0
+    while True:
+        queryset = Room.objects.order_by('id')
+        if last_id is not None:
+            queryset = queryset.filter(id__gt=last_id)
+        room_ids = list(queryset.values_list('id', flat=True)[:batch_size])
+        if not room_ids:
+            break
+        found += reconcile_rooms(room_ids, now)
+        rooms += len(room_ids)
+        last_id = room_ids[-1]
+
+    if found:
+        logger.warning('Found %s overlapping reservation pairs', found)
+    return {'rooms': rooms, 'overlaps': found}
@@ -0,0 +1,25 @@
+import asyncio
+import weakref
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+from redis import asyncio as aioredis
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+@lru_cache(maxsize=None)
+def get_redis():
+    return redis.Redis.from_url(settings.REDIS_URL)
+
+
+def get_async_redis():
+    # пул соединений redis.asyncio привязан к event loop, поэтому клиент
+    # держим отдельно на каждый loop
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = aioredis.Redis.from_url(settings.REDIS_URL)
+        _async_clients[loop] = client
+    return client
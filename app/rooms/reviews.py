@@ -0,0 +1,102 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.utils import timezone
+
+from .models import Reservation, Review, Room
+
+
+class ReviewError(Exception):
+    """Отзыв оставить нельзя, detail отдаётся клиенту как тело ответа 400."""
+
+    def __init__(self, detail):
+        super().__init__(detail)
+        self.detail = detail
+
+
+def rating(total, count):
+    """rating = total / count, 0 для комнаты без отзывов."""
+    return Coalesce(
+        Cast(total, FloatField()) / NullIf(count, 0),
+        0.0,
+        output_field=FloatField(),
+    )
+
+
+def apply_review_change(room_id, count_delta, score_delta):
+    """Сдвигает счётчики отзывов комнаты одним UPDATE.
+
+    Строка комнаты блокируется до конца транзакции отзыва, поэтому
+    параллельные отзывы не теряют приращений и AVG() по всем отзывам не
+    нужен.
+    """
+    total = F('rating_total') + score_delta
+    count = F('reviews_count') + count_delta
+    Room.objects.filter(pk=room_id).update(
+        rating_total=total,
+        reviews_count=count,
+        rating=rating(total, count),
+        # меняет ETag комнаты, см. rooms.conditional
+        updated_at=timezone.now(),
+    )
+
+
+def create_review(reservation, score, text=''):
+    """Отзыв о завершённой брони, счётчики комнаты - в той же транзакции."""
+    if reservation.status != Reservation.Status.Expired:
+        raise ReviewError({'Only expired reservations can be reviewed'})
+    if reservation.room_id is None:
+        raise ReviewError({'Reservation has no room'})
+    try:
+        with transaction.atomic():
+            return Review.objects.create(
+                reservation=reservation,
+                room_id=reservation.room_id,
+                user_id=reservation.user_id,
+                score=score,
+                text=text,
+            )
+    except IntegrityError:
+        raise ReviewError({'Reservation is already reviewed'})
+
+
+def backfill(batch_size=None):
+    """Пересчёт счётчиков всех комнат пачками по id.
+
+    Нужен один раз для уже существующих отзывов или после ручных правок
+    в базе, в обычной работе счётчики ведёт apply_review_change.
+    """
+    batch_size = batch_size or 1000
+    reviews = Review.objects.filter(room=OuterRef('pk')).values('room')
+    count = Coalesce(
+        Subquery(reviews.annotate(value=Count('pk')).values('value')), 0
+    )
+    total = Coalesce(
+        Subquery(reviews.annotate(value=Sum('score')).values('value')), 0
+    )
+    last_id = None
+    rooms = 0
+    while True:
+        queryset = Room.objects.order_by('id')
+        if last_id is not None:
+            queryset = queryset.filter(id__gt=last_id)
+        room_ids = list(queryset.values_list('id', flat=True)[:batch_size])
+        if not room_ids:
+            break
+        with transaction.atomic():
+            # те же блокировки, что берёт apply_review_change
+            list(
+                Room.objects.select_for_update()
+                .filter(id__in=room_ids)
+                .order_by('id')
+                .values_list('id', flat=True)
+            )
+            Room.objects.filter(id__in=room_ids).update(
+                reviews_count=count,
+                rating_total=total,
+                rating=rating(total, count),
+                updated_at=timezone.now(),
+            )
+        rooms += len(room_ids)
+        last_id = room_ids[-1]
+    return rooms
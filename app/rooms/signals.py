@@ -1,7 +1,23 @@
-from django.db.models.signals import pre_save
+import uuid
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
 from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from . import audit, availability, ical, inventory, outbox, reviews
+from .authentication import user_cache_key
+from .models import OutboxEvent, Reservation, Review, Room, RoomClosure
 
-from .models import Room
+User = get_user_model()
 
 
 @receiver(pre_save, sender=Room)
@@ -15,3 +31,159 @@ def calculate_travellers(sender, instance, **kwargs):
         instance.travellers = 2
     elif instance.sleeping_area == Room.BedType.DoubleTwinBunk:
         instance.travellers = 4
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # изменения (в том числе is_active) должны сразу попасть в аутентификацию;
+    # ключ удаляется после коммита, иначе параллельный запрос успеет снова
+    # закэшировать пользователя в состоянии до изменения
+    key = user_cache_key(getattr(instance, api_settings.USER_ID_FIELD))
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(m2m_changed, sender=User.user_permissions.through)
+def invalidate_cached_user_access(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    # группы и права меняют доступ так же, как is_staff; при reverse
+    # instance - группа или право, а пользователи приходят в pk_set
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        users = [instance]
+    elif action == 'pre_clear':
+        users = list(instance.user_set.all())
+    else:
+        users = list(User.objects.filter(pk__in=pk_set))
+    keys = [
+        user_cache_key(getattr(user, api_settings.USER_ID_FIELD))
+        for user in users
+    ]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+@receiver(post_save, sender=Reservation)
+@receiver(post_save, sender=Room)
+@receiver(post_save, sender=RoomClosure)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Reservation)
+@receiver(post_delete, sender=Room)
+@receiver(post_delete, sender=RoomClosure)
+@receiver(post_delete, sender=Review)
+def invalidate_room_search(sender, instance, **kwargs):
+    availability.bump_version()
+
+
+@receiver(post_save, sender=RoomClosure)
+@receiver(post_delete, sender=RoomClosure)
+def invalidate_closure_calendar(sender, instance, **kwargs):
+    # изменения броней сбрасывают ленты через outbox, см. rooms.ical
+    ical.invalidate([instance.room_id])
+
+
+@receiver(post_delete, sender=Room)
+def invalidate_room_calendar(sender, instance, **kwargs):
+    ical.invalidate([instance.pk])
+
+
+def serialize_state(state):
+    if state is None:
+        return None
+    return {
+        'room_id': state['room_id'] and str(state['room_id']),
+        'room_type_id': state['room_type_id'] and str(state['room_type_id']),
+        'status': state['status'],
+        'starting_date': state['starting_date'].isoformat(),
+        'ending_date': state['ending_date'].isoformat(),
+    }
+
+
+def reservation_change_payload(instance, deleted=False):
+    """Событие outbox об изменении брони, None - если ничего не поменялось."""
+    before = instance._loaded_state
+    after = None if deleted else instance.current_state()
+    if before == after:
+        return None
+    actor_id, source = audit.current()
+    return {
+        'event_id': uuid.uuid4().hex,
+        'reservation': str(instance.id),
+        'before': serialize_state(before),
+        'after': serialize_state(after),
+        'deltas': availability.reservation_deltas(instance, deleted),
+        # для истории брони, rooms.audit
+        'actor': actor_id,
+        'source': source,
+        'changed_at': timezone.now().isoformat(),
+    }
+
+
+def enqueue_reservation_change(instance, deleted=False):
+    payload = reservation_change_payload(instance, deleted)
+    if payload is not None:
+        OutboxEvent.objects.enqueue(outbox.RESERVATION_CHANGED, payload)
+
+
+@receiver(pre_save, sender=Reservation)
+def set_reservation_room_type(sender, instance, **kwargs):
+    # бронь конкретной комнаты тоже занимает место в пуле её типа
+    if instance.room_id:
+        instance.room_type_id = instance.room.room_type_id
+
+
+@receiver(post_save, sender=Reservation)
+def record_reservation_change(sender, instance, **kwargs):
+    inventory.apply_reservation_change(instance)
+    enqueue_reservation_change(instance)
+    instance.remember_state()
+
+
+@receiver(post_delete, sender=Reservation)
+def record_reservation_removal(sender, instance, **kwargs):
+    inventory.apply_reservation_change(instance, deleted=True)
+    enqueue_reservation_change(instance, deleted=True)
+
+
+@receiver(pre_save, sender=Room)
+def remember_room_type(sender, instance, **kwargs):
+    instance._previous_room_type_id = (
+        Room.objects.filter(pk=instance.pk)
+        .values_list('room_type_id', flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Room)
+def move_room_between_types(sender, instance, created, **kwargs):
+    previous = instance._previous_room_type_id
+    if not created and previous != instance.room_type_id:
+        inventory.move_room(instance, previous)
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_score(sender, instance, **kwargs):
+    instance._previous_score = (
+        None
+        if instance._state.adding
+        else Review.objects.filter(pk=instance.pk)
+        .values_list('score', flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Review)
+def record_review(sender, instance, created, **kwargs):
+    if created:
+        reviews.apply_review_change(instance.room_id, 1, instance.score)
+    elif instance._previous_score != instance.score:
+        reviews.apply_review_change(
+            instance.room_id, 0, instance.score - instance._previous_score
+        )
+
+
+@receiver(post_delete, sender=Review)
+def record_review_removal(sender, instance, **kwargs):
+    reviews.apply_review_change(instance.room_id, -1, -instance.score)
@@ -1,14 +1,62 @@
+import io
+import json
+import tempfile
+import uuid
 from datetime import datetime, timedelta
+from unittest import mock
 
 import factory
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import override_settings
 from django.urls import reverse
-from rest_framework import status
+from django.utils import timezone
+from rest_framework import status, viewsets
+from rest_framework.pagination import PageNumberPagination
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
 from rest_framework_simplejwt.tokens import RefreshToken
 
-from .models import Reservation, Room
+from app import schema, warmup
+
+from . import (
+    analytics,
+    audit,
+    booking_queue,
+    closures,
+    connections,
+    export,
+    holds,
+    ical,
+    importer,
+    inventory,
+    outbox,
+    reconciliation,
+    reviews,
+)
+from .authentication import CachedJWTAuthentication, user_cache_key
+from .availability import FREE, RESERVED, reservation_deltas
+from .conditional import ConditionalGetMixin
+from .middleware import ReplicaRoutingMiddleware
+from .models import (
+    OutboxEvent,
+    OverlapFinding,
+    Reservation,
+    ReservationAudit,
+    Room,
+    RoomClosure,
+    RoomRate,
+    RoomType,
+    RoomTypeNight,
+)
+from .pricing import stay_prices
+from .redis import get_redis
+from .routers import PrimaryReplicaRouter, replica_reads
 
 User = get_user_model()
 
@@ -121,6 +169,45 @@ class ReservationViewSetTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Reservation.objects.count(), 1)
 
+    def test_create_reservation_price(self):
+        """При бронировании сохраняются количество дней и стоимость"""
+
+        room = RoomFactory(day_cost=100)
+        reservation_data = {
+            'starting_date': str(datetime.now()),
+            'ending_date': str(datetime.now() + timedelta(2)),
+            'room': room.id,
+        }
+
+        self.get_authenticated_client()
+        response = self.client.post(
+            self.list_url, reservation_data, format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['nights'], 3)
+        self.assertEqual(response.data['total_price'], 300)
+
+    def test_order_reservations_by_price(self):
+        """Фильтрация и сортировка броней по стоимости"""
+
+        for total_price in (300, 100, 200):
+            ReservationFactory(
+                user=self.user, nights=1, total_price=total_price
+            )
+
+        self.get_authenticated_client()
+        response = self.client.get(
+            self.list_url,
+            {'ordering': '-total_price', 'total_price__gte': 150},
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [reservation['total_price'] for reservation in response.data],
+            [300, 200],
+        )
+
     def test_get_reservation_list(self):
         """Получение списка броней"""
 
@@ -341,3 +428,1717 @@ class TestFilers(TestCase):
         self.assertEqual(Room.objects.count(), 2)
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]['id'], str(room.id))
+
+
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.authentication = CachedJWTAuthentication()
+        self.token = self.authentication.get_validated_token(
+            str(RefreshToken.for_user(self.user).access_token)
+        )
+
+    def test_user_is_cached(self):
+        """Повторная аутентификация по токену не ходит в базу"""
+
+        self.authentication.get_user(self.token)
+
+        with self.assertNumQueries(0):
+            user = self.authentication.get_user(self.token)
+
+        self.assertEqual(user.id, self.user.id)
+
+    def test_deactivated_user_is_rejected(self):
+        """Деактивация пользователя сбрасывает кэш"""
+
+        self.authentication.get_user(self.token)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(self.token)
+
+    def test_cache_holds_only_access_fields(self):
+        """В кэш попадают id и флаги доступа, но не пароль"""
+
+        self.authentication.get_user(self.token)
+
+        state = cache.get(user_cache_key(self.user.id))
+        self.assertEqual(state['pk'], self.user.pk)
+        self.assertNotIn('password', state)
+
+    @mock.patch.object(api_settings, 'CHECK_REVOKE_TOKEN', True)
+    def test_revoked_token_is_rejected_from_cache(self):
+        """Смена пароля отзывает токен и для закэшированного пользователя"""
+
+        token = self.authentication.get_validated_token(
+            str(RefreshToken.for_user(self.user).access_token)
+        )
+        self.authentication.get_user(token)
+        cache.set(
+            user_cache_key(self.user.id),
+            {
+                **cache.get(user_cache_key(self.user.id)),
+                'password_hash': 'changed',
+            },
+        )
+
+        with self.assertRaises(AuthenticationFailed):
+            self.authentication.get_user(token)
+
+    def test_group_change_drops_cache(self):
+        """Добавление в группу сбрасывает кэш пользователя"""
+
+        self.authentication.get_user(self.token)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.add(Group.objects.create(name='managers'))
+
+        self.assertIsNone(cache.get(user_cache_key(self.user.id)))
+
+
+class AsyncRoomTests(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.room = RoomFactory()
+        self.list_url = reverse('room-async-list')
+
+    async def test_get_room_list(self):
+        """Асинхронный список комнат"""
+
+        response = await self.async_client.get(self.list_url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 1)
+
+    @mock.patch.object(PageNumberPagination, 'page_size', 1)
+    async def test_room_list_is_paginated(self):
+        """Асинхронный список отдаёт страницы в конверте синхронного /rooms/"""
+
+        await sync_to_async(RoomFactory)()
+
+        response = await self.async_client.get(self.list_url)
+
+        body = response.json()
+        self.assertEqual(body['count'], 2)
+        self.assertEqual(len(body['results']), 1)
+        self.assertIsNotNone(body['next'])
+        self.assertIsNone(body['previous'])
+
+    async def test_date_filter(self):
+        """Асинхронный поиск скрывает полностью занятые комнаты"""
+
+        today = datetime.now()
+        await Reservation.objects.acreate(
+            starting_date=today,
+            ending_date=today + timedelta(3),
+            room=self.room,
+            user=self.user,
+        )
+
+        response = await self.async_client.get(
+            self.list_url,
+            {
+                'start_date': str(today.date()),
+                'end_date': str(today.date() + timedelta(1)),
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 0)
+
+    async def test_get_room_detail(self):
+        """Асинхронное получение конкретной комнаты"""
+
+        response = await self.async_client.get(
+            reverse('room-async-detail', args=[self.room.id])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['name'], self.room.name)
+
+
+class AvailabilityDeltaTests(TestCase):
+    def setUp(self):
+        self.reservation = ReservationFactory(
+            starting_date=datetime.now(),
+            ending_date=datetime.now() + timedelta(2),
+        )
+
+    def test_refused_reservation_frees_dates(self):
+        """Отмена брони освобождает её период"""
+
+        self.reservation.status = Reservation.Status.Refused
+
+        deltas = reservation_deltas(self.reservation)
+
+        self.assertEqual(len(deltas), 1)
+        self.assertEqual(deltas[0]['state'], FREE)
+        self.assertEqual(deltas[0]['room'], str(self.reservation.room_id))
+
+    def test_moved_reservation(self):
+        """Перенос брони освобождает старый период и занимает новый"""
+
+        self.reservation.ending_date += timedelta(1)
+
+        deltas = reservation_deltas(self.reservation)
+
+        self.assertEqual(
+            [delta['state'] for delta in deltas], [FREE, RESERVED]
+        )
+        self.assertEqual(
+            deltas[1]['end_date'], str(self.reservation.ending_date.date())
+        )
+
+    def test_status_transition_without_changes(self):
+        """Booked -> Active не меняет доступность"""
+
+        self.reservation.status = Reservation.Status.Active
+
+        self.assertEqual(reservation_deltas(self.reservation), [])
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        self.reservation = ReservationFactory()
+
+    def test_reservation_change_is_recorded(self):
+        """Изменение брони пишет событие в outbox"""
+
+        self.reservation.status = Reservation.Status.Refused
+        self.reservation.save()
+
+        event = OutboxEvent.objects.pending().last()
+
+        self.assertEqual(event.topic, outbox.RESERVATION_CHANGED)
+        self.assertEqual(event.payload['after']['status'], 'refused')
+        self.assertEqual(event.payload['deltas'][0]['state'], 'free')
+
+    def test_drain(self):
+        """События доставляются пачкой и помечаются обработанными"""
+
+        received = []
+        with mock.patch.dict(
+            outbox._handlers, {outbox.RESERVATION_CHANGED: [received.extend]}
+        ):
+            result = outbox.drain()
+
+        self.assertEqual(result['processed'], 1)
+        self.assertEqual(result['pending'], 0)
+        self.assertEqual(received[0]['reservation'], str(self.reservation.id))
+
+    def test_failed_batch_stays_pending(self):
+        """Упавшая пачка остаётся в очереди для повторной доставки"""
+
+        def fail(payloads):
+            raise RuntimeError('partner is down')
+
+        with mock.patch.dict(
+            outbox._handlers, {outbox.RESERVATION_CHANGED: [fail]}
+        ):
+            result = outbox.drain()
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual(result['processed'], 0)
+        self.assertIsNone(event.processed_at)
+        self.assertEqual(event.attempts, 1)
+
+    def test_retry_skips_delivered_handlers(self):
+        """Повтор вызывает только упавший обработчик"""
+
+        received = []
+        calls = []
+
+        def flaky(payloads):
+            calls.append(payloads)
+            if len(calls) == 1:
+                raise RuntimeError('partner is down')
+
+        handlers = {outbox.RESERVATION_CHANGED: [received.extend, flaky]}
+        with mock.patch.dict(outbox._handlers, handlers):
+            outbox.drain()
+            result = outbox.drain()
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual(result['processed'], 1)
+        self.assertEqual(len(received), 1)
+        self.assertEqual(len(calls), 2)
+        self.assertIsNotNone(event.processed_at)
+
+    @override_settings(OUTBOX_MAX_ATTEMPTS=2)
+    def test_exhausted_event_is_parked(self):
+        """После OUTBOX_MAX_ATTEMPTS событие помечается failed"""
+
+        def fail(payloads):
+            raise RuntimeError('partner is down')
+
+        with mock.patch.dict(
+            outbox._handlers, {outbox.RESERVATION_CHANGED: [fail]}
+        ):
+            outbox.drain()
+            result = outbox.drain()
+
+        event = OutboxEvent.objects.get()
+        self.assertEqual(result['pending'], 0)
+        self.assertEqual(result['failed'], 1)
+        self.assertIsNotNone(event.failed_at)
+        self.assertIsNone(event.processed_at)
+
+
+class ThrottlingTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = UserFactory()
+
+    def test_search_is_throttled(self):
+        """Исчерпанная квота поиска отдаёт 429 с Retry-After"""
+
+        bucket = mock.Mock(return_value=[0, '2.5'])
+        with mock.patch('rooms.throttling.token_bucket', return_value=bucket):
+            response = self.client.get(reverse('room-list'))
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '3')
+        self.assertEqual(
+            bucket.call_args.kwargs['keys'], ['throttle:search:ip:127.0.0.1']
+        )
+
+    def test_booking_quota_is_per_user(self):
+        """Квота броней считается по пользователю"""
+
+        bucket = mock.Mock(return_value=[1, '0'])
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {str(refresh.access_token)}'
+        )
+        with mock.patch('rooms.throttling.token_bucket', return_value=bucket):
+            response = self.client.post(
+                reverse('reservation-list'), {}, format='json'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            bucket.call_args.kwargs['keys'],
+            [f'throttle:booking:user:{self.user.pk}'],
+        )
+
+    def test_reading_reservations_is_not_throttled(self):
+        """Список своих броней не расходует квоту броней"""
+
+        bucket = mock.Mock(return_value=[0, '2.5'])
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {str(refresh.access_token)}'
+        )
+        with mock.patch('rooms.throttling.token_bucket', return_value=bucket):
+            response = self.client.get(reverse('reservation-list'))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        bucket.assert_not_called()
+
+
+class StayPriceTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.list_url = reverse('room-list')
+        self.start_date = datetime.now().date()
+        self.end_date = self.start_date + timedelta(2)
+
+    def test_rates_precedence(self):
+        """Тариф по дню недели важнее сезонного, вне тарифов - day_cost"""
+
+        monday = datetime(2026, 10, 19).date()
+        rooms = [('room', 100.0)]
+        rates = [
+            ('room', monday, monday + timedelta(6), None, 200.0, 1),
+            ('room', monday, monday + timedelta(6), 5, 300.0, 1),
+        ]
+
+        prices = stay_prices(rooms, rates, monday, monday + timedelta(7))
+
+        # пн-пт и вс по 200, сб 300, следующий пн без тарифа
+        self.assertEqual(prices['room'], 200 * 6 + 300 + 100)
+
+    def test_min_stay(self):
+        """Период короче минимального срока недоступен"""
+
+        monday = datetime(2026, 10, 19).date()
+        rates = [('room', monday, monday, None, 200.0, 3)]
+
+        prices = stay_prices([('room', 100.0)], rates, monday, monday)
+
+        self.assertIsNone(prices['room'])
+
+    def test_sort_by_total_price(self):
+        """Сортировка поиска по стоимости проживания"""
+
+        cheap = RoomFactory(day_cost=100)
+        expensive = RoomFactory(day_cost=50)
+        RoomRate.objects.create(
+            room=expensive,
+            starting_date=self.start_date,
+            ending_date=self.end_date,
+            day_cost=500,
+        )
+
+        response = self.client.get(
+            self.list_url,
+            data={
+                'start_date': str(self.start_date),
+                'end_date': str(self.end_date),
+                'ordering': '-total_price',
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['id'], str(expensive.id))
+        self.assertEqual(response.data[0]['total_price'], 1500)
+        self.assertEqual(response.data[1]['id'], str(cheap.id))
+
+    def test_max_total_price_filter(self):
+        """Фильтр по максимальной стоимости проживания"""
+
+        room = RoomFactory(day_cost=100)
+        RoomFactory(day_cost=1000)
+
+        response = self.client.get(
+            self.list_url,
+            data={
+                'start_date': str(self.start_date),
+                'end_date': str(self.end_date),
+                'max_total_price': 300,
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['id'], str(room.id))
+
+
+class OccupancyAnalyticsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = UserFactory(is_staff=True)
+        self.room = RoomFactory(day_cost=100)
+        self.today = datetime.now().date()
+        self.reservation = ReservationFactory(
+            room=self.room,
+            starting_date=datetime.now(),
+            ending_date=datetime.now() + timedelta(2),
+        )
+        self.url = reverse('analytics-occupancy')
+
+    def drain_rollup(self):
+        with mock.patch.dict(
+            outbox._handlers,
+            {outbox.RESERVATION_CHANGED: [analytics.update_rollup]},
+        ):
+            outbox.drain()
+
+    def get_report(self, group_by):
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {str(refresh.access_token)}'
+        )
+        return self.client.get(
+            self.url,
+            data={
+                'start_date': str(self.today),
+                'end_date': str(self.today + timedelta(3)),
+                'group_by': group_by,
+            },
+        )
+
+    def test_room_report(self):
+        """Проданные ночи и выручка по комнате"""
+
+        self.drain_rollup()
+
+        response = self.get_report('room')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['room_nights'], 3)
+        self.assertEqual(response.data[0]['revenue'], 300)
+        self.assertEqual(response.data[0]['occupancy'], 0.75)
+
+    def test_refused_reservation_is_removed(self):
+        """Отмена брони инкрементально убирает её из отчёта"""
+
+        self.reservation.status = Reservation.Status.Refused
+        self.reservation.save()
+        self.drain_rollup()
+
+        response = self.get_report('sleeping_area')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['room_nights'], 0)
+        self.assertEqual(response.data[0]['revenue'], 0)
+
+    def test_rollup_refreshes_each_room_separately(self):
+        """Изменения разных комнат пересчитываются своими периодами"""
+
+        other = RoomFactory()
+        payloads = [
+            {
+                'before': None,
+                'after': {
+                    'room_id': str(room_id),
+                    'starting_date': str(starting_date),
+                    'ending_date': str(starting_date + timedelta(1)),
+                },
+            }
+            for room_id, starting_date in (
+                (self.room.id, self.today),
+                (other.id, self.today + timedelta(300)),
+            )
+        ]
+
+        with mock.patch('rooms.analytics.refresh') as refresh:
+            analytics.update_rollup(payloads)
+
+        self.assertEqual(
+            sorted(call.args for call in refresh.call_args_list),
+            [
+                ([str(self.room.id)], self.today, self.today + timedelta(1)),
+                (
+                    [str(other.id)],
+                    self.today + timedelta(300),
+                    self.today + timedelta(301),
+                ),
+            ],
+        )
+
+    def test_report_is_admin_only(self):
+        """Отчёт недоступен обычному пользователю"""
+
+        self.admin.is_staff = False
+        self.admin.save()
+
+        response = self.get_report('day')
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class RoomSearchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.list_url = reverse('room-list')
+        self.room = RoomFactory(name='Ocean view suite', day_cost=300)
+        RoomFactory(name='Garden dorm', number='G-1', day_cost=100)
+
+    def test_search_with_typo(self):
+        """Поиск по названию с опечаткой"""
+
+        response = self.client.get(self.list_url, {'q': 'ocean vew'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['id'], str(self.room.id))
+
+    def test_search_combines_with_filters(self):
+        """Поиск сочетается с фильтром стоимости"""
+
+        response = self.client.get(
+            self.list_url, {'q': 'ocean', 'day_cost': 200}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 0)
+
+
+class RoomTypeInventoryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = UserFactory()
+        self.room_type = RoomType.objects.create(
+            name='Standard double',
+            sleeping_area=Room.BedType.Double,
+            day_cost=100,
+        )
+        self.rooms = [
+            RoomFactory(room_type=self.room_type, day_cost=100)
+            for _ in range(2)
+        ]
+        self.today = datetime.now().date()
+        self.book_url = reverse('room-type-book', args=[self.room_type.id])
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {str(refresh.access_token)}'
+        )
+
+    def book(self):
+        return self.client.post(
+            self.book_url,
+            {
+                'starting_date': str(datetime.now()),
+                'ending_date': str(datetime.now() + timedelta(days=1)),
+            },
+            format='json',
+        )
+
+    def test_room_reservation_uses_type_pool(self):
+        """Бронь конкретной комнаты уменьшает свободные места типа"""
+
+        ReservationFactory(
+            room=self.rooms[0],
+            starting_date=datetime.now(),
+            ending_date=datetime.now(),
+        )
+
+        response = self.client.get(
+            reverse('room-type-list'),
+            {
+                'start_date': str(self.today),
+                'end_date': str(self.today + timedelta(days=1)),
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data[0]['available'], 1)
+
+    def test_book_room_type(self):
+        """Бронь по типу без комнаты с ценой типа"""
+
+        response = self.book()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        reservation = Reservation.objects.get()
+        self.assertIsNone(reservation.room)
+        self.assertEqual(reservation.total_price, 200)
+        self.assertEqual(RoomTypeNight.objects.get(date=self.today).sold, 1)
+
+    def test_book_room_type_uses_rates(self):
+        """Бронь по типу учитывает тарифы и минимальный срок комнат типа"""
+
+        rate = RoomRate.objects.create(
+            room=self.rooms[0],
+            starting_date=self.today,
+            ending_date=self.today + timedelta(days=1),
+            day_cost=150,
+        )
+
+        response = self.book()
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Reservation.objects.get().total_price, 300)
+
+        rate.min_stay = 3
+        rate.save()
+        response = self.book()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Reservation.objects.count(), 1)
+
+    def test_sold_out_room_type(self):
+        """Третья бронь на две комнаты отклоняется"""
+
+        self.book()
+        self.book()
+        response = self.book()
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Reservation.objects.count(), 2)
+
+    def test_assign_room(self):
+        """Брони по типу назначается свободная комната"""
+
+        self.book()
+        reservation = Reservation.objects.get()
+
+        room = inventory.assign_room(reservation)
+
+        self.assertIn(room, self.rooms)
+        self.assertEqual(RoomTypeNight.objects.get(date=self.today).sold, 1)
+
+
+class BookingHoldTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = UserFactory()
+        self.other_user = UserFactory()
+        self.room = RoomFactory()
+        self.today = datetime.now().date()
+        self.hold_url = reverse('reservation-hold')
+
+    def authenticate(self, user):
+        refresh = RefreshToken.for_user(user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {str(refresh.access_token)}'
+        )
+
+    def stay(self):
+        return {
+            'starting_date': str(self.today),
+            'ending_date': str(self.today + timedelta(days=1)),
+            'room': self.room.id,
+        }
+
+    def test_hold_blocks_other_users(self):
+        """Холд не даёт забронировать и удержать комнату другим"""
+
+        self.authenticate(self.user)
+        response = self.client.post(self.hold_url, self.stay(), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.authenticate(self.other_user)
+        held = self.client.post(self.hold_url, self.stay(), format='json')
+        booked = self.client.post(
+            reverse('reservation-list'), self.stay(), format='json'
+        )
+
+        self.assertEqual(held.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(booked.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Reservation.objects.count(), 0)
+
+    def test_held_room_is_not_found(self):
+        """Комната под холдом на весь период не попадает в поиск"""
+
+        holds.place(
+            self.room.id,
+            self.today,
+            self.today + timedelta(days=1),
+            self.user.pk,
+        )
+
+        response = self.client.get(
+            reverse('room-list'),
+            {
+                'start_date': str(self.today),
+                'end_date': str(self.today + timedelta(days=1)),
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 0)
+
+    def test_confirm_hold(self):
+        """Подтверждение холда создаёт бронь и снимает холд"""
+
+        self.authenticate(self.user)
+        hold_id = self.client.post(
+            self.hold_url, self.stay(), format='json'
+        ).data['hold']
+
+        response = self.client.post(
+            reverse('reservation-confirm-hold', args=[hold_id])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Reservation.objects.get().room, self.room)
+        self.assertIsNone(holds.get(hold_id))
+
+    def test_confirm_foreign_hold(self):
+        """Чужой холд подтвердить нельзя"""
+
+        hold_id = holds.place(
+            self.room.id, self.today, self.today, self.other_user.pk
+        )
+        self.authenticate(self.user)
+
+        response = self.client.post(
+            reverse('reservation-confirm-hold', args=[hold_id])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Reservation.objects.count(), 0)
+
+    def test_expired_hold_is_cleaned_up(self):
+        """Истёкший холд не мешает брони и убирается задачей, а не чтением"""
+
+        client = get_redis()
+        key = holds.ROOM_HOLDS_KEY.format(self.room.id)
+        client.hset(
+            key, 'expired', f'{self.today}|{self.today}|0|{self.other_user.pk}'
+        )
+        client.sadd(holds.HELD_ROOMS_KEY, str(self.room.id))
+
+        held = holds.is_held(self.room.id, self.today, self.today)
+
+        self.assertFalse(held)
+        self.assertTrue(client.hexists(key, 'expired'))
+        holds.cleanup()
+        self.assertFalse(client.exists(key))
+        self.assertFalse(
+            client.sismember(holds.HELD_ROOMS_KEY, str(self.room.id))
+        )
+
+
+class BookingQueueTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = UserFactory()
+        self.room = RoomFactory()
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {str(refresh.access_token)}'
+        )
+
+    def queue(self):
+        return self.client.post(
+            reverse('reservation-queue-booking'),
+            {
+                'starting_date': str(datetime.now()),
+                'ending_date': str(datetime.now()),
+                'room': self.room.id,
+            },
+            format='json',
+        )
+
+    @mock.patch('rooms.booking_queue.dispatch')
+    def test_queued_booking_is_confirmed(self, dispatch):
+        """Запрос принимается с 202, воркер раздела создаёт бронь"""
+
+        response = self.queue()
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        partition = booking_queue.partition(self.room.id)
+        dispatch.assert_called_once_with(partition)
+        self.assertEqual(Reservation.objects.count(), 0)
+
+        booking_queue.consume(partition)
+
+        reservation = Reservation.objects.get()
+        status_response = self.client.get(response.data['status_url'])
+        self.assertEqual(status_response.data['status'], 'confirmed')
+        self.assertEqual(
+            status_response.data['reservation'], str(reservation.id)
+        )
+
+    @mock.patch('rooms.booking_queue.dispatch')
+    def test_conflicting_request_is_rejected(self, dispatch):
+        """Второй запрос на те же даты отклоняется воркером"""
+
+        first = self.queue()
+        second = self.queue()
+        booking_queue.consume(booking_queue.partition(self.room.id))
+
+        self.assertEqual(Reservation.objects.count(), 1)
+        self.assertEqual(
+            booking_queue.get_status(first.data['request'])['status'],
+            'confirmed',
+        )
+        self.assertEqual(
+            booking_queue.get_status(second.data['request'])['status'],
+            'rejected',
+        )
+
+    @mock.patch('rooms.booking_queue.dispatch')
+    def test_redelivery_after_commit_is_confirmed(self, dispatch):
+        """Повторная доставка после создания брони её не отклоняет"""
+
+        request_id = self.queue().data['request']
+        fields = {
+            'request': request_id,
+            'user': str(self.user.id),
+            'room': str(self.room.id),
+            'starting_date': str(datetime.now().date()),
+            'ending_date': str(datetime.now().date()),
+        }
+        booking_queue.apply(fields)
+        # воркер упал до set_status: запрос всё ещё ждёт
+        booking_queue.set_status(request_id, booking_queue.PENDING)
+
+        booking_queue.apply(fields)
+
+        reservation = Reservation.objects.get()
+        result = booking_queue.get_status(request_id)
+        self.assertEqual(result['status'], 'confirmed')
+        self.assertEqual(result['reservation'], str(reservation.id))
+
+    @override_settings(BOOKING_QUEUE_MAX_ATTEMPTS=2)
+    @mock.patch('rooms.booking_queue.dispatch')
+    def test_failing_request_does_not_block_partition(self, dispatch):
+        """Упавшая не с BookingError запись после попыток помечается failed"""
+
+        broken = self.queue().data['request']
+        healthy = self.queue().data['request']
+        partition = booking_queue.partition(self.room.id)
+        apply = booking_queue.apply
+
+        def fail_first(fields):
+            if fields['request'] == broken:
+                raise RuntimeError('database is gone')
+            return apply(fields)
+
+        with mock.patch('rooms.booking_queue.apply', side_effect=fail_first):
+            first_run = booking_queue.consume(partition)
+            second_run = booking_queue.consume(partition)
+
+        self.assertEqual(first_run, 0)
+        self.assertEqual(second_run, 2)
+        self.assertEqual(booking_queue.get_status(broken)['status'], 'failed')
+        self.assertEqual(
+            booking_queue.get_status(healthy)['status'], 'confirmed'
+        )
+
+
+class RoomClosureTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = UserFactory()
+        self.room = RoomFactory()
+        self.today = datetime.now().date()
+        self.closure = RoomClosure.objects.create(
+            room=self.room,
+            starting_date=self.today,
+            ending_date=self.today + timedelta(days=2),
+            reason='Painting',
+        )
+
+    def test_closed_room_is_not_found(self):
+        """Закрытая на весь период комната не попадает в поиск"""
+
+        response = self.client.get(
+            reverse('room-list'),
+            {
+                'start_date': str(self.today),
+                'end_date': str(self.today + timedelta(days=1)),
+            },
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 0)
+
+    def test_closed_dates_are_reserved(self):
+        """Дни закрытия входят в reserved_dates и мешают брони"""
+
+        refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {str(refresh.access_token)}'
+        )
+        response = self.client.post(
+            reverse('reservation-list'),
+            {
+                'starting_date': str(datetime.now()),
+                'ending_date': str(datetime.now()),
+                'room': self.room.id,
+            },
+            format='json',
+        )
+        detail = self.client.get(reverse('room-detail', args=[self.room.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(detail.data['reserved_dates']), 3)
+
+    def test_refuse_affected_reservations(self):
+        """Брони на даты закрытия отменяются одним действием"""
+
+        reservation = ReservationFactory(
+            room=self.room,
+            starting_date=datetime.now() + timedelta(days=1),
+            ending_date=datetime.now() + timedelta(days=3),
+        )
+        untouched = ReservationFactory(
+            starting_date=datetime.now(), ending_date=datetime.now()
+        )
+        OutboxEvent.objects.all().delete()
+
+        refused = closures.refuse_affected_reservations(
+            RoomClosure.objects.all()
+        )
+
+        self.assertEqual(refused, 1)
+        reservation.refresh_from_db()
+        untouched.refresh_from_db()
+        self.assertEqual(reservation.status, Reservation.Status.Refused)
+        self.assertEqual(untouched.status, Reservation.Status.Booked)
+        event = OutboxEvent.objects.get()
+        self.assertEqual(event.payload['after']['status'], 'refused')
+
+    def test_closed_room_leaves_type_pool(self):
+        """В дни закрытия комната не входит в пул своего типа"""
+
+        room_type = RoomType.objects.create(
+            name='Standard double',
+            sleeping_area=Room.BedType.Double,
+            day_cost=100,
+        )
+        self.room.room_type = room_type
+        self.room.save()
+        other = RoomFactory(room_type=room_type)
+        ReservationFactory(
+            room=other,
+            starting_date=datetime.now() + timedelta(days=1),
+            ending_date=datetime.now() + timedelta(days=1),
+        )
+
+        closed = inventory.available_counts(
+            self.today, self.today + timedelta(days=2)
+        )
+        later = inventory.available_counts(
+            self.today + timedelta(days=3), self.today + timedelta(days=4)
+        )
+
+        self.assertEqual(closed[room_type.id], 0)
+        self.assertEqual(later[room_type.id], 2)
+
+
+class OverlapReconciliationTests(TestCase):
+    def setUp(self):
+        self.room = RoomFactory()
+        now = datetime.now()
+        # длинная бронь накрывает две следующие, соседние между собой не
+        # пересекаются
+        self.long = ReservationFactory(
+            room=self.room,
+            starting_date=now,
+            ending_date=now + timedelta(days=6),
+        )
+        self.first = ReservationFactory(
+            room=self.room,
+            starting_date=now + timedelta(days=1),
+            ending_date=now + timedelta(days=2),
+        )
+        self.second = ReservationFactory(
+            room=self.room,
+            starting_date=now + timedelta(days=4),
+            ending_date=now + timedelta(days=5),
+        )
+        ReservationFactory(
+            starting_date=now + timedelta(days=1),
+            ending_date=now + timedelta(days=2),
+        )
+
+    def test_nested_overlaps_are_found(self):
+        """Находятся пары с вложенной бронью, а не только соседние"""
+
+        result = reconciliation.reconcile(batch_size=1)
+
+        self.assertEqual(result['overlaps'], 2)
+        self.assertEqual(
+            set(
+                OverlapFinding.objects.values_list(
+                    'reservation', 'conflicting_reservation'
+                )
+            ),
+            {(self.first.id, self.long.id), (self.second.id, self.long.id)},
+        )
+
+    def test_resolved_overlaps_are_removed(self):
+        """После отмены длинной брони находки исчезают"""
+
+        reconciliation.reconcile()
+        self.long.status = Reservation.Status.Refused
+        self.long.save()
+
+        result = reconciliation.reconcile()
+
+        self.assertEqual(result['overlaps'], 0)
+        self.assertFalse(OverlapFinding.objects.exists())
+
+
+class AvailabilityCheckTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.url = reverse('room-check-availability')
+        self.today = datetime.now().date()
+        self.free_room = RoomFactory()
+        self.busy_room = RoomFactory()
+        ReservationFactory(
+            room=self.busy_room,
+            starting_date=datetime.now() + timedelta(days=1),
+            ending_date=datetime.now() + timedelta(days=2),
+        )
+        RoomClosure.objects.create(
+            room=self.busy_room,
+            starting_date=self.today + timedelta(days=3),
+            ending_date=self.today + timedelta(days=3),
+        )
+
+    def stay(self, room_id):
+        return {
+            'room': str(room_id),
+            'start_date': str(self.today),
+            'end_date': str(self.today + timedelta(days=5)),
+        }
+
+    def test_batch_check(self):
+        """Пакет периодов проверяется одним запросом к базе"""
+
+        stays = [
+            self.stay(self.free_room.id),
+            self.stay(self.busy_room.id),
+            self.stay(uuid.uuid4()),
+        ]
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                self.url, {'stays': stays}, format='json'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        free, busy, missing = response.data
+        self.assertTrue(free['available'])
+        self.assertEqual(free['blocked'], [])
+        self.assertFalse(busy['available'])
+        # бронь и соседнее закрытие сливаются в один интервал
+        self.assertEqual(
+            busy['blocked'],
+            [(self.today + timedelta(days=1), self.today + timedelta(days=3))],
+        )
+        self.assertFalse(missing['available'])
+        self.assertIsNone(missing['blocked'])
+
+    def test_batch_limit(self):
+        """Слишком большой пакет отклоняется"""
+
+        stays = [self.stay(self.free_room.id)] * 101
+
+        response = self.client.post(self.url, {'stays': stays}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.room = RoomFactory()
+        self.detail_url = reverse('room-detail', args=[self.room.id])
+
+    def test_not_modified(self):
+        """Повторный запрос с If-None-Match отдаёт 304 без тела"""
+
+        etag = self.client.get(self.detail_url)['ETag']
+
+        with mock.patch(
+            'rooms.api.v1.views.RoomSerializer.to_representation'
+        ) as to_representation:
+            response = self.client.get(
+                self.detail_url, HTTP_IF_NONE_MATCH=etag
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        to_representation.assert_not_called()
+
+    def test_reservation_changes_etag(self):
+        """Новая бронь комнаты меняет ETag списка"""
+
+        list_url = reverse('room-list')
+        etag = self.client.get(list_url)['ETag']
+        ReservationFactory(
+            room=self.room,
+            starting_date=datetime.now(),
+            ending_date=datetime.now(),
+        )
+
+        response = self.client.get(list_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_next_day_changes_etag(self):
+        """После полуночи ETag меняется и без изменений в таблицах"""
+
+        etag = self.client.get(self.detail_url)['ETag']
+        tomorrow = datetime.now().date() + timedelta(days=1)
+
+        with mock.patch(
+            'rooms.conditional.today', return_value=[tomorrow, tomorrow]
+        ):
+            response = self.client.get(
+                self.detail_url, HTTP_IF_NONE_MATCH=etag
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_default_etag_parts(self):
+        """Без переопределения ETag считается по объекту из get_queryset"""
+
+        class RoomView(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+            queryset = Room.objects.all()
+
+        view = RoomView(action='retrieve', kwargs={'pk': self.room.id})
+        parts = view.get_etag_parts(None)
+        self.room.name = 'Renamed'
+        self.room.save()
+
+        self.assertEqual(parts[0], 1)
+        self.assertNotEqual(view.get_etag_parts(None), parts)
+        view.kwargs = {'pk': 'not-a-uuid'}
+        self.assertIsNone(view.get_etag_parts(None))
+
+
+class ReservationExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = UserFactory(is_staff=True)
+        self.url = reverse('reservation-export')
+        self.booked = ReservationFactory(
+            starting_date=datetime.now(), ending_date=datetime.now()
+        )
+        self.refused = ReservationFactory(
+            starting_date=datetime.now(),
+            ending_date=datetime.now(),
+            status=Reservation.Status.Refused,
+        )
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {str(refresh.access_token)}'
+        )
+
+    def test_csv_export(self):
+        """CSV отдаётся потоком с заголовком"""
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith('id,room_id'))
+        self.assertEqual(len(lines), 3)
+
+    def test_ndjson_export_with_status(self):
+        """NDJSON с фильтром по статусу"""
+
+        response = self.client.get(
+            self.url, {'export_format': 'ndjson', 'status': 'refused'}
+        )
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['id'], str(self.refused.id))
+
+    def test_export_command(self):
+        """Команда пишет выгрузку в stdout команды"""
+
+        stdout = io.StringIO()
+
+        call_command(
+            'export_reservations',
+            export_format='ndjson',
+            status=['booked'],
+            stdout=stdout,
+        )
+
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])['id'], str(self.booked.id))
+
+    def test_export_is_admin_only(self):
+        """Выгрузка доступна только администраторам"""
+
+        self.client.credentials()
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica_1'],
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    },
+)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        self.routed = []
+        self.middleware = ReplicaRoutingMiddleware(self.get_response)
+
+    def get_response(self, request):
+        self.routed.append(self.router.db_for_read(Room))
+        return None
+
+    def test_reads_go_to_primary_by_default(self):
+        """Без разрешения чтение идёт на primary"""
+
+        self.assertEqual(self.router.db_for_read(Room), 'default')
+
+    def test_replica_reads(self):
+        """Внутри replica_reads чтение идёт на реплику, запись - нет"""
+
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Room), 'replica_1')
+            self.assertEqual(self.router.db_for_write(Room), 'default')
+
+    def test_migrations_only_on_primary(self):
+        """Миграции применяются только к primary"""
+
+        self.assertTrue(self.router.allow_migrate('default', 'rooms'))
+        self.assertFalse(self.router.allow_migrate('replica_1', 'rooms'))
+
+    def test_safe_request_reads_from_replica(self):
+        """GET без предшествующей записи читает с реплики"""
+
+        self.middleware(self.factory.get('/', HTTP_AUTHORIZATION='Bearer a'))
+
+        self.assertEqual(self.routed, ['replica_1'])
+
+    def test_write_pins_client_to_primary(self):
+        """После записи клиент читает с primary, другие - с реплики"""
+
+        self.middleware(self.factory.post('/', HTTP_AUTHORIZATION='Bearer a'))
+        self.middleware(self.factory.get('/', HTTP_AUTHORIZATION='Bearer a'))
+        self.middleware(self.factory.get('/', HTTP_AUTHORIZATION='Bearer b'))
+
+        self.assertEqual(self.routed, ['default', 'default', 'replica_1'])
+
+
+class ConnectionPoolTests(TestCase):
+    def test_pool_stats(self):
+        """Статистика видит хотя бы текущее соединение"""
+
+        stats = connections.pool_stats()
+
+        self.assertGreaterEqual(stats['total'], 1)
+        self.assertGreater(stats['conn_max_age'], 0)
+
+    def test_benchmark(self):
+        """Бенчмарк выполняет все запросы в обоих режимах"""
+
+        for persistent in (False, True):
+            result = connections.benchmark(5, 2, persistent)
+
+            self.assertEqual(result['requests'], 5)
+            self.assertGreater(result['throughput'], 0)
+
+
+class OpenAPISchemaTests(SimpleTestCase):
+    def setUp(self):
+        schema.get_schema.cache_clear()
+
+    def test_schema_is_built_once(self):
+        """Схема собирается один раз и дальше отдаётся из памяти"""
+
+        for _ in range(2):
+            response = self.client.get(reverse('schema-json'))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertIn('/api/v1/rooms/', response.json()['paths'])
+        self.assertEqual(schema.get_schema.cache_info().misses, 1)
+
+    def test_generate_openapi(self):
+        """Команда пишет ту же схему в файл"""
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = f'{directory}/openapi.json'
+            call_command('generate_openapi', output=output, stdout=mock.Mock())
+
+            with open(output) as schema_file:
+                self.assertEqual(
+                    json.load(schema_file)['paths'].keys(),
+                    schema.get_schema()['paths'].keys(),
+                )
+
+
+class WarmupTests(SimpleTestCase):
+    def test_stages_are_timed(self):
+        """Прогрев замеряет каждый этап"""
+
+        with self.assertLogs('app.warmup', 'INFO') as logs:
+            timings = warmup.run(
+                (
+                    ('urls', warmup.import_urls),
+                    ('serializers', warmup.build_serializers),
+                )
+            )
+
+        self.assertEqual(list(timings), ['urls', 'serializers'])
+        self.assertEqual(len(logs.output), 3)
+
+    def test_failed_stage_does_not_stop_startup(self):
+        """Ошибка этапа пишется в лог, остальные этапы выполняются"""
+
+        broken = mock.Mock(side_effect=ConnectionError)
+        stage = mock.Mock()
+
+        with self.assertLogs('app.warmup', 'ERROR'):
+            timings = warmup.run((('redis', broken), ('schema', stage)))
+
+        stage.assert_called_once()
+        self.assertEqual(list(timings), ['redis', 'schema'])
+
+
+class ReviewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.room = RoomFactory(rating=0)
+        self.reservation = ReservationFactory(
+            room=self.room, status=Reservation.Status.Expired
+        )
+        refresh = RefreshToken.for_user(self.reservation.user)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {str(refresh.access_token)}'
+        )
+
+    def expired_reservation(self):
+        return ReservationFactory(
+            room=self.room, status=Reservation.Status.Expired
+        )
+
+    def test_review_updates_rating(self):
+        """Отзыв через API сдвигает счётчики и рейтинг комнаты"""
+
+        response = self.client.post(
+            reverse('reservation-review', args=[self.reservation.id]),
+            {'score': 8, 'text': 'Nice'},
+        )
+        reviews.create_review(self.expired_reservation(), 5)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.reviews_count, 2)
+        self.assertEqual(self.room.rating_total, 13)
+        self.assertEqual(self.room.rating, 6.5)
+
+    def test_only_expired_reservations_are_reviewed(self):
+        """Незавершённую бронь оценить нельзя, повторный отзыв - тоже"""
+
+        booked = ReservationFactory(room=self.room)
+        reviews.create_review(self.reservation, 8)
+
+        with self.assertRaises(reviews.ReviewError):
+            reviews.create_review(booked, 8)
+        with self.assertRaises(reviews.ReviewError):
+            reviews.create_review(self.reservation, 3)
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.reviews_count, 1)
+
+    def test_review_removal_and_room_save(self):
+        """Удаление отзыва вычитается, сохранение комнаты рейтинг не трогает"""
+
+        stale_room = Room.objects.get(pk=self.room.pk)
+        review = reviews.create_review(self.reservation, 8)
+        reviews.create_review(self.expired_reservation(), 4)
+        stale_room.save()
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.rating, 6)
+
+        review.delete()
+
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.reviews_count, 1)
+        self.assertEqual(self.room.rating, 4)
+
+    def test_backfill(self):
+        """Пересчёт восстанавливает счётчики по отзывам"""
+
+        reviews.create_review(self.reservation, 9)
+        empty_room = RoomFactory(rating=7)
+        Room.objects.filter(pk=self.room.pk).update(
+            reviews_count=0, rating_total=0, rating=0
+        )
+
+        reviews.backfill(batch_size=1)
+
+        self.room.refresh_from_db()
+        empty_room.refresh_from_db()
+        self.assertEqual(self.room.reviews_count, 1)
+        self.assertEqual(self.room.rating, 9)
+        self.assertEqual(empty_room.rating, 0)
+
+    def test_ordering_by_rating(self):
+        """Комнаты сортируются по рейтингу"""
+
+        reviews.create_review(self.reservation, 9)
+        RoomFactory(rating=0)
+
+        response = self.client.get(
+            reverse('room-list'), {'ordering': '-rating'}
+        )
+
+        self.assertEqual(response.data[0]['id'], str(self.room.id))
+
+
+class RoomCalendarTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.room = RoomFactory()
+        self.today = datetime.now().date()
+        self.url = reverse('room-calendar', args=[self.room.id])
+        for offset in (0, 2):
+            ReservationFactory(
+                room=self.room,
+                starting_date=datetime.now() + timedelta(days=offset),
+                ending_date=datetime.now() + timedelta(days=offset + 1),
+            )
+
+    def test_feed_has_merged_intervals(self):
+        """Соседние брони - одно событие, DTEND не входит в событие"""
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response['Content-Type'], 'text/calendar; charset=utf-8'
+        )
+        body = response.content.decode()
+        dtend = ical.ical_date(self.today + timedelta(days=4))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+        self.assertIn(f'DTEND;VALUE=DATE:{dtend}', body)
+
+    def test_cached_feed_and_not_modified(self):
+        """Повторный запрос не ходит в базу, по ETag отдаётся 304"""
+
+        etag = self.client.get(self.url)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_rebuilt_feed_keeps_etag(self):
+        """Пересборка тех же броней в другое время не меняет ETag"""
+
+        feed = ical.build(self.room.id)
+        with mock.patch(
+            'rooms.ical.timezone.now',
+            return_value=timezone.now() + timedelta(minutes=5),
+        ):
+            rebuilt = ical.build(self.room.id)
+
+        self.assertNotEqual(rebuilt['body'], feed['body'])
+        self.assertEqual(rebuilt['etag'], feed['etag'])
+
+    def test_closure_invalidates_feed(self):
+        """Закрытие комнаты пересобирает её ленту"""
+
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            RoomClosure.objects.create(
+                room=self.room,
+                starting_date=self.today + timedelta(days=6),
+                ending_date=self.today + timedelta(days=7),
+            )
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content.decode().count('BEGIN:VEVENT'), 2)
+
+    def test_unknown_room(self):
+        """Для несуществующей комнаты - 404"""
+
+        response = self.client.get(
+            reverse('room-calendar', args=[uuid.uuid4()])
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BookingImportTests(TestCase):
+    def setUp(self):
+        self.user = UserFactory()
+        self.room = RoomFactory()
+        self.start = datetime.now().date() + timedelta(days=1)
+
+    def ical_feed(self, *events):
+        lines = ['BEGIN:VCALENDAR']
+        for uid, offset, event_status in events:
+            start = self.start + timedelta(days=offset)
+            end = start + timedelta(days=2)
+            lines += [
+                'BEGIN:VEVENT',
+                f'UID:{uid}',
+                f'DTSTART;VALUE=DATE:{ical.ical_date(start)}',
+                f'DTEND;VALUE=DATE:{ical.ical_date(end)}',
+                f'STATUS:{event_status}',
+                'END:VEVENT',
+            ]
+        lines.append('END:VCALENDAR')
+        return [f'{line}\r\n' for line in lines]
+
+    def import_ical(self, *events):
+        return importer.import_feed(
+            self.ical_feed(*events),
+            'ical',
+            'channel',
+            self.user.pk,
+            room_id=self.room.id,
+        )
+
+    def test_ical_import_is_idempotent(self):
+        """События становятся бронями, повторный импорт ничего не меняет"""
+
+        stats = self.import_ical(('a', 0, 'CONFIRMED'), ('b', 3, 'CONFIRMED'))
+        repeated = self.import_ical(
+            ('a', 0, 'CONFIRMED'), ('b', 3, 'CONFIRMED')
+        )
+
+        self.assertEqual(stats['created'], 2)
+        self.assertEqual(repeated['created'], 0)
+        reservation = Reservation.objects.get(external_uid='a')
+        self.assertEqual(reservation.nights, 2)
+        self.assertEqual(
+            reservation.ending_date.date(), self.start + timedelta(days=1)
+        )
+        self.assertEqual(
+            OutboxEvent.objects.filter(
+                topic=outbox.RESERVATION_CHANGED
+            ).count(),
+            2,
+        )
+
+    def test_cancelled_and_missing_events(self):
+        """Отменённые в ленте и пропавшие из неё брони отменяются"""
+
+        self.import_ical(
+            ('a', 0, 'CONFIRMED'), ('b', 3, 'CONFIRMED'), ('c', 6, 'CONFIRMED')
+        )
+
+        stats = self.import_ical(('a', 0, 'CONFIRMED'), ('b', 3, 'CANCELLED'))
+
+        self.assertEqual(stats['cancelled'], 2)
+        self.assertEqual(
+            set(
+                Reservation.objects.booked_and_active().values_list(
+                    'external_uid', flat=True
+                )
+            ),
+            {'a'},
+        )
+
+    def test_ndjson_in_batches(self):
+        """NDJSON разбирается пачками, брони неизвестных комнат пропускаются"""
+
+        rows = [
+            {
+                'uid': uid,
+                'room': str(room_id),
+                'starting_date': str(self.start),
+                'ending_date': str(self.start),
+                'total_price': 100,
+            }
+            for uid, room_id in (
+                ('a', self.room.id),
+                ('b', self.room.id),
+                ('c', uuid.uuid4()),
+            )
+        ]
+        lines = [json.dumps(row) + '\n' for row in rows]
+
+        stats = importer.import_feed(
+            lines, 'ndjson', 'channel', self.user.pk, batch_size=1
+        )
+
+        self.assertEqual(stats, {'created': 2, 'cancelled': 0, 'skipped': 1})
+        self.assertEqual(
+            Reservation.objects.get(external_uid='a').total_price, 100
+        )
+
+    def test_ndjson_export_is_imported(self):
+        """Выгрузка rooms.export импортируется, UID - id брони"""
+
+        reservation = ReservationFactory(
+            room=self.room,
+            starting_date=datetime.now() + timedelta(days=1),
+            ending_date=datetime.now() + timedelta(days=2),
+            total_price=200,
+        )
+        lines = list(export.ndjson_lines(export.reservations()))
+
+        stats = importer.import_feed(lines, 'ndjson', 'partner', self.user.pk)
+
+        self.assertEqual(stats['created'], 1)
+        imported = Reservation.objects.get(external_uid=str(reservation.id))
+        self.assertEqual(imported.nights, 2)
+        self.assertEqual(imported.total_price, 200)
+
+    def test_ndjson_inverted_dates_are_skipped(self):
+        """Строки с выездом раньше заезда пропускаются"""
+
+        line = json.dumps(
+            {
+                'uid': 'a',
+                'room': str(self.room.id),
+                'starting_date': str(self.start + timedelta(days=2)),
+                'ending_date': str(self.start),
+            }
+        )
+
+        stats = importer.import_feed(
+            [line + '\n'], 'ndjson', 'channel', self.user.pk
+        )
+
+        self.assertEqual(stats, {'created': 0, 'cancelled': 0, 'skipped': 1})
+        self.assertFalse(Reservation.objects.filter(external_uid='a').exists())
+
+
+class ReservationAuditTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = UserFactory(is_staff=True)
+        self.reservation = ReservationFactory()
+        self.url = reverse('reservation-audit')
+
+    def drain_audit(self):
+        with mock.patch.dict(
+            outbox._handlers, {outbox.RESERVATION_CHANGED: [audit.write]}
+        ):
+            outbox.drain()
+
+    def get_audit(self, **params):
+        refresh = RefreshToken.for_user(self.admin)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {str(refresh.access_token)}'
+        )
+        return self.client.get(self.url, data=params)
+
+    def test_changes_are_recorded(self):
+        """Создание и изменение брони попадают в историю с источником"""
+
+        with audit.context('update_reservation_status'):
+            self.reservation.status = Reservation.Status.Refused
+            self.reservation.save()
+        self.drain_audit()
+
+        records = list(audit.for_reservation(self.reservation.id))
+
+        self.assertEqual(
+            [record.action for record in records],
+            [ReservationAudit.Action.Created, ReservationAudit.Action.Changed],
+        )
+        self.assertEqual(records[0].source, audit.SYSTEM)
+        self.assertEqual(records[1].source, 'update_reservation_status')
+        self.assertEqual(records[1].after['status'], 'refused')
+        self.assertEqual(records[1].room_id, self.reservation.room_id)
+
+    def test_redelivery_is_idempotent(self):
+        """Повторная доставка пачки не дублирует записи"""
+
+        payloads = [event.payload for event in OutboxEvent.objects.all()]
+
+        audit.write(payloads)
+        audit.write(payloads)
+
+        self.assertEqual(audit.for_reservation(self.reservation.id).count(), 1)
+
+    def test_request_actor(self):
+        """Пользователь запроса записывается как автор изменения"""
+
+        request = RequestFactory().get('/')
+        request.user = self.admin
+
+        with audit.context('api', request):
+            actor_id, source = audit.current()
+
+        self.assertEqual(actor_id, self.admin.pk)
+        self.assertEqual(source, 'api')
+
+    def test_audit_endpoint(self):
+        """История отдаётся по брони и по комнате, без фильтра - 400"""
+
+        self.drain_audit()
+
+        by_reservation = self.get_audit(reservation=self.reservation.id)
+        by_room = self.get_audit(room=self.reservation.room_id)
+        missing = self.get_audit()
+
+        self.assertEqual(by_reservation.status_code, status.HTTP_200_OK)
+        self.assertEqual(by_reservation.data['count'], 1)
+        self.assertEqual(by_room.data['count'], 1)
+        self.assertEqual(missing.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_audit_endpoint_is_admin_only(self):
+        """История недоступна обычному пользователю"""
+
+        self.admin.is_staff = False
+        self.admin.save()
+
+        response = self.get_audit(reservation=self.reservation.id)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
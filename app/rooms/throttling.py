@@ -0,0 +1,113 @@
+import logging
+from functools import lru_cache
+
+from redis import RedisError
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .redis import get_async_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+# Token bucket целиком в redis: пополнение, списание и TTL ключа за один
+# EVALSHA. Время берётся у redis, поэтому лимит одинаков для всех процессов
+# и серверов независимо от их часов.
+TOKEN_BUCKET = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(wait)}
+"""
+
+
+@lru_cache(maxsize=None)
+def token_bucket():
+    return get_redis().register_script(TOKEN_BUCKET)
+
+
+class RedisTokenBucketThrottle(BaseThrottle):
+    """Token bucket на пользователя, для анонимов - на IP.
+
+    Квота берётся из DEFAULT_THROTTLE_RATES по scope: '120/min' значит
+    ёмкость 120 запросов с равномерным пополнением за минуту. Если redis
+    недоступен, запросы пропускаются.
+    """
+
+    scope = None
+    cache_format = 'throttle:%(scope)s:%(ident)s'
+
+    def __init__(self):
+        num_requests, period = api_settings.DEFAULT_THROTTLE_RATES[
+            self.scope
+        ].split('/')
+        duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+        self.capacity = int(num_requests)
+        self.refill_rate = self.capacity / duration
+        self.wait_seconds = None
+
+    def get_cache_key(self, request, ident=None):
+        if ident is None:
+            if request.user and request.user.is_authenticated:
+                ident = f'user:{request.user.pk}'
+            else:
+                ident = f'ip:{self.get_ident(request)}'
+        return self.cache_format % {'scope': self.scope, 'ident': ident}
+
+    def allow_request(self, request, view):
+        try:
+            allowed, wait = token_bucket()(
+                keys=[self.get_cache_key(request)],
+                args=[self.capacity, self.refill_rate],
+            )
+        except RedisError:
+            logger.warning('Throttling is disabled: redis is unavailable')
+            return True
+        self.wait_seconds = float(wait)
+        return bool(allowed)
+
+    async def aallow_request(self, request, view):
+        # в асинхронном API аутентификация не выполняется, лимит по IP
+        script = get_async_redis().register_script(TOKEN_BUCKET)
+        try:
+            allowed, wait = await script(
+                keys=[
+                    self.get_cache_key(
+                        request, ident=f'ip:{self.get_ident(request)}'
+                    )
+                ],
+                args=[self.capacity, self.refill_rate],
+            )
+        except RedisError:
+            logger.warning('Throttling is disabled: redis is unavailable')
+            return True
+        self.wait_seconds = float(wait)
+        return bool(allowed)
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class SearchRateThrottle(RedisTokenBucketThrottle):
+    scope = 'search'
+
+
+class BookingRateThrottle(RedisTokenBucketThrottle):
+    scope = 'booking'